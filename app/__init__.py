@@ -12,14 +12,17 @@ import os
 import logging
 from logging.handlers import RotatingFileHandler
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 from flask_caching import Cache
 from config import get_config
+from app.utils.db_engine import RoutingSession
 
 # 初始化扩展
-db = SQLAlchemy()
+# RoutingSession: GET 请求的查询走只读副本或 SQLite 只读连接池（见 app.utils.db_engine）
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 csrf = CSRFProtect()
 cache = Cache()
@@ -41,6 +44,10 @@ def create_app(config_name='default'):
     config_class = get_config(config_name)
     app.config.from_object(config_class)
 
+    # 按可信代理层数改写 remote_addr，客户端伪造的 X-Forwarded-For 前缀不会被采用
+    if app.config['PROXY_FIX_X_FOR'] > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
     # 初始化扩展
     _init_extensions(app)
 
@@ -50,7 +57,7 @@ def create_app(config_name='default'):
     # 配置日志
     _init_logging(app)
 
-    # 创建数据库表
+    # 检查数据库版本
     _init_database(app)
 
     # 注册 CLI 命令
@@ -61,6 +68,8 @@ def create_app(config_name='default'):
 
 def _register_commands(app):
     """注册 CLI 命令"""
+    import click
+
     @app.cli.command()
     def publish_scheduled():
         """发布定时文章"""
@@ -87,16 +96,331 @@ def _register_commands(app):
             click.echo(f'定时文章总数: {stats["total_scheduled"]}')
             click.echo(f'即将发布(24小时内): {stats["publishing_soon"]}')
 
+    @app.cli.command()
+    @click.option('--rounds', default=10, help='每个标题的编码次数')
+    def benchmark_covers(rounds):
+        """对比封面图编码耗时和体积"""
+        from app.utils.image_generator import benchmark_cover_encoding
+
+        click.echo(f'{"编码方式":<24}{"平均耗时(ms)":>14}{"平均体积(B)":>14}')
+        for result in benchmark_cover_encoding(rounds=rounds):
+            click.echo(f'{result["name"]:<24}{result["avg_ms"]:>14.2f}{result["avg_bytes"]:>14}')
+
+    @app.cli.command()
+    def check_github_retry():
+        """用本地桩服务检查 GitHub 图床的限流重试策略，不符合预期时返回非零状态"""
+        from scripts.github_stub import check_retry as run_check
+
+        failures = 0
+        for result in run_check():
+            failures += not result['ok']
+            click.echo(f'[{"通过" if result["ok"] else "失败"}] {result["name"]}: '
+                       f'请求 {result["requests"]} 次（预期 {result["expected_requests"]}），'
+                       f'状态码 {result["status"]}（预期 {result["expected_status"]}）')
+        if failures:
+            click.echo(f'{failures} 个用例不符合预期', err=True)
+            raise SystemExit(1)
+
+    @app.cli.command()
+    def check_github_batch():
+        """用本地模拟的 Git Data API 检查 GitHub 图床的批量提交，不符合预期时返回非零状态"""
+        from scripts.github_stub import check_batch_commits
+
+        failures = 0
+        for result in check_batch_commits():
+            failures += not result['ok']
+            click.echo(f'[{"通过" if result["ok"] else "失败"}] {result["name"]}: {result["detail"]}')
+        if failures:
+            click.echo(f'{failures} 个用例不符合预期', err=True)
+            raise SystemExit(1)
+
+    @app.cli.command()
+    @click.option('--width', default=8000, help='测试图片宽度')
+    @click.option('--height', default=6000, help='测试图片高度')
+    @click.option('--limit', default=None, type=int, help='流式流程内存峰值上限（MB），默认 UPLOAD_MEMORY_LIMIT_MB')
+    def benchmark_upload(width, height, limit):
+        """测量单次图片上传处理的内存峰值（RSS），流式流程超出上限时返回非零状态"""
+        from app.utils.image_upload import UPLOAD_MEMORY_LIMIT_MB, benchmark_upload_memory
+
+        limit = limit or UPLOAD_MEMORY_LIMIT_MB
+        result = benchmark_upload_memory(image_size=(width, height))
+        click.echo(f'测试图片: {width}x{height}，{result["source_bytes"] / 1024 / 1024:.1f} MB')
+        click.echo(f'全内存流程峰值: {result["in_memory_peak"] / 1024 / 1024:.1f} MB')
+        click.echo(f'流式流程峰值: {result["streaming_peak"] / 1024 / 1024:.1f} MB（上限 {limit} MB）')
+        if result['streaming_peak'] > limit * 1024 * 1024:
+            click.echo('流式流程内存峰值超出上限', err=True)
+            raise SystemExit(1)
+
+    @app.cli.command()
+    @click.option('--readers', default=4, help='读线程数')
+    @click.option('--writers', default=1, help='写线程数')
+    @click.option('--duration', default=3.0, help='每种配置的运行时间（秒）')
+    def benchmark_sqlite(readers, writers, duration):
+        """对比有写入并发时 SQLite 默认配置与调优配置的读吞吐"""
+        from app.utils.db_engine import benchmark_sqlite as run_benchmark
+
+        click.echo(f'{"配置":<24}{"读/秒":>10}{"写/秒":>10}{"读 P95(ms)":>12}{"错误":>8}')
+        for result in run_benchmark(app.config, readers=readers, writers=writers, duration=duration):
+            click.echo(f'{result["name"]:<24}{result["reads_per_sec"]:>10.0f}{result["writes_per_sec"]:>10.0f}'
+                       f'{result["read_p95_ms"]:>12.2f}{result["errors"]:>8}')
+
+    @app.cli.command()
+    @click.option('--min-age', default=3600, help='宽限时间（秒），更新的文件不回收')
+    @click.option('--dry-run', is_flag=True, help='只统计不删除')
+    def gc_uploads(min_age, dry_run):
+        """回收本地存储中不再被文章引用的图片"""
+        from app.utils.storage import collect_garbage
+
+        stats = collect_garbage(min_age=min_age, dry_run=dry_run)
+        if stats is None:
+            click.echo('当前未使用本地存储，跳过')
+            return
+
+        prefix = '[dry-run] ' if dry_run else ''
+        click.echo(f'{prefix}删除文件: {stats["names"]}，删除内容对象: {stats["objects"]}，'
+                   f'纳入去重: {stats["adopted"]}，衍生图记录: {stats["records"]}')
+        click.echo(f'{prefix}释放空间: {stats["bytes"] / 1024:.1f} KB')
+
+    @app.cli.command()
+    def subset_icons():
+        """按模板用到的图标生成 bootstrap-icons 字体子集"""
+        from app.utils.icon_subset import build_icon_subset
+
+        result = build_icon_subset(app.root_path, app.static_folder)
+        if result is None:
+            click.echo('未安装 fontTools，继续使用完整图标字体')
+            return
+
+        click.echo(f'图标: {result["icons"]}/{result["total"]}，'
+                   f'字体: {result["font_size"] / 1024:.1f} KB -> {result["subset_size"] / 1024:.1f} KB')
+        if result['missing']:
+            click.echo(f'未找到的图标: {", ".join(result["missing"])}', err=True)
+
+    @app.cli.group('db')
+    def db_cli():
+        """数据库迁移"""
+
+    @db_cli.command()
+    @click.option('--to', 'target', type=int, help='目标版本号（默认最新）')
+    def upgrade(target):
+        """执行未执行的数据库迁移"""
+        from app.utils.migrations import upgrade as run_upgrade
+
+        with app.app_context():
+            applied = run_upgrade(db, target)
+        for migration in applied:
+            click.echo(f'{migration.version:04d}_{migration.name}: {migration.description}')
+        click.echo(f'已执行 {len(applied)} 个迁移' if applied else '数据库已是最新版本')
+
+    @db_cli.command()
+    def current():
+        """显示数据库当前版本"""
+        from app.utils.migrations import current_version, head_version
+
+        with app.app_context():
+            version = current_version(db.engine)
+        click.echo(f'当前版本: {"未初始化" if version is None else version}，最新版本: {head_version()}')
+
+    @db_cli.command()
+    def history():
+        """列出所有迁移及执行时间"""
+        from app.utils.migrations import applied_versions, load_migrations
+
+        with app.app_context():
+            applied = applied_versions(db.engine)
+        for migration in load_migrations():
+            status = applied[migration.version].strftime('%Y-%m-%d %H:%M:%S') if migration.version in applied else '未执行'
+            click.echo(f'{migration.version:04d}_{migration.name:<32}{status:<22}{migration.description}')
+
+    @db_cli.command('create-admin')
+    @click.option('--username', default='admin01', help='用户名')
+    @click.option('--email', default='admin01@blog.local', help='邮箱')
+    @click.option('--password', envvar='ADMIN_PASSWORD', prompt=True, hide_input=True,
+                  confirmation_prompt=True, help='密码（也可通过 ADMIN_PASSWORD 环境变量提供）')
+    def create_admin(username, email, password):
+        """创建管理员账号（已存在时跳过）"""
+        from app.models.user import User
+
+        with app.app_context():
+            if User.query.filter_by(username=username).first():
+                click.echo(f'用户 {username} 已存在')
+                return
+            user = User(username=username, email=email)
+            user.set_password(password)
+            db.session.add(user)
+            db.session.commit()
+        click.echo(f'管理员 {username} 创建成功')
+
+    @db_cli.command('sync-replica')
+    def sync_replica():
+        """把 SQLite 主库复制到 DATABASE_REPLICA_URL（本地测试副本路由）"""
+        from app.utils.db_engine import sync_sqlite_replica
+
+        replica_url = app.config.get('DATABASE_REPLICA_URL')
+        if not replica_url:
+            raise click.ClickException('未配置 DATABASE_REPLICA_URL')
+        try:
+            path = sync_sqlite_replica(app.config['SQLALCHEMY_DATABASE_URI'], replica_url)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f'已复制到 {path}')
+
+    @app.cli.command()
+    @click.option('--verbose', is_flag=True, help='输出每条语句的查询计划')
+    @click.option('--fixture', is_flag=True, help='使用内存数据库中的固定数据，而不是当前配置的数据库')
+    def check_query_plans(verbose, fixture):
+        """对前台路由的 SQL 执行 EXPLAIN，发现全表扫描时返回非零状态"""
+        from app.utils.query_plans import check_query_plans as run_check
+
+        results, errors = run_check(_check_app(app, fixture), db)
+        failures = _report_server_errors(errors)
+        for result in results:
+            failed = result['full_scans'] and not result['allowed']
+            failures += bool(failed)
+            if failed or verbose:
+                status = '全表扫描: ' + ', '.join(result['full_scans']) if result['full_scans'] else '使用索引'
+                click.echo(f'[{result["route"]}] {status}{"（已允许）" if result["allowed"] else ""}')
+                click.echo(f'  {" ".join(result["sql"].split())}')
+                for line in result['plan']:
+                    click.echo(f'    {line}')
+        if failures:
+            click.echo(f'{failures} 条语句出现全表扫描或路由出错', err=True)
+            raise SystemExit(1)
+        click.echo('所有语句均使用索引')
+
+    @app.cli.command()
+    @click.option('--verbose', is_flag=True, help='输出所有语句的列')
+    @click.option('--fixture', is_flag=True, help='使用内存数据库中的固定数据，而不是当前配置的数据库')
+    def check_listing_columns(verbose, fixture):
+        """检查列表页的 SQL 不查询文章正文，发现时返回非零状态"""
+        from app.utils.query_plans import check_listing_columns as run_check, select_columns
+
+        results, errors = run_check(_check_app(app, fixture), db)
+        failures = _report_server_errors(errors)
+        for result in results:
+            failures += result['loads_content']
+            if result['loads_content'] or verbose:
+                status = '查询了正文' if result['loads_content'] else '未查询正文'
+                click.echo(f'[{result["route"]}] {status}')
+                click.echo(f'  {" ".join(select_columns(result["sql"]).split())}')
+        if failures:
+            click.echo(f'{failures} 条列表语句查询了文章正文或路由出错', err=True)
+            raise SystemExit(1)
+        click.echo('列表语句均未查询文章正文')
+
+    @app.cli.command()
+    @click.option('--verbose', is_flag=True, help='输出超出预算路由执行的语句')
+    def check_query_counts(verbose):
+        """在固定数据上统计各路由（含后台列表）执行的 SQL 条数，超出 QUERY_BUDGETS 时返回非零状态"""
+        from app.utils.query_plans import count_queries
+
+        failures = 0
+        # 使用内存数据库中的固定数据，不受当前数据库数据量影响
+        for result in count_queries(_check_app(app, fixture=True), db):
+            # 固定数据中各路由都应正常返回，404 时统计的查询数没有意义
+            error = result['status'] != 200
+            failed = error or result['count'] > result['budget']
+            failures += failed
+            note = f'  返回 {result["status"]}' if error else '  超出预算' if failed else ''
+            click.echo(f'[{result["route"]}] {result["count"]}/{result["budget"]}{note}')
+            if failed and verbose:
+                for statement in result['statements']:
+                    click.echo(f'    {" ".join(statement.split())[:160]}')
+        if failures:
+            click.echo(f'{failures} 个路由的查询数超出预算或出错', err=True)
+            raise SystemExit(1)
+        click.echo('所有路由的查询数均在预算内')
+
+    @app.cli.command()
+    @click.pass_context
+    def check_queries(ctx):
+        """在固定数据上依次执行三项查询检查（查询计划、列表列、查询数），任一失败时返回非零状态（CI 使用）"""
+        failed = []
+        for command, options in ((check_query_plans, {'fixture': True}),
+                                 (check_listing_columns, {'fixture': True}),
+                                 (check_query_counts, {})):
+            click.echo(f'== {command.name} ==')
+            try:
+                ctx.invoke(command, verbose=False, **options)
+            except SystemExit as e:
+                if e.code:
+                    failed.append(command.name)
+        if failed:
+            click.echo(f'未通过: {", ".join(failed)}', err=True)
+            raise SystemExit(1)
+
+    @app.cli.command()
+    @click.option('--force', is_flag=True, help='重新生成所有预压缩文件')
+    def build_static(force):
+        """打包 CSS/JS 并为静态资源生成 .gz/.br 预压缩文件"""
+        from app.utils.asset_bundle import CRITICAL_CSS_BUDGET, DIST_DIR, build_assets
+        from app.utils.static_assets import precompress_static, static_assets
+
+        ctx = click.get_current_context()
+        ctx.invoke(subset_icons)
+
+        for filename, (before, after) in build_assets(
+                app.root_path, app.static_folder, app.static_url_path,
+                static_assets.hashed_filename).items():
+            click.echo(f'{filename}: {before / 1024:.1f} KB -> {after / 1024:.1f} KB')
+            if filename == f'{DIST_DIR}/css/critical.css' and after > CRITICAL_CSS_BUDGET:
+                click.echo(f'警告: 关键 CSS {after / 1024:.1f} KB 超过 {CRITICAL_CSS_BUDGET / 1024:.0f} KB，'
+                           f'会内联到每个页面中，请检查 base.html 外壳用到的类名', err=True)
+
+        for filename, size, sizes in precompress_static(app.static_folder, force=force):
+            compressed = '  '.join(f'{encoding}: {value / 1024:.1f} KB' for encoding, value in sizes.items())
+            click.echo(f'{filename} ({size / 1024:.1f} KB) -> {compressed or "跳过"}')
+
+
+def _report_server_errors(errors):
+    """输出返回 5xx 的路由（没有执行完查询，检查结果不可信），返回出错的路由数"""
+    import click
+
+    for route, status in errors.items():
+        click.echo(f'[{route}] 返回 {status}，查询未执行完')
+    return len(errors)
+
+
+def _check_app(app, fixture):
+    """查询检查使用的应用：fixture 为真时使用写入了固定数据的内存数据库（scripts/query_fixture.py）"""
+    if not fixture:
+        return app
+    from scripts.query_fixture import fixture_app
+    return fixture_app()
+
 
 def _init_extensions(app):
     """初始化 Flask 扩展"""
+    # 连接池参数、SQLite 只读连接池和 PRAGMA 调优
+    from app.utils.db_engine import configure_engines, init_engines
+    configure_engines(app)
     db.init_app(app)
+    init_engines(app, db)
+    if app.config['QUERY_GUARD_RAISE']:
+        from app.utils.query_guard import init_query_guard
+        init_query_guard(app, RoutingSession)
     login_manager.init_app(app)
     csrf.init_app(app)
 
     # 配置缓存
     cache.init_app(app)
 
+    # 请求耗时统计（需在数据库和缓存之后初始化）
+    from app.utils.request_metrics import request_metrics
+    request_metrics.init_app(app, db, cache)
+
+    # Prometheus 指标导出（/metrics）
+    from app.utils import metrics
+    metrics.init_app(app)
+
+    # 请求采样分析（/admin/profiles）
+    from app.utils import profiler
+    profiler.init_app(app)
+
+    # 静态资源（哈希文件名、预压缩、X-Sendfile）
+    from app.utils.static_assets import static_assets
+    static_assets.init_app(app)
+
     login_manager.login_view = 'auth.login'
     login_manager.login_message = '请先登录'
 
@@ -159,15 +483,15 @@ def _init_logging(app):
 
 def _init_database(app):
     """
-    初始化数据库表
+    检查数据库版本
 
-    在应用上下文中创建所有定义的数据库表。
-    仅在表不存在时创建，不会丢失已有数据。
+    启动时只读取一次版本号（见 app.utils.migrations），表结构变更通过
+    flask db upgrade 执行；开发和测试环境（AUTO_MIGRATE）自动执行迁移。
     """
+    from app.utils.migrations import check_schema
+
     try:
-        with app.app_context():
-            db.create_all()
+        check_schema(app, db)
     except Exception as e:
-        # 表已存在或其他错误，忽略
-        app.logger.debug(f'Database creation info: {e}')
-        pass
+        # 数据库暂不可用时不阻止应用启动
+        app.logger.warning(f'数据库版本检查失败: {e}')
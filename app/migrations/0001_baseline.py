@@ -0,0 +1,6 @@
+"""创建所有数据表"""
+
+
+def upgrade(ctx):
+    # 已有的表保持不变，后续脚本负责补齐列和索引
+    ctx.create_tables()
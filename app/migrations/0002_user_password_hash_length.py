@@ -0,0 +1,15 @@
+"""user.password_hash 加长到 VARCHAR(255)（scrypt 哈希超过 128 字符）"""
+
+
+def upgrade(ctx):
+    # SQLite 不限制 VARCHAR 长度，无需修改
+    if ctx.dialect != 'postgresql':
+        return
+
+    length = ctx.execute("""
+        SELECT character_maximum_length
+        FROM information_schema.columns
+        WHERE table_name = 'user' AND column_name = 'password_hash'
+    """).scalar()
+    if length and length < 255:
+        ctx.execute('ALTER TABLE "user" ALTER COLUMN password_hash TYPE VARCHAR(255)')
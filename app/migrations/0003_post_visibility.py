@@ -0,0 +1,6 @@
+"""文章可见性和访问密码"""
+
+
+def upgrade(ctx):
+    ctx.add_column('post', 'visibility', "VARCHAR(20) DEFAULT 'public'")
+    ctx.add_column('post', 'access_password', 'VARCHAR(100)')
@@ -0,0 +1,5 @@
+"""封面多尺寸衍生图"""
+
+
+def upgrade(ctx):
+    ctx.add_column('post', 'cover_variants', 'TEXT')
@@ -0,0 +1,9 @@
+"""文章列表、标签、定时发布查询的索引"""
+
+# PostgreSQL 上使用 CREATE INDEX CONCURRENTLY，不能在事务中执行
+TRANSACTIONAL = False
+
+
+def upgrade(ctx):
+    ctx.create_indexes('post')
+    ctx.create_indexes('post_tags')
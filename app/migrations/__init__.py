@@ -0,0 +1,6 @@
+"""
+数据库迁移脚本
+
+文件名为 <四位版本号>_<名称>.py，由 app.utils.migrations 按版本号顺序执行。
+脚本需要可重复执行：没有版本表的旧数据库会从 0001 开始依次执行所有脚本。
+"""
@@ -4,5 +4,6 @@ from app.models.user import User
 from app.models.post import Post, Category, Tag
 from app.models.friend_link import FriendLink
 from app.models.post_bookmark import PostBookmark
+from app.models.image_derivative import ImageDerivative
 
-__all__ = ['User', 'Post', 'Category', 'Tag', 'FriendLink', 'PostBookmark']
+__all__ = ['User', 'Post', 'Category', 'Tag', 'FriendLink', 'PostBookmark', 'ImageDerivative']
@@ -0,0 +1,36 @@
+"""
+图片衍生尺寸数据模型
+"""
+
+import json
+from datetime import datetime
+from app import db
+
+
+class ImageDerivative(db.Model):
+    """
+    上传封面的多尺寸衍生图记录
+
+    Attributes:
+        id: 记录唯一标识
+        source_url: 原图 URL（与 Post.cover_image 对应）
+        content_hash: 原图内容 SHA-256（用于去重）
+        variants: 衍生图 JSON，格式 {"webp": {"320": url, ...}, "jpeg": {...}}
+        status: 生成状态（pending / ready / failed）
+        created_at: 创建时间
+    """
+    __tablename__ = 'image_derivative'
+
+    id = db.Column(db.Integer, primary_key=True)
+    source_url = db.Column(db.String(500), unique=True, nullable=False)
+    content_hash = db.Column(db.String(64), index=True, nullable=False)
+    variants = db.Column(db.Text)
+    status = db.Column(db.String(20), default='pending')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def get_variants(self):
+        """解析衍生图 JSON"""
+        return json.loads(self.variants) if self.variants else {}
+
+    def __repr__(self):
+        return f'<ImageDerivative {self.content_hash[:12]} {self.status}>'
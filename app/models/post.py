@@ -7,13 +7,23 @@
 - Post: 文章（支持多对多标签关系）
 """
 
+import json
 from datetime import datetime
 from app import db
 
+# 封面 <picture> 中 <source> 的顺序（浏览器使用第一个支持的格式）：格式 → MIME 类型
+COVER_SOURCE_TYPES = (
+    ('avif', 'image/avif'),
+    ('webp', 'image/webp'),
+    ('jpeg', 'image/jpeg'),
+)
+
 # 多对多关系表：文章-标签
+# 主键 (post_id, tag_id) 只能按文章查标签，按标签查文章需要反向索引
 post_tags = db.Table('post_tags',
     db.Column('post_id', db.Integer, db.ForeignKey('post.id'), primary_key=True),
-    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True)
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True),
+    db.Index('ix_post_tags_tag_id_post_id', 'tag_id', 'post_id')
 )
 
 
@@ -79,6 +89,7 @@ class Post(db.Model):
         published: 是否已发布
         scheduled_at: 定时发布时间（可选）
         cover_image: 封面图片URL
+        cover_variants: 封面多尺寸衍生图 JSON（由 image_derivatives 生成）
     """
 
     __tablename__ = 'post'
@@ -91,8 +102,9 @@ class Post(db.Model):
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'))
 
     # 多对多关系：文章-标签
+    # 按需加载，需要标签的列表查询使用 selectinload(Post.tags)（N+1 检测见 app.utils.query_guard）
     # lazy='dynamic' 允许在 tag.posts 上使用过滤器
-    tags = db.relationship('Tag', secondary=post_tags, lazy='subquery',
+    tags = db.relationship('Tag', secondary=post_tags, lazy='select',
                           backref=db.backref('posts', lazy='dynamic'))
 
     views = db.Column(db.Integer, default=0)
@@ -102,11 +114,74 @@ class Post(db.Model):
     published = db.Column(db.Boolean, default=True)
     scheduled_at = db.Column(db.DateTime, nullable=True)
     cover_image = db.Column(db.String(500))
+    cover_variants = db.Column(db.Text)
 
     # 文章可见性: 'public' (所有人可见), 'private' (仅作者可见), 'password' (密码保护)
     visibility = db.Column(db.String(20), default='public')
     # 密码保护的访问密码（可选）
     access_password = db.Column(db.String(100))
 
+    # 列表页热点查询的索引（flask check-query-plans 检查各路由 SQL 是否仍走索引）
+    __table_args__ = (
+        # 首页、归档、RSS：published = true ORDER BY created_at DESC
+        db.Index('ix_post_published_created_at', 'published', 'created_at'),
+        # 分类页、同分类相关文章
+        db.Index('ix_post_category_published_created_at', 'category_id', 'published', 'created_at'),
+        # 热门文章（ORDER BY views DESC）和总浏览量
+        db.Index('ix_post_published_views', 'published', 'views'),
+        # 站点地图（ORDER BY updated_at DESC）
+        db.Index('ix_post_published_updated_at', 'published', 'updated_at'),
+        # 后台文章列表
+        db.Index('ix_post_user_id_created_at', 'user_id', 'created_at'),
+        # 定时发布：只索引设置了发布时间的文章
+        db.Index('ix_post_scheduled_at', 'scheduled_at',
+                 sqlite_where=db.text('scheduled_at IS NOT NULL'),
+                 postgresql_where=db.text('scheduled_at IS NOT NULL')),
+    )
+
+    @classmethod
+    def listing_option(cls):
+        """
+        列表页的加载选项：不查询正文
+
+        首页、分类、标签、归档、搜索等列表只显示标题、摘要、封面和标签，正文 Markdown 可能很大。
+        正文设置 raiseload，列表模板中误用 post.content 时直接报错，而不是逐篇补查。
+        flask check-listing-columns 检查列表路由的 SELECT 列中没有正文。
+        """
+        return db.defer(cls.content, raiseload=True)
+
+    def cover_srcset(self, image_format):
+        """
+        生成封面图的 srcset 属性值
+
+        Args:
+            image_format: 衍生图格式（webp / jpeg / avif）
+
+        Returns:
+            str: 形如 "url 320w, url 640w"，没有衍生图时返回空字符串
+        """
+        if not self.cover_variants:
+            return ''
+        try:
+            widths = json.loads(self.cover_variants).get(image_format) or {}
+        except ValueError:
+            return ''
+        return ', '.join(f'{url} {width}w' for width, url in
+                         sorted(widths.items(), key=lambda item: int(item[0])))
+
+    def cover_sources(self):
+        """
+        封面图 <picture> 的 <source> 列表
+
+        Returns:
+            list: [(MIME 类型, srcset)]，只包含实际生成了衍生图的格式，按 COVER_SOURCE_TYPES 排序
+        """
+        sources = []
+        for image_format, mime_type in COVER_SOURCE_TYPES:
+            srcset = self.cover_srcset(image_format)
+            if srcset:
+                sources.append((mime_type, srcset))
+        return sources
+
     def __repr__(self):
         return f'<Post {self.title}>'
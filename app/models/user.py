@@ -3,14 +3,14 @@
 
 该模块定义用户相关的数据模型：
 - User: 用户模型（集成 Flask-Login）
-- load_user: Flask-Login 用户加载器
+- load_user: Flask-Login 用户加载器（返回缓存的只读快照，见 app.utils.user_cache）
 """
 
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login_manager
+from app.utils.passwords import hash_password, verify_password, needs_rehash
 
 
 class User(UserMixin, db.Model):
@@ -49,24 +49,30 @@ class User(UserMixin, db.Model):
         """
         设置用户密码
 
-        使用 werkzeug 的安全哈希算法存储密码
+        按 PASSWORD_HASH_METHOD 配置的算法和成本存储密码哈希
 
         Args:
             password (str): 明文密码
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         """
         验证用户密码
 
+        验证成功且存储的哈希参数已过期时，用当前配置重新哈希（由调用方提交）。
+
         Args:
             password (str): 明文密码
 
         Returns:
             bool: 密码是否正确
         """
-        return check_password_hash(self.password_hash, password)
+        if not verify_password(self.password_hash, password):
+            return False
+        if needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -77,12 +83,18 @@ def load_user(user_id):
     """
     Flask-Login 用户加载器
 
-    根据用户ID从数据库加载用户对象
+    根据用户ID加载用户。启用 USER_CACHE_ENABLED 时返回缓存的只读快照，
+    未命中缓存时才查询数据库。
 
     Args:
         user_id: 用户ID
 
     Returns:
-        User|None: 用户对象，如果不存在则返回 None
+        UserSnapshot|User|None: 用户快照（或用户对象），如果不存在则返回 None
     """
-    return User.query.get(int(user_id))
+    from flask import current_app
+    from app.utils.user_cache import get_user_cache
+
+    if not current_app.config['USER_CACHE_ENABLED']:
+        return User.query.get(int(user_id))
+    return get_user_cache().get(int(user_id), User.query.get)
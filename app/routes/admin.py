@@ -10,10 +10,11 @@
 - 图片上传处理
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app, abort, send_file
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 import os
 import re
 import logging
@@ -24,9 +25,9 @@ from app.models.friend_link import FriendLink
 from app.models.post_bookmark import PostBookmark
 from app import db, cache
 from app.utils.storage import get_storage, reset_storage
+from app.utils.image_derivatives import schedule_derivatives, attach_derivatives
+from app.utils.image_upload import spool_upload, downscale_image, file_sha256, remove_quietly
 from app.routes.main import get_hot_posts, get_hot_tags, get_total_views
-from PIL import Image
-from io import BytesIO
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -49,37 +50,19 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in ALLOWED_IMAGE_EXTENSIONS
 
 
-def generate_unique_filename(filename):
-    """生成唯一的文件名（使用时间戳）"""
-    name, ext = os.path.splitext(filename)
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    return f"{timestamp}{ext}"
-
-
-def process_image(file_path):
+def generate_unique_filename(filename, digest):
     """
-    处理图片：验证并优化图片
+    生成内容寻址的文件名
 
-    Args:
-        file_path: 图片文件路径
+    按内容 SHA-256 命名并以前两位分目录：同一秒内的不同上传不会互相覆盖，
+    相同图片重复上传得到同一个文件名。
 
-    Returns:
-        tuple: (success: bool, message: str)
+    Args:
+        filename: 原始文件名（取扩展名）
+        digest: 文件内容的 SHA-256
     """
-    try:
-        with Image.open(file_path) as img:
-            # 验证图片尺寸
-            if img.size[0] > MAX_IMAGE_SIZE[0] or img.size[1] > MAX_IMAGE_SIZE[1]:
-                # 调整图片大小
-                img.thumbnail(MAX_IMAGE_SIZE, Image.Resampling.LANCZOS)
-                img.save(file_path, quality=95, optimize=True)
-            else:
-                # 优化图片大小
-                img.save(file_path, quality=95, optimize=True)
-
-        return True, "图片处理成功"
-    except Exception as e:
-        return False, f"图片处理失败: {str(e)}"
+    ext = os.path.splitext(filename)[1].lower()
+    return f"{digest[:2]}/{digest}{ext}"
 
 
 # ==================== 仪表板 ====================
@@ -95,7 +78,8 @@ def dashboard():
     Returns:
         str: 渲染后的仪表板页面HTML
     """
-    posts = Post.query.filter_by(user_id=current_user.id).order_by(Post.created_at.desc()).all()
+    posts = Post.query.options(Post.listing_option())\
+        .filter_by(user_id=current_user.id).order_by(Post.created_at.desc()).all()
     categories = Category.query.all()
     tags = Tag.query.all()
     return render_template('admin/dashboard.html', posts=posts, categories=categories, tags=tags)
@@ -110,7 +94,7 @@ def upload_cover_image():
     上传封面图片或内容图片
 
     处理图片上传、验证和优化
-    支持本地存储和 GitHub 仓库存储
+    支持本地存储和 GitHub 仓库存储，上传内容全程落盘流式处理
 
     Returns:
         JSON响应：包含成功状态和图片URL或错误消息
@@ -132,66 +116,36 @@ def upload_cover_image():
             'message': f'不支持的文件类型。支持的格式: {", ".join(ALLOWED_IMAGE_EXTENSIONS)}'
         }), 400
 
+    spooled_path = None
+    processed_path = None
     try:
-        # 生成唯一文件名
-        filename = generate_unique_filename(file.filename)
-
-        # 获取存储后端
-        storage = get_storage()
-
-        # 检测存储类型
-        is_github = hasattr(storage, 'token')
+        # 上传内容分块落盘，不整体读入内存
+        file.stream.seek(0)
+        spooled_path = spool_upload(file.stream, os.path.splitext(file.filename)[1])
 
-        if is_github:
-            # 使用 GitHub 存储：直接上传文件对象
-            object_name = f'covers/{filename}'
-
-            # 先处理图片（验证和优化）
-            file.seek(0)
-            img_data = file.read()
-
-            # 使用 PIL 处理图片
-            try:
-                with Image.open(BytesIO(img_data)) as img:
-                    # 验证图片尺寸
-                    if img.size[0] > MAX_IMAGE_SIZE[0] or img.size[1] > MAX_IMAGE_SIZE[1]:
-                        # 调整图片大小
-                        img.thumbnail(MAX_IMAGE_SIZE, Image.Resampling.LANCZOS)
-
-                    # 保存到内存
-                    output = BytesIO()
-                    img_format = img.format or 'JPEG'
-                    img.save(output, format=img_format, quality=95, optimize=True)
-                    output.seek(0)
-
-                    # 上传到 GitHub
-                    if storage.upload_fileobj(output, object_name):
-                        image_url = storage.get_url(object_name)
-                    else:
-                        return jsonify({'success': False, 'message': '上传到 GitHub 失败'}), 500
-            except Exception as e:
-                return jsonify({'success': False, 'message': f'图片处理失败: {str(e)}'}), 400
-
-        else:
-            # 使用本地存储
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            os.makedirs(upload_folder, exist_ok=True)
-
-            file_path = os.path.join(upload_folder, filename)
+        # 处理图片（验证和缩小），结果写入新的临时文件
+        try:
+            processed_path, _ = downscale_image(spooled_path, MAX_IMAGE_SIZE)
+        except Exception as e:
+            return jsonify({'success': False, 'message': f'图片处理失败: {str(e)}'}), 400
 
-            # 保存文件
-            file.save(file_path)
+        # 按处理后的内容生成唯一文件名
+        digest = file_sha256(processed_path)
+        object_name = f'covers/{generate_unique_filename(file.filename, digest)}'
 
-            # 处理图片（验证和优化）
-            success, message = process_image(file_path)
-            if not success:
-                # 处理失败，删除文件
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                return jsonify({'success': False, 'message': message}), 400
+        # 获取存储后端并流式上传（本地存储或 GitHub 仓库）
+        storage = get_storage()
+        with open(processed_path, 'rb') as f:
+            if not storage.upload_fileobj(f, object_name):
+                return jsonify({'success': False, 'message': '图片上传失败'}), 500
+        image_url = storage.get_url(object_name)
 
-            # 返回本地存储的图片URL
-            image_url = f'/static/uploads/covers/{filename}'
+        # 后台生成多尺寸衍生图（srcset），临时文件交由后台任务删除
+        try:
+            schedule_derivatives(processed_path, image_url, remove_after=True, digest=digest)
+            processed_path = None
+        except Exception as e:
+            logger.warning(f'衍生图任务登记失败: {str(e)}')
 
         return jsonify({
             'success': True,
@@ -202,6 +156,9 @@ def upload_cover_image():
     except Exception as e:
         logger.error(f'图片上传失败: {str(e)}')
         return jsonify({'success': False, 'message': f'上传失败: {str(e)}'}), 500
+    finally:
+        remove_quietly(spooled_path)
+        remove_quietly(processed_path)
 
 
 @bp.route('/api/detect-local-images', methods=['POST'])
@@ -480,6 +437,7 @@ def new_post():
             if tag:
                 post.tags.append(tag)
 
+        attach_derivatives(post)
         db.session.add(post)
         db.session.commit()
 
@@ -585,8 +543,9 @@ def edit_post(post_id):
             cover_image = generate_cover_image(post.title, category_name, tags, post.content, storage=storage)
 
         # 更新封面图（如果有新的）
-        if cover_image:
+        if cover_image and cover_image != post.cover_image:
             post.cover_image = cover_image
+            attach_derivatives(post)
 
         # 更新标签关联
         post.tags.clear()
@@ -742,6 +701,10 @@ def import_batch():
     success_count = 0
     failed_files = []
 
+    from app.utils.image_generator import generate_cover_images
+
+    # 先解析所有文件，封面统一并发生成上传
+    parsed = []
     for file in files:
         if file.filename == '':
             continue
@@ -765,28 +728,37 @@ def import_batch():
             if not title:
                 title = os.path.splitext(file.filename)[0]
 
-            # 自动生成封面图（传递内容用于提取关键词）
-            from app.utils.image_generator import generate_cover_image
-            from app.utils.storage import get_storage
-            storage = get_storage()
-            cover_image = generate_cover_image(title, None, None, body_content, storage=storage)
-
-            # 创建文章
-            post = Post(
-                title=title,
-                content=body_content,
-                summary=summary,
-                user_id=current_user.id,
-                cover_image=cover_image,
-                published=False
-            )
-
-            db.session.add(post)
-            success_count += 1
+            parsed.append((title, summary, body_content))
 
         except Exception as e:
             failed_files.append(f"{file.filename} ({str(e)})")
 
+    storage = get_storage()
+
+    # 所有封面并发上传并合并为一次存储提交（GitHub 图床下避免逐张提交触发限流）
+    try:
+        with storage.batch(f'Import {len(parsed)} posts: upload covers'):
+            cover_images = generate_cover_images([title for title, _, _ in parsed], storage=storage)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f'批量导入封面提交失败: {str(e)}')
+        return jsonify({'success': False, 'message': f'封面上传失败: {str(e)}'}), 500
+
+    for (title, summary, body_content), cover_image in zip(parsed, cover_images):
+        # 封面生成失败不影响导入，文章先不带封面
+        # 创建文章
+        post = Post(
+            title=title,
+            content=body_content,
+            summary=summary,
+            user_id=current_user.id,
+            cover_image=cover_image,
+            published=False
+        )
+
+        db.session.add(post)
+        success_count += 1
+
     try:
         db.session.commit()
         message = f'成功导入 {success_count} 个文件'
@@ -965,7 +937,7 @@ def regenerate_covers():
     if not posts:
         return jsonify({'success': True, 'message': '没有文章', 'count': 0})
 
-    from app.utils.image_generator import generate_cover_from_post
+    from app.utils.image_generator import generate_cover_images
     from app.utils.storage import get_storage
     storage = get_storage()
 
@@ -975,27 +947,36 @@ def regenerate_covers():
     failed_posts = []
     skipped_posts = []  # 记录跳过的文章
 
+    targets = []
     for post in posts:
         # 检查是否有封面图
         if post.cover_image:
             # 判断是否是本地存储的自动生成封面图
             # 本地生成的封面图路径格式：/static/uploads/covers/cover_
             # 用户上传的封面图或 GitHub 图床不匹配此格式
-            if '/static/uploads/covers/cover_' in post.cover_image:
-                # 是本地自动生成的，可以重新生成
-                pass
-            else:
+            if '/static/uploads/covers/cover_' not in post.cover_image:
                 # 是用户上传的图片或已上传到 GitHub 的，跳过
                 skipped_count += 1
                 skipped_posts.append(post.title)
                 continue
+        targets.append(post)
 
-        try:
-            post.cover_image = generate_cover_from_post(post, storage=storage)
-            success_count += 1
-        except Exception as e:
+    # 所有封面并发上传并合并为一次存储提交
+    try:
+        with storage.batch(f'Regenerate covers for {len(targets)} posts'):
+            cover_images = generate_cover_images([post.title for post in targets], storage=storage)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f'封面批量提交失败: {str(e)}')
+        return jsonify({'success': False, 'message': f'封面上传失败: {str(e)}'}), 500
+
+    for post, cover_image in zip(targets, cover_images):
+        if cover_image is None:
             failed_count += 1
-            failed_posts.append(f"{post.title}: {str(e)}")
+            failed_posts.append(f"{post.title}: 封面图生成失败")
+            continue
+        post.cover_image = cover_image
+        success_count += 1
 
     try:
         db.session.commit()
@@ -1057,6 +1038,71 @@ def api_generate_summary():
         return jsonify({'error': '生成摘要失败'}), 500
 
 
+@bp.route('/api/rate-limits')
+@login_required
+def api_rate_limits():
+    """
+    限流统计 API
+
+    返回当前 worker 中各端点被限流拒绝的请求数
+
+    Returns:
+        JSON: { "rejected": {端点: 次数} }
+    """
+    from app.security import get_rate_limit_metrics
+
+    return jsonify({'rejected': get_rate_limit_metrics()})
+
+
+@bp.route('/api/request-metrics')
+@login_required
+def api_request_metrics():
+    """
+    请求耗时统计 API
+
+    返回当前 worker 中各端点的请求数、平均/最大耗时、SQL 条数与耗时、渲染耗时、
+    缓存命中数以及耗时直方图
+
+    Returns:
+        JSON: { "endpoints": {端点: 统计}, "buckets_ms": [桶上限] }
+    """
+    from app.utils.request_metrics import BUCKETS_MS, request_metrics
+
+    return jsonify({'endpoints': request_metrics.snapshot(), 'buckets_ms': list(BUCKETS_MS)})
+
+
+@bp.route('/profiles')
+@login_required
+def profiles():
+    """
+    请求分析结果页面
+
+    按耗时降序列出采样分析保存的请求及其自身耗时最多的函数
+    """
+    from app.utils.profiler import list_profiles
+
+    config = current_app.config
+    return render_template('admin/profiles.html',
+                           profiles=list_profiles(config['PROFILE_DIR']),
+                           enabled=config['PROFILE_ENABLED'],
+                           sample_rate=config['PROFILE_SAMPLE_RATE'],
+                           header=config['PROFILE_HEADER'],
+                           max_files=config['PROFILE_MAX_FILES'])
+
+
+@bp.route('/profiles/<profile_id>.prof')
+@login_required
+def download_profile(profile_id):
+    """下载 pstats 格式的分析结果"""
+    from app.utils.profiler import profile_file
+
+    path = profile_file(current_app.config['PROFILE_DIR'], profile_id)
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                     download_name=f'{profile_id}.prof')
+
+
 @bp.route('/bookmarks')
 @login_required
 def bookmarks():
@@ -1065,8 +1111,11 @@ def bookmarks():
 
     显示所有被用户收藏的文章列表
     """
-    # 获取所有收藏记录，按收藏时间倒序
-    bookmarks_query = PostBookmark.query.order_by(PostBookmark.created_at.desc())
+    # 获取所有收藏记录，按收藏时间倒序（一并加载模板用到的文章、分类和收藏用户）
+    bookmarks_query = PostBookmark.query.options(
+        joinedload(PostBookmark.post).options(Post.listing_option(), joinedload(Post.category)),
+        joinedload(PostBookmark.user),
+    ).order_by(PostBookmark.created_at.desc())
 
     # 分页
     page = request.args.get('page', 1, type=int)
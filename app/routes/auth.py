@@ -15,6 +15,7 @@ from app.forms import LoginForm, RegisterForm, ResetPasswordRequestForm, ResetPa
 from app.models.user import User
 from app import db
 from app.security import get_client_ip, record_login_attempt, login_rate_limit
+from app.utils.user_cache import invalidate_user
 import secrets
 from datetime import datetime, timedelta
 
@@ -85,6 +86,9 @@ def login():
         if user and user.check_password(form.password.data):
             # 登录成功，清除失败记录
             record_login_attempt(client_ip, success=True)
+            # 保存按新参数重新生成的密码哈希
+            if db.session.is_modified(user):
+                db.session.commit()
             login_user(user, remember=form.remember_me.data)
             next_page = request.args.get('next')
             return redirect(next_page) if next_page else redirect(url_for('main.index'))
@@ -187,6 +191,7 @@ def reset_password(token):
         user.reset_token = None
         user.reset_token_expires = None
         db.session.commit()
+        invalidate_user(user.id)
 
         flash('密码已重置，请使用新密码登录')
         return redirect(url_for('auth.login'))
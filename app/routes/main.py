@@ -9,17 +9,19 @@
 """
 
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, Response, current_app, session
-from app.models.post import Post, Category, Tag
+from app.models.post import Post, Category, Tag, post_tags
 from app.models.user import User
 from app.models.friend_link import FriendLink
 from app.models.post_bookmark import PostBookmark
 from flask_login import login_required, current_user
 from app import db, cache, csrf
+from app.security import rate_limit
+from app.utils.view_counter import record_view, pending_views
 import markdown
 import bleach
 from sqlalchemy import func
-from sqlalchemy.orm import joinedload
-from datetime import datetime
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from datetime import datetime, timezone
 from feedgen.feed import FeedGenerator
 
 bp = Blueprint('main', __name__)
@@ -90,6 +92,7 @@ def clean_html(html_content):
 def get_hot_posts():
     """获取热门文章（缓存5分钟）"""
     return Post.query.options(
+        Post.listing_option(),
         joinedload(Post.category)
     ).filter_by(published=True).order_by(Post.views.desc()).limit(5).all()
 
@@ -134,6 +137,7 @@ def get_related_posts(current_post, limit=4):
         # 如果没有标签，返回同分类的最新文章
         if current_post.category:
             return Post.query.options(
+                Post.listing_option(),
                 joinedload(Post.category)
             ).filter(
                 Post.category_id == current_post.category_id,
@@ -148,6 +152,7 @@ def get_related_posts(current_post, limit=4):
     # 查询有相同标签的文章
     from sqlalchemy import or_
     related = Post.query.options(
+        Post.listing_option(),
         joinedload(Post.category)
     ).filter(
         Post.id != current_post.id,
@@ -174,10 +179,12 @@ def index():
     page = request.args.get('page', 1, type=int)
     per_page = 10
 
-    # 使用 eager loading 优化查询，一次性加载关联数据
+    # 使用 eager loading 优化查询，一次性加载关联数据（列表不加载正文）
     posts = Post.query.options(
+        Post.listing_option(),
         joinedload(Post.category),
-        joinedload(Post.tags)
+        joinedload(Post.author),
+        selectinload(Post.tags)
     ).filter_by(published=True).order_by(Post.created_at.desc())
     posts = posts.paginate(page=page, per_page=per_page, error_out=False)
 
@@ -217,7 +224,7 @@ def post(post_id):
     """
     post = Post.query.options(
         joinedload(Post.category),
-        joinedload(Post.tags)
+        selectinload(Post.tags)
     ).get_or_404(post_id)
 
     # 检查文章可见性
@@ -246,9 +253,9 @@ def post(post_id):
             else:
                 return render_template('post_password.html', post=post)
 
-    # 增加浏览量
-    post.views += 1
-    db.session.commit()
+    # 增加浏览量：进程内累加后批量写入（见 app.utils.view_counter），显示时加上未写入的部分
+    record_view(current_app._get_current_object(), post.id)
+    views = (post.views or 0) + pending_views(post.id)
 
     # 将 Markdown 转换为 HTML
     html_content = markdown.markdown(
@@ -262,7 +269,7 @@ def post(post_id):
     # 获取相关文章（基于相同标签）
     related_posts = get_related_posts(post)
 
-    return render_template('post.html', post=post, related_posts=related_posts)
+    return render_template('post.html', post=post, views=views, related_posts=related_posts)
 
 @bp.route('/about')
 def about():
@@ -293,11 +300,29 @@ def category(category_id):
     per_page = 10
     # 使用 eager loading 优化查询
     posts = Post.query.options(
-        joinedload(Post.tags)
+        Post.listing_option(),
+        selectinload(Post.tags)
     ).filter_by(category_id=category_id, published=True)\
                      .order_by(Post.created_at.desc())
     posts = posts.paginate(page=page, per_page=per_page, error_out=False)
-    return render_template('category.html', category=category, posts=posts)
+
+    # 一次查询本页所有文章的收藏数（模板中逐篇 post.bookmarks.count() 是 N+1）
+    bookmark_counts = dict(db.session.query(
+        PostBookmark.post_id, func.count(PostBookmark.id)
+    ).filter(
+        PostBookmark.post_id.in_([post.id for post in posts.items])
+    ).group_by(PostBookmark.post_id).all()) if posts.items else {}
+
+    # 侧边栏相关标签的文章数同样一次查询（模板中逐个 tag.posts.count() 是 N+1）
+    tag_ids = {tag.id for post in posts.items for tag in post.tags}
+    tag_counts = dict(db.session.query(
+        post_tags.c.tag_id, func.count(post_tags.c.post_id)
+    ).filter(
+        post_tags.c.tag_id.in_(tag_ids)
+    ).group_by(post_tags.c.tag_id).all()) if tag_ids else {}
+
+    return render_template('category.html', category=category, posts=posts,
+                          bookmark_counts=bookmark_counts, tag_counts=tag_counts)
 
 
 @bp.route('/tag/<int:tag_id>')
@@ -317,10 +342,13 @@ def tag(tag_id):
     page = request.args.get('page', 1, type=int)
     per_page = 10
 
-    # 使用 join 来预加载 category，避免 N+1 查询
-    posts_query = tag.posts.filter_by(published=True)\
-                          .join(Post.category)\
-                          .order_by(Post.created_at.desc())
+    # 预加载分类、作者和标签，避免 N+1 查询（join 只能过滤，不会填充 post.category）
+    posts_query = tag.posts.options(
+        Post.listing_option(),
+        joinedload(Post.category),
+        joinedload(Post.author),
+        selectinload(Post.tags)
+    ).filter_by(published=True).order_by(Post.created_at.desc())
     posts = posts_query.paginate(page=page, per_page=per_page, error_out=False)
     return render_template('tag.html', tag=tag, posts=posts)
 
@@ -346,6 +374,7 @@ def categories():
 
 
 @bp.route('/search')
+@rate_limit(30, 60)
 def search():
     """
     搜索功能路由
@@ -365,7 +394,8 @@ def search():
 
     if query:
         search = f"%{query}%"
-        posts = Post.query.filter(
+        # 正文只参与匹配，不需要查询出来；模板显示每篇文章的分类，一起预加载
+        posts = Post.query.options(Post.listing_option(), joinedload(Post.category)).filter(
             Post.published == True,
             db.or_(
                 Post.title.like(search),
@@ -374,13 +404,14 @@ def search():
             )
         ).order_by(Post.created_at.desc())
     else:
-        posts = Post.query.filter_by(published=True)
+        posts = Post.query.options(Post.listing_option(), joinedload(Post.category)).filter_by(published=True)
 
     posts = posts.paginate(page=page, per_page=per_page, error_out=False)
     return render_template('search.html', posts=posts, query=query)
 
 
 @bp.route('/api/search/suggest')
+@rate_limit(60, 60, burst=20)
 def search_suggest():
     """
     搜索建议 API
@@ -403,6 +434,7 @@ def search_suggest():
 
     # 搜索文章标题
     posts = Post.query.options(
+        Post.listing_option(),
         joinedload(Post.category)
     ).filter(
         Post.published == True,
@@ -455,7 +487,9 @@ def sitemap():
     from flask import Response
 
     # 获取所有已发布的文章
-    posts = Post.query.filter_by(published=True).order_by(Post.updated_at.desc()).all()
+    posts = Post.query.options(
+        load_only(Post.id, Post.updated_at)
+    ).filter_by(published=True).order_by(Post.updated_at.desc()).all()
 
     # 获取所有分类
     categories = Category.query.all()
@@ -569,8 +603,9 @@ def archive():
     """
     # 获取所有已发布的文章，按创建时间倒序
     posts = Post.query.options(
+        Post.listing_option(),
         joinedload(Post.category),
-        joinedload(Post.tags)
+        selectinload(Post.tags)
     ).filter_by(published=True).order_by(Post.created_at.desc()).all()
 
     # 按年月分组
@@ -608,6 +643,7 @@ def archive():
 
 @bp.route('/feed.xml')
 @bp.route('/rss.xml')
+@rate_limit(20, 60)
 def rss_feed():
     """
     RSS订阅路由
@@ -623,7 +659,7 @@ def rss_feed():
     posts = Post.query.options(
         joinedload(Post.category),
         joinedload(Post.author),
-        joinedload(Post.tags)
+        selectinload(Post.tags)
     ).filter_by(published=True).order_by(Post.created_at.desc()).limit(20).all()
 
     # 创建RSS feed
@@ -646,8 +682,9 @@ def rss_feed():
         entry.link(href=post_url)
         entry.description(description)
         entry.content(markdown.markdown(post.content, extensions=MD_EXTENSIONS), type='html')
-        entry.published(post.created_at)
-        entry.updated(post.updated_at)
+        # 数据库中为不带时区的 UTC 时间，feedgen 要求带时区
+        entry.published(post.created_at.replace(tzinfo=timezone.utc))
+        entry.updated(post.updated_at.replace(tzinfo=timezone.utc))
         entry.author({'name': post.author.username})
 
         # 添加分类
@@ -668,6 +705,7 @@ def rss_feed():
 @bp.route('/api/post/<int:post_id>/bookmark', methods=['POST'])
 @login_required
 @csrf.exempt
+@rate_limit(20, 60)
 def toggle_bookmark(post_id):
     """
     文章收藏 API
@@ -738,180 +776,6 @@ def get_post_bookmarks(post_id):
     })
 
 
-@bp.route('/init-db')
-def init_database():
-    """
-    数据库初始化路由
-
-    用于部署后手动初始化数据库表和默认管理员用户
-    访问该路由将创建所有数据表和默认管理员账号
-
-    Returns:
-        JSON: 初始化结果
-    """
-    from app import db
-    from app.models.friend_link import FriendLink
-
-    try:
-        # 创建所有数据库表
-        db.create_all()
-        current_app.logger.info('数据库表创建成功')
-
-        # 检查是否需要迁移 password_hash 列（从 VARCHAR(128) 改为 VARCHAR(255)）
-        try:
-            # 检查当前列长度
-            from sqlalchemy import text
-            with db.engine.connect() as conn:
-                # PostgreSQL 查询列信息
-                result = conn.execute(text("""
-                    SELECT character_maximum_length
-                    FROM information_schema.columns
-                    WHERE table_name = 'user'
-                    AND column_name = 'password_hash'
-                """))
-                row = result.fetchone()
-                if row and row[0] and row[0] < 255:
-                    current_app.logger.info(f'检测到 password_hash 列长度为 {row[0]}，需要迁移到 255')
-                    # 执行迁移
-                    conn.execute(text("""
-                        ALTER TABLE "user"
-                        ALTER COLUMN password_hash TYPE VARCHAR(255)
-                    """))
-                    conn.commit()
-                    current_app.logger.info('password_hash 列迁移成功')
-        except Exception as migrate_error:
-            current_app.logger.warning(f'迁移检查/执行失败: {str(migrate_error)}')
-
-        # 检查是否需要添加文章可见性列
-        try:
-            from sqlalchemy import text
-            with db.engine.connect() as conn:
-                # 检查 visibility 列是否存在
-                result = conn.execute(text("""
-                    SELECT column_name
-                    FROM information_schema.columns
-                    WHERE table_name = 'post'
-                    AND column_name = 'visibility'
-                """))
-                if not result.fetchone():
-                    current_app.logger.info('检测到缺少 visibility 列，正在添加...')
-                    conn.execute(text("""
-                        ALTER TABLE post ADD COLUMN visibility VARCHAR(20) DEFAULT 'public'
-                    """))
-                    conn.commit()
-                    current_app.logger.info('visibility 列添加成功')
-
-                # 检查 access_password 列是否存在
-                result = conn.execute(text("""
-                    SELECT column_name
-                    FROM information_schema.columns
-                    WHERE table_name = 'post'
-                    AND column_name = 'access_password'
-                """))
-                if not result.fetchone():
-                    current_app.logger.info('检测到缺少 access_password 列，正在添加...')
-                    conn.execute(text("""
-                        ALTER TABLE post ADD COLUMN access_password VARCHAR(100)
-                    """))
-                    conn.commit()
-                    current_app.logger.info('access_password 列添加成功')
-        except Exception as migrate_error:
-            current_app.logger.warning(f'可见性列迁移检查/执行失败: {str(migrate_error)}')
-
-        # 检查管理员是否已存在
-        admin = User.query.filter_by(username='admin01').first()
-        if not admin:
-            # 创建默认管理员
-            admin = User(
-                username='admin01',
-                email='admin01@blog.local'
-            )
-            admin.set_password('123456')
-            db.session.add(admin)
-            db.session.commit()
-            current_app.logger.info('默认管理员账号创建成功')
-
-        return jsonify({
-            'success': True,
-            'message': '数据库初始化成功！',
-            'admin_created': admin is not None or User.query.filter_by(username='admin01').first() is not None
-        })
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f'数据库初始化失败: {str(e)}')
-        return jsonify({
-            'success': False,
-            'message': f'初始化失败: {str(e)}'
-        }), 500
-
-
-@bp.route('/migrate-db')
-def migrate_database():
-    """
-    数据库迁移路由
-
-    用于添加新的数据库列，不修改现有数据
-    访问该路由将添加文章可见性和密码列
-
-    Returns:
-        JSON: 迁移结果
-    """
-    from app import db
-    from sqlalchemy import text
-
-    results = []
-
-    try:
-        with db.engine.connect() as conn:
-            # 检查并添加 visibility 列
-            result = conn.execute(text("""
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_name = 'post'
-                AND column_name = 'visibility'
-            """))
-            if not result.fetchone():
-                current_app.logger.info('正在添加 visibility 列...')
-                conn.execute(text("""
-                    ALTER TABLE post ADD COLUMN visibility VARCHAR(20) DEFAULT 'public'
-                """))
-                conn.commit()
-                results.append('visibility 列添加成功')
-                current_app.logger.info('visibility 列添加成功')
-            else:
-                results.append('visibility 列已存在')
-
-            # 检查并添加 access_password 列
-            result = conn.execute(text("""
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_name = 'post'
-                AND column_name = 'access_password'
-            """))
-            if not result.fetchone():
-                current_app.logger.info('正在添加 access_password 列...')
-                conn.execute(text("""
-                    ALTER TABLE post ADD COLUMN access_password VARCHAR(100)
-                """))
-                conn.commit()
-                results.append('access_password 列添加成功')
-                current_app.logger.info('access_password 列添加成功')
-            else:
-                results.append('access_password 列已存在')
-
-        return jsonify({
-            'success': True,
-            'message': '数据库迁移完成！',
-            'results': results
-        })
-    except Exception as e:
-        current_app.logger.error(f'数据库迁移失败: {str(e)}')
-        return jsonify({
-            'success': False,
-            'message': f'迁移失败: {str(e)}'
-        }), 500
-
-
 @bp.route('/check-db')
 def check_database():
     """
@@ -4,73 +4,76 @@
 该模块提供安全相关的功能：
 - 登录失败限制
 - IP 封禁
-- 请求限流
+- 请求限流（令牌桶）
 """
 
-import time
+import math
+import logging
+import threading
+from collections import Counter
 from functools import wraps
-from flask import session, request, abort
-from datetime import datetime, timedelta
+from flask import request, current_app, jsonify
+from werkzeug.exceptions import TooManyRequests
+from app.utils import metrics
+from app.utils.rate_limit import get_rate_limit_store
 
+# 配置日志
+logger = logging.getLogger(__name__)
 
-# 存储登录失败尝试的字典 (生产环境应使用 Redis)
-login_attempts = {}
-blocked_ips = {}
+# 各端点被限流拒绝的请求数（进程内）
+_rejected_requests = Counter()
+_metrics_lock = threading.Lock()
 
 
 def get_client_ip():
-    """获取客户端 IP 地址"""
-    if request.headers.getlist("X-Forwarded-For"):
-        return request.headers.getlist("X-Forwarded-For")[0]
+    """
+    获取客户端 IP 地址
+
+    使用 remote_addr：部署在反向代理后时由 ProxyFix 按可信代理层数（PROXY_FIX_X_FOR）
+    从 X-Forwarded-For 中取出，客户端自行添加的地址不会用作限流键。
+    """
     return request.remote_addr
 
 
+def _login_keys(ip):
+    """登录失败计数键和封禁键"""
+    return f'login:fail:{ip}', f'login:block:{ip}'
+
+
 def is_ip_blocked(ip):
     """检查 IP 是否被封禁"""
-    if ip in blocked_ips:
-        block_info = blocked_ips[ip]
-        # 检查封禁时间是否已过期
-        if datetime.now() > block_info['expire_time']:
-            del blocked_ips[ip]
-            return False
-        return True
-    return False
+    return get_remaining_block_time(ip) > 0
 
 
 def get_remaining_block_time(ip):
     """获取剩余封禁时间（秒）"""
-    if ip in blocked_ips:
-        remaining = blocked_ips[ip]['expire_time'] - datetime.now()
-        return max(0, int(remaining.total_seconds()))
-    return 0
+    block_seconds, _ = get_rate_limit_store().check(*_login_keys(ip))
+    return block_seconds
 
 
 def record_login_attempt(ip, success=False):
     """
     记录登录尝试
 
+    失败计数和封禁状态保存在共享的限流存储中（见 app.utils.rate_limit），
+    多个 worker 共用同一份计数。
+
     Args:
         ip: 客户端 IP
         success: 登录是否成功
     """
     if success:
         # 登录成功，清除失败记录
-        if ip in login_attempts:
-            del login_attempts[ip]
+        clear_login_attempts(ip)
     else:
-        # 记录失败尝试
-        if ip not in login_attempts:
-            login_attempts[ip] = {'count': 1, 'last_attempt': datetime.now()}
-        else:
-            login_attempts[ip]['count'] += 1
-            login_attempts[ip]['last_attempt'] = datetime.now()
-
-            # 检查是否需要封禁 IP
-            if login_attempts[ip]['count'] >= 5:
-                # 封禁 30 分钟
-                blocked_ips[ip] = {
-                    'expire_time': datetime.now() + timedelta(minutes=30)
-                }
+        # 记录失败尝试，达到上限时封禁 IP
+        config = current_app.config
+        get_rate_limit_store().record_failure(
+            *_login_keys(ip),
+            limit=config['LOGIN_MAX_ATTEMPTS'],
+            window=config['LOGIN_ATTEMPT_WINDOW'],
+            block_seconds=config['LOGIN_BLOCK_SECONDS']
+        )
 
 
 def check_login_attempts(ip):
@@ -83,24 +86,14 @@ def check_login_attempts(ip):
     Returns:
         tuple: (是否允许登录, 剩余尝试次数/封禁时间)
     """
-    # 检查 IP 是否被封禁
-    if is_ip_blocked(ip):
-        return False, {'blocked': True, 'seconds': get_remaining_block_time(ip)}
+    max_attempts = current_app.config['LOGIN_MAX_ATTEMPTS']
+    block_seconds, attempts = get_rate_limit_store().check(*_login_keys(ip))
 
-    # 检查失败次数
-    if ip in login_attempts:
-        attempts = login_attempts[ip]['count']
-        if attempts >= 5:
-            # 超过最大尝试次数，封禁 IP
-            blocked_ips[ip] = {
-                'expire_time': datetime.now() + timedelta(minutes=30)
-            }
-            return False, {'blocked': True, 'seconds': 1800}
-        else:
-            remaining = 5 - attempts
-            return True, {'remaining': remaining}
+    # 检查 IP 是否被封禁
+    if block_seconds > 0:
+        return False, {'blocked': True, 'seconds': block_seconds}
 
-    return True, {'remaining': 5}
+    return True, {'remaining': max(0, max_attempts - attempts)}
 
 
 def login_rate_limit(f):
@@ -115,10 +108,13 @@ def login_rate_limit(f):
         allowed, info = check_login_attempts(ip)
 
         if not allowed:
+            _record_rejection(request.endpoint)
             if info.get('blocked'):
-                abort(429, description=f'登录尝试次数过多，请在 {info["seconds"] // 60} 分钟后重试')
-            else:
-                abort(429, description='登录尝试次数过多')
+                raise TooManyRequests(
+                    description=f'登录尝试次数过多，请在 {info["seconds"] // 60} 分钟后重试',
+                    retry_after=info['seconds']
+                )
+            raise TooManyRequests(description='登录尝试次数过多')
 
         return f(*args, **kwargs)
     return decorated_function
@@ -126,5 +122,65 @@ def login_rate_limit(f):
 
 def clear_login_attempts(ip):
     """清除指定 IP 的登录失败记录"""
-    if ip in login_attempts:
-        del login_attempts[ip]
+    counter_key, _ = _login_keys(ip)
+    get_rate_limit_store().clear(counter_key)
+
+
+def _record_rejection(endpoint):
+    """记录被限流拒绝的请求"""
+    with _metrics_lock:
+        _rejected_requests[endpoint] += 1
+    metrics.RATE_LIMITED.labels(endpoint).inc()
+
+
+def get_rate_limit_metrics():
+    """
+    获取各端点被限流拒绝的请求数
+
+    Returns:
+        dict: {端点名: 拒绝次数}（当前 worker 进程内的计数）
+    """
+    with _metrics_lock:
+        return dict(_rejected_requests)
+
+
+def rate_limit(limit, period=60, burst=None, scope=None):
+    """
+    令牌桶限流装饰器
+
+    每个客户端 IP 在每个端点上有独立的令牌桶：容量为 burst（默认等于 limit），
+    每 period 秒补充 limit 个令牌。令牌桶保存在共享的限流存储中（见 app.utils.rate_limit）。
+    超限时返回 429 和 Retry-After；/api/ 下的接口返回 JSON。
+
+    Args:
+        limit: 每个周期允许的请求数
+        period: 周期（秒）
+        burst: 允许的突发请求数
+        scope: 桶名（默认取端点名，多个端点共用一个桶时指定）
+    """
+    capacity = burst or limit
+    rate = limit / period
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_app.config.get('RATE_LIMIT_ENABLED', True):
+                return f(*args, **kwargs)
+
+            bucket = scope or request.endpoint
+            ip = get_client_ip()
+            allowed, retry_after, _ = get_rate_limit_store().take_token(f'bucket:{bucket}:{ip}', rate, capacity)
+            if allowed:
+                return f(*args, **kwargs)
+
+            _record_rejection(bucket)
+            logger.info(f'请求被限流: {bucket} {ip}')
+            retry_after = max(1, math.ceil(retry_after))
+            if request.path.startswith('/api/'):
+                response = jsonify({'success': False, 'message': '请求过于频繁，请稍后再试'})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+            raise TooManyRequests(description='请求过于频繁，请稍后再试', retry_after=retry_after)
+        return decorated_function
+    return decorator
@@ -0,0 +1,337 @@
+/**
+ * 全站公共脚本：夜间模式、导航栏搜索等
+ */
+
+// 夜间模式切换（带动画）
+const themeToggle = document.getElementById('themeToggle');
+const html = document.documentElement;
+
+// 从 localStorage 读取主题设置
+const savedTheme = localStorage.getItem('theme') || 'light';
+html.setAttribute('data-theme', savedTheme);
+updateThemeIcon(savedTheme);
+
+themeToggle.addEventListener('click', () => {
+    // 添加旋转动画
+    themeToggle.style.transform = 'rotate(180deg)';
+
+    const currentTheme = html.getAttribute('data-theme');
+    const newTheme = currentTheme === 'light' ? 'dark' : 'light';
+
+    // 先添加过渡类
+    html.classList.add('theme-transitioning');
+
+    // 切换主题
+    html.setAttribute('data-theme', newTheme);
+    localStorage.setItem('theme', newTheme);
+    updateThemeIcon(newTheme);
+
+    // 移除过渡类
+    setTimeout(() => {
+        html.classList.remove('theme-transitioning');
+        themeToggle.style.transform = 'rotate(0deg)';
+    }, 300);
+});
+
+function updateThemeIcon(theme) {
+    const moonIcon = themeToggle.querySelector('.icon-moon');
+    const sunIcon = themeToggle.querySelector('.icon-sun');
+
+    if (theme === 'light') {
+        moonIcon.style.opacity = '1';
+        sunIcon.style.opacity = '0';
+    } else {
+        moonIcon.style.opacity = '0';
+        sunIcon.style.opacity = '1';
+    }
+}
+
+// 页面加载时的主题动画
+document.addEventListener('DOMContentLoaded', () => {
+    html.classList.add('theme-loaded');
+    setTimeout(() => {
+        html.classList.remove('theme-loaded');
+    }, 500);
+
+    // 初始化字体设置
+    initFontSettings();
+});
+
+// ========================================
+// 字体设置功能
+// ========================================
+
+function initFontSettings() {
+    const fontToggle = document.getElementById('fontToggle');
+
+    // 创建字体设置面板
+    const panel = document.createElement('div');
+    panel.className = 'font-settings-panel';
+    panel.id = 'fontSettingsPanel';
+    panel.innerHTML = `
+        <div class="font-settings-header">
+            <h6><i class="bi bi-type"></i> 字体设置</h6>
+            <button class="font-settings-close" onclick="toggleFontSettings()">
+                <i class="bi bi-x-lg"></i>
+            </button>
+        </div>
+        <div class="font-setting-group">
+            <label class="font-setting-label">字体大小</label>
+            <div class="font-size-controls">
+                <button class="font-size-btn" onclick="changeFontSize(-1)">
+                    <i class="bi bi-dash"></i>
+                </button>
+                <span class="font-size-display" id="fontSizeDisplay">16px</span>
+                <button class="font-size-btn" onclick="changeFontSize(1)">
+                    <i class="bi bi-plus"></i>
+                </button>
+            </div>
+        </div>
+        <div class="font-setting-group">
+            <label class="font-setting-label">行高</label>
+            <input type="range" class="line-height-slider" id="lineHeightSlider"
+                   min="1.5" max="2.5" step="0.1" value="1.8"
+                   oninput="changeLineHeight(this.value)">
+            <div style="text-align: center; margin-top: 5px; font-size: 12px; color: var(--text-light);">
+                <span id="lineHeightDisplay">1.8</span>
+            </div>
+        </div>
+        <div class="font-setting-group">
+            <label class="font-setting-label">字体</label>
+            <select class="font-family-select" id="fontFamilySelect" onchange="changeFontFamily(this.value)">
+                <option value="default">默认字体</option>
+                <option value="serif">宋体/衬线</option>
+                <option value="sans">黑体/无衬线</option>
+                <option value="mono">等宽字体</option>
+            </select>
+        </div>
+        <button class="font-reset-btn" onclick="resetFontSettings()">
+            <i class="bi bi-arrow-counterclockwise"></i> 恢复默认设置
+        </button>
+    `;
+    document.body.appendChild(panel);
+
+    if (fontToggle) {
+        fontToggle.addEventListener('click', () => {
+            toggleFontSettings();
+        });
+    }
+
+    // 加载保存的设置
+    loadFontSettings();
+}
+
+function toggleFontSettings() {
+    const panel = document.getElementById('fontSettingsPanel');
+    panel.classList.toggle('show');
+}
+
+// 字体设置变量
+let currentFontSize = 16;
+let currentLineHeight = 1.8;
+let currentFontFamily = 'default';
+
+function changeFontSize(delta) {
+    currentFontSize = Math.max(12, Math.min(24, currentFontSize + delta));
+    applyFontSize(currentFontSize);
+    saveFontSettings();
+}
+
+function applyFontSize(size) {
+    const content = document.querySelector('.typora-content');
+    if (content) {
+        content.style.fontSize = size + 'px';
+    }
+    document.getElementById('fontSizeDisplay').textContent = size + 'px';
+}
+
+function changeLineHeight(value) {
+    currentLineHeight = parseFloat(value);
+    applyLineHeight(currentLineHeight);
+    saveFontSettings();
+}
+
+function applyLineHeight(height) {
+    const content = document.querySelector('.typora-content');
+    if (content) {
+        content.style.lineHeight = height;
+    }
+    document.getElementById('lineHeightDisplay').textContent = height.toFixed(1);
+}
+
+function changeFontFamily(family) {
+    currentFontFamily = family;
+    applyFontFamily(family);
+    saveFontSettings();
+}
+
+function applyFontFamily(family) {
+    const content = document.querySelector('.typora-content');
+    if (!content) return;
+
+    const fontFamilies = {
+        'default': '-apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif',
+        'serif': '"SimSun", "Songti SC", serif',
+        'sans': '"Microsoft YaHei", "PingFang SC", sans-serif',
+        'mono': '"Consolas", "Monaco", monospace'
+    };
+
+    content.style.fontFamily = fontFamilies[family] || fontFamilies['default'];
+}
+
+function saveFontSettings() {
+    localStorage.setItem('fontSettings', JSON.stringify({
+        fontSize: currentFontSize,
+        lineHeight: currentLineHeight,
+        fontFamily: currentFontFamily
+    }));
+}
+
+function loadFontSettings() {
+    const saved = localStorage.getItem('fontSettings');
+    if (saved) {
+        const settings = JSON.parse(saved);
+        currentFontSize = settings.fontSize || 16;
+        currentLineHeight = settings.lineHeight || 1.8;
+        currentFontFamily = settings.fontFamily || 'default';
+
+        applyFontSize(currentFontSize);
+        applyLineHeight(currentLineHeight);
+        applyFontFamily(currentFontFamily);
+
+        // 更新控件值
+        document.getElementById('lineHeightSlider').value = currentLineHeight;
+        document.getElementById('fontFamilySelect').value = currentFontFamily;
+    }
+}
+
+function resetFontSettings() {
+    currentFontSize = 16;
+    currentLineHeight = 1.8;
+    currentFontFamily = 'default';
+
+    applyFontSize(currentFontSize);
+    applyLineHeight(currentLineHeight);
+    applyFontFamily(currentFontFamily);
+
+    document.getElementById('lineHeightSlider').value = currentLineHeight;
+    document.getElementById('fontFamilySelect').value = currentFontFamily;
+
+    localStorage.removeItem('fontSettings');
+}
+
+// 点击页面其他地方关闭字体设置面板
+document.addEventListener('click', (e) => {
+    const panel = document.getElementById('fontSettingsPanel');
+    const fontToggle = document.getElementById('fontToggle');
+    if (panel && !panel.contains(e.target) && (!fontToggle || !fontToggle.contains(e.target))) {
+        panel.classList.remove('show');
+    }
+});
+
+// ========================================
+// 导航栏搜索功能
+// ========================================
+
+const navbarSearchInput = document.getElementById('navbarSearchInput');
+const navbarSearchSuggestions = document.getElementById('navbarSearchSuggestions');
+const navbarSuggestionsList = document.getElementById('navbarSuggestionsList');
+const navbarSuggestionsLoading = document.getElementById('navbarSuggestionsLoading');
+let navbarSearchTimeout = null;
+
+if (navbarSearchInput) {
+    navbarSearchInput.addEventListener('input', function() {
+        const query = this.value.trim();
+
+        // 清除之前的定时器
+        if (navbarSearchTimeout) {
+            clearTimeout(navbarSearchTimeout);
+        }
+
+        // 隐藏建议框
+        if (query.length === 0) {
+            navbarSearchSuggestions.classList.remove('show');
+            return;
+        }
+
+        // 延迟 300ms 后执行搜索
+        navbarSearchTimeout = setTimeout(() => {
+            performLiveSearch(query);
+        }, 300);
+    });
+
+    // 点击页面其他地方隐藏建议框
+    document.addEventListener('click', function(e) {
+        if (!navbarSearchInput.contains(e.target) && !navbarSearchSuggestions.contains(e.target)) {
+            navbarSearchSuggestions.classList.remove('show');
+        }
+    });
+
+    // 按回车键提交搜索
+    navbarSearchInput.addEventListener('keydown', function(e) {
+        if (e.key === 'Enter' && this.value.trim()) {
+            e.preventDefault();
+            goToSearchPage();
+            navbarSearchSuggestions.classList.remove('show');
+        }
+    });
+}
+
+// 实时搜索建议
+function performLiveSearch(query) {
+    if (!query || query.length < 1) {
+        return;
+    }
+
+    // 显示加载状态
+    navbarSuggestionsLoading.style.display = 'block';
+    navbarSuggestionsList.innerHTML = '';
+    navbarSearchSuggestions.classList.add('show');
+
+    fetch(`/api/search/suggest?q=${encodeURIComponent(query)}`)
+        .then(response => response.json())
+        .then(data => {
+            navbarSuggestionsLoading.style.display = 'none';
+
+            if (data.suggestions && data.suggestions.length > 0) {
+                navbarSuggestionsList.innerHTML = data.suggestions.map(item => {
+                    // 根据类型选择图标
+                    let iconClass = 'file-earmark-text';
+                    if (item.type === 'tag') iconClass = 'tag';
+                    else if (item.type === 'category') iconClass = 'folder';
+
+                    return `
+                    <a href="${item.url}" class="suggestion-item">
+                        <div class="suggestion-icon">
+                            <i class="bi bi-${iconClass}"></i>
+                        </div>
+                        <div class="suggestion-content">
+                            <div class="suggestion-title">${item.title}</div>
+                            ${item.summary ? `<div class="suggestion-summary">${item.summary}</div>` : ''}
+                        </div>
+                    </a>
+                `}).join('');
+            } else {
+                navbarSuggestionsList.innerHTML = '<div class="suggestion-empty">没有找到相关文章</div>';
+            }
+        })
+        .catch(error => {
+            navbarSuggestionsLoading.style.display = 'none';
+            navbarSuggestionsList.innerHTML = '<div class="suggestion-empty">搜索失败，请重试</div>';
+        });
+}
+
+// 跳转到搜索页面
+function performNavbarSearch(event) {
+    if (event) {
+        event.preventDefault();
+    }
+    goToSearchPage();
+}
+
+function goToSearchPage() {
+    const query = navbarSearchInput.value.trim();
+    if (query) {
+        window.location.href = `/search?q=${encodeURIComponent(query)}`;
+    }
+}
@@ -0,0 +1,765 @@
+/**
+ * 文章页脚本
+ *
+ * 依赖模板中注入的 window.POST_PAGE：postId、authenticated、csrfToken、defaultImage
+ */
+
+// 回顶部功能
+const backToTopBtn = document.getElementById('backToTop');
+
+window.addEventListener('scroll', () => {
+    if (window.pageYOffset > 300) {
+        backToTopBtn.classList.add('show');
+    } else {
+        backToTopBtn.classList.remove('show');
+    }
+});
+
+backToTopBtn.addEventListener('click', () => {
+    window.scrollTo({
+        top: 0,
+        behavior: 'smooth'
+    });
+});
+
+// 目录功能
+const tocToggle = document.getElementById('tocToggle');
+const tocPanel = document.getElementById('toc');
+const tocContent = document.getElementById('tocContent');
+
+tocToggle.addEventListener('click', () => {
+    tocPanel.classList.toggle('collapsed');
+    const icon = tocToggle.querySelector('i');
+    if (tocPanel.classList.contains('collapsed')) {
+        icon.classList.remove('bi-chevron-left');
+        icon.classList.add('bi-chevron-right');
+    } else {
+        icon.classList.remove('bi-chevron-right');
+        icon.classList.add('bi-chevron-left');
+    }
+});
+
+// 生成目录
+function generateTOC() {
+    const content = document.getElementById('articleContent');
+    const headings = content.querySelectorAll('h1, h2, h3, h4, h5, h6');
+
+    if (headings.length === 0) {
+        tocContent.innerHTML = '<div class="toc-empty">暂无目录</div>';
+        return;
+    }
+
+    // 清理标题文本，移除数字前缀
+    function cleanHeadingText(text) {
+        return text
+            .replace(/^[\d]+\.\s*/, '')  // 移除 "1. " 等数字前缀
+            .replace(/^流程\d+[：:]\s*/, '')  // 移除 "流程1：" 等
+            .replace(/^[一二三四五六七八九十]+[、．]\s*/, '')  // 移除中文数字前缀
+            .trim();
+    }
+
+    // 构建嵌套结构的目录
+    const tocStructure = [];
+    const stack = [];
+
+    headings.forEach((heading, index) => {
+        const headingLevel = parseInt(heading.tagName.substring(1));
+        const headingText = cleanHeadingText(heading.textContent.trim());
+        const headingId = 'heading-' + index;
+
+        heading.id = headingId;
+
+        const item = {
+            level: headingLevel,
+            text: headingText,
+            id: headingId,
+            children: []
+        };
+
+        // 找到合适的父级
+        while (stack.length > 0 && stack[stack.length - 1].level >= headingLevel) {
+            stack.pop();
+        }
+
+        if (stack.length === 0) {
+            tocStructure.push(item);
+        } else {
+            stack[stack.length - 1].children.push(item);
+        }
+
+        stack.push(item);
+    });
+
+    // 渲染目录HTML
+    function renderTOC(items) {
+        if (!items || items.length === 0) return '';
+
+        let html = '<ul class="toc-list">';
+        items.forEach(item => {
+            html += `
+                <li class="toc-item toc-level-${item.level}">
+                    <a href="#${item.id}" class="toc-link" data-target="${item.id}">
+                        ${item.text}
+                    </a>
+                    ${renderTOC(item.children)}
+                </li>
+            `;
+        });
+        html += '</ul>';
+        return html;
+    }
+
+    tocContent.innerHTML = renderTOC(tocStructure);
+
+    // 目录点击事件
+    document.querySelectorAll('.toc-link').forEach(link => {
+        link.addEventListener('click', (e) => {
+            e.preventDefault();
+            const targetId = link.getAttribute('data-target');
+            const targetElement = document.getElementById(targetId);
+
+            if (targetElement) {
+                const navbarHeight = document.querySelector('.navbar').offsetHeight;
+                const offsetTop = targetElement.offsetTop - navbarHeight - 20;
+
+                window.scrollTo({
+                    top: offsetTop,
+                    behavior: 'smooth'
+                });
+
+                // 更新活动状态
+                document.querySelectorAll('.toc-link').forEach(l => l.classList.remove('active'));
+                link.classList.add('active');
+            }
+        });
+    });
+}
+
+// 页面加载后生成目录
+document.addEventListener('DOMContentLoaded', () => {
+    generateTOC();
+
+    // 滚动时高亮当前目录项
+    const headings = document.querySelectorAll('#articleContent h1, #articleContent h2, #articleContent h3');
+    const tocLinks = document.querySelectorAll('.toc-link');
+
+    window.addEventListener('scroll', () => {
+        const navbarHeight = document.querySelector('.navbar').offsetHeight;
+        const scrollPosition = window.scrollY + navbarHeight + 100;
+        let currentHeading = null;
+
+        headings.forEach(heading => {
+            const headingTop = heading.offsetTop;
+            if (scrollPosition >= headingTop) {
+                currentHeading = heading;
+            }
+        });
+
+        if (currentHeading) {
+            tocLinks.forEach(link => {
+                link.classList.remove('active');
+                if (link.getAttribute('data-target') === currentHeading.id) {
+                    link.classList.add('active');
+                }
+            });
+        } else {
+            // 如果没有找到当前标题，清除所有活动状态
+            tocLinks.forEach(link => link.classList.remove('active'));
+        }
+    });
+});
+
+// 代码块复制功能和语言识别
+function addCopyButtons() {
+    const codeBlocks = document.querySelectorAll('pre code');
+
+    codeBlocks.forEach((codeBlock, index) => {
+        const pre = codeBlock.parentElement;
+
+        // 识别代码语言
+        let language = 'CODE';
+        const classList = Array.from(codeBlock.classList);
+        for (const cls of classList) {
+            if (cls.startsWith('language-')) {
+                language = cls.replace('language-', '').toUpperCase();
+                break;
+            }
+        }
+
+        // 为 .codehilite 容器添加语言标签
+        if (pre.classList.contains('codehilite') || pre.parentElement?.classList.contains('codehilite')) {
+            const hiliteContainer = pre.classList.contains('codehilite') ? pre : pre.parentElement;
+            hiliteContainer.setAttribute('data-language', language);
+        }
+
+        // 创建复制按钮
+        const copyBtn = document.createElement('button');
+        copyBtn.className = 'copy-button';
+        copyBtn.innerHTML = '<i class="bi bi-clipboard"></i>';
+        copyBtn.title = '复制代码';
+        copyBtn.dataset.index = index;
+
+        // 添加按钮到代码块
+        pre.style.position = 'relative';
+        pre.appendChild(copyBtn);
+
+        // 复制事件
+        copyBtn.addEventListener('click', async () => {
+            const code = codeBlock.textContent;
+
+            try {
+                await navigator.clipboard.writeText(code);
+                copyBtn.innerHTML = '<i class="bi bi-check"></i>';
+                copyBtn.classList.add('copied');
+
+                setTimeout(() => {
+                    copyBtn.innerHTML = '<i class="bi bi-clipboard"></i>';
+                    copyBtn.classList.remove('copied');
+                }, 2000);
+            } catch (err) {
+                // 降级方案
+                const textarea = document.createElement('textarea');
+                textarea.value = code;
+                textarea.style.position = 'fixed';
+                textarea.style.opacity = '0';
+                document.body.appendChild(textarea);
+                textarea.select();
+
+                try {
+                    document.execCommand('copy');
+                    copyBtn.innerHTML = '<i class="bi bi-check"></i>';
+                    copyBtn.classList.add('copied');
+
+                    setTimeout(() => {
+                        copyBtn.innerHTML = '<i class="bi bi-clipboard"></i>';
+                        copyBtn.classList.remove('copied');
+                    }, 2000);
+                } catch (e) {
+                    copyBtn.innerHTML = '<i class="bi bi-x"></i>';
+                    copyBtn.classList.add('error');
+                }
+
+                document.body.removeChild(textarea);
+            }
+        });
+    });
+}
+
+// 页面加载完成后添加复制按钮
+document.addEventListener('DOMContentLoaded', addCopyButtons);
+
+// 图片懒加载
+document.addEventListener('DOMContentLoaded', function() {
+    const images = document.querySelectorAll('.typora-content img');
+
+    const imageObserver = new IntersectionObserver(function(entries, observer) {
+        entries.forEach(function(entry) {
+            if (entry.isIntersecting) {
+                const img = entry.target;
+                img.classList.add('loaded');
+                observer.unobserve(img);
+            }
+        });
+    });
+
+    images.forEach(function(img) {
+        img.setAttribute('loading', 'lazy');
+        imageObserver.observe(img);
+    });
+
+    // 初始化阅读进度条
+    initReadingProgress();
+});
+
+// ========================================
+// 阅读进度条功能
+// ========================================
+
+function initReadingProgress() {
+    const progressBar = document.getElementById('readingProgress');
+    const articleContent = document.getElementById('articleContent');
+
+    if (!progressBar || !articleContent) return;
+
+    window.addEventListener('scroll', function() {
+        const windowHeight = window.innerHeight;
+        const documentHeight = document.documentElement.scrollHeight - windowHeight;
+        const scrolled = window.scrollY;
+        const progress = (scrolled / documentHeight) * 100;
+
+        progressBar.style.width = Math.min(progress, 100) + '%';
+
+        // 阅读完成时添加完成样式
+        if (progress >= 100) {
+            progressBar.classList.add('complete');
+        } else {
+            progressBar.classList.remove('complete');
+        }
+    });
+}
+
+// ========================================
+// 文章收藏功能
+// ========================================
+
+const postId = POST_PAGE.postId;
+let isBookmarked = false; // 当前用户是否已收藏
+let bookmarkCount = 0; // 当前收藏数
+
+// 初始化收藏状态
+document.addEventListener('DOMContentLoaded', function() {
+    initBookmarkButton();
+});
+
+function initBookmarkButton() {
+    const bookmarkBtn = document.getElementById('bookmarkBtn');
+    const bookmarkIcon = document.getElementById('bookmarkIcon');
+    const bookmarkCountEl = document.getElementById('bookmarkCount');
+
+    if (!bookmarkBtn || !bookmarkIcon || !bookmarkCountEl) return;
+
+    // 获取收藏状态
+    fetchBookmarkStatus();
+}
+
+async function fetchBookmarkStatus() {
+    try {
+        const response = await fetch(`/api/post/${postId}/bookmarks`);
+        const data = await response.json();
+        bookmarkCount = data.bookmark_count;
+        isBookmarked = data.bookmarked;
+        updateBookmarkUI();
+    } catch (error) {
+        console.error('获取收藏状态失败:', error);
+    }
+}
+
+async function toggleBookmark() {
+    if (!POST_PAGE.authenticated) {
+        showActionFeedback('请先登录后收藏');
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/post/${postId}/bookmark`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': POST_PAGE.csrfToken
+            }
+        });
+
+        if (response.ok) {
+            const data = await response.json();
+            isBookmarked = data.bookmarked;
+            bookmarkCount = data.bookmark_count;
+            updateBookmarkUI();
+
+            // 显示文字提示
+            if (isBookmarked) {
+                showActionFeedback('✓ 收藏成功！');
+            } else {
+                showActionFeedback('✓ 已取消收藏');
+            }
+        } else {
+            // 尝试读取错误信息
+            let errorMsg = '操作失败，请重试';
+            try {
+                const errorData = await response.json();
+                if (errorData.message) {
+                    errorMsg = errorData.message;
+                }
+            } catch (e) {
+                console.error('Response not JSON:', response.status);
+            }
+            showActionFeedback(errorMsg);
+        }
+    } catch (error) {
+        console.error('收藏操作失败:', error);
+        showActionFeedback('网络错误，请重试');
+    }
+}
+
+function updateBookmarkUI() {
+    const bookmarkBtn = document.getElementById('bookmarkBtn');
+    const bookmarkIcon = document.getElementById('bookmarkIcon');
+    const bookmarkText = document.getElementById('bookmarkText');
+    const bookmarkCountEl = document.getElementById('bookmarkCount');
+
+    if (bookmarkIcon) {
+        bookmarkIcon.classList.toggle('bi-bookmark-fill', isBookmarked);
+        bookmarkIcon.classList.toggle('bi-bookmark', !isBookmarked);
+    }
+
+    if (bookmarkBtn) {
+        bookmarkBtn.classList.toggle('active', isBookmarked);
+    }
+
+    if (bookmarkText) {
+        bookmarkText.textContent = isBookmarked ? '已收藏' : '收藏';
+    }
+
+    if (bookmarkCountEl) {
+        bookmarkCountEl.textContent = bookmarkCount;
+    }
+}
+
+function showActionFeedback(message) {
+    const feedback = document.getElementById('actionFeedback');
+    if (feedback) {
+        feedback.textContent = message;
+        feedback.classList.add('show');
+        setTimeout(() => {
+            feedback.classList.remove('show');
+        }, 2000);
+    }
+}
+
+// 分享功能
+function getArticleUrl() {
+    return window.location.href;
+}
+
+function getArticleTitle() {
+    const titleElement = document.querySelector('.typora-title');
+    return titleElement ? titleElement.textContent : document.title;
+}
+
+function shareToWeibo() {
+    const url = encodeURIComponent(getArticleUrl());
+    const title = encodeURIComponent(getArticleTitle());
+    window.open(`https://service.weibo.com/share/share.php?url=${url}&title=${title}`, '_blank');
+    showActionFeedback('正在打开微博分享...');
+}
+
+function shareToQQ() {
+    const url = encodeURIComponent(getArticleUrl());
+    const title = encodeURIComponent(getArticleTitle());
+    window.open(`https://connect.qq.com/widget/shareqq/index.html?url=${url}&title=${title}`, '_blank');
+    showActionFeedback('正在打开QQ分享...');
+}
+
+function shareToWechat() {
+    showActionFeedback('请使用微信扫一扫功能扫描屏幕二维码分享');
+}
+
+function copyArticleLink() {
+    const url = getArticleUrl();
+
+    // 使用现代 API
+    if (navigator.clipboard && navigator.clipboard.writeText) {
+        navigator.clipboard.writeText(url).then(function() {
+            showActionFeedback('✓ 链接已复制到剪贴板！');
+        }).catch(function() {
+            fallbackCopyLink(url);
+        });
+    } else {
+        fallbackCopyLink(url);
+    }
+}
+
+function fallbackCopyLink(text) {
+    const textarea = document.createElement('textarea');
+    textarea.value = text;
+    textarea.style.position = 'fixed';
+    textarea.style.opacity = '0';
+    document.body.appendChild(textarea);
+    textarea.select();
+
+    try {
+        document.execCommand('copy');
+        showActionFeedback('✓ 链接已复制到剪贴板！');
+    } catch (e) {
+        showActionFeedback('复制失败，请手动复制链接');
+    }
+
+    document.body.removeChild(textarea);
+}
+
+// ========================================
+// 图片懒加载优化
+// ========================================
+
+// 为文章内容中的所有图片添加懒加载和错误处理
+function optimizeImages() {
+    const images = document.querySelectorAll('#articleContent img, .typora-content img, article img');
+
+    images.forEach(img => {
+        // 如果已经有 loading 属性则跳过
+        if (img.hasAttribute('data-loading-optimized')) {
+            return;
+        }
+        img.setAttribute('data-loading-optimized', 'true');
+
+        // 添加懒加载属性
+        if (!img.hasAttribute('loading')) {
+            img.setAttribute('loading', 'lazy');
+        }
+
+        // 添加异步解码属性
+        if (!img.hasAttribute('decoding')) {
+            img.setAttribute('decoding', 'async');
+        }
+
+        // 检查图片是否已经加载完成
+        if (img.complete && img.naturalHeight !== 0) {
+            // 图片已加载完成，直接显示
+            img.classList.add('image-loaded');
+        } else {
+            // 图片未加载，添加加载类
+            img.classList.add('lazy-image');
+        }
+
+        // 加载完成处理
+        img.addEventListener('load', function() {
+            this.classList.add('image-loaded');
+            this.classList.remove('lazy-image');
+        });
+
+        // 错误处理 - 图片加载失败时显示默认图片
+        img.addEventListener('error', function() {
+            // 只处理一次错误，避免无限循环
+            if (!this.hasAttribute('data-error-handled')) {
+                this.setAttribute('data-error-handled', 'true');
+                this.classList.add('image-error');
+                this.classList.remove('lazy-image');
+
+                // 设置默认图片
+                const defaultImg = POST_PAGE.defaultImage;
+                if (this.src !== defaultImg) {
+                    this.src = defaultImg;
+                    this.alt = "图片加载失败";
+                }
+            }
+        });
+    });
+}
+
+// 页面加载完成后优化图片
+if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', optimizeImages);
+} else {
+    optimizeImages();
+}
+
+// 为相关文章的图片也添加优化
+const relatedImages = document.querySelectorAll('.related-post-img img');
+relatedImages.forEach(img => {
+    if (!img.hasAttribute('loading')) {
+        img.setAttribute('loading', 'lazy');
+    }
+    if (!img.hasAttribute('decoding')) {
+        img.setAttribute('decoding', 'async');
+    }
+    img.classList.add('lazy-image');
+    img.addEventListener('load', function() {
+        this.classList.add('image-loaded');
+    });
+});
+
+// 图片占位符功能
+function createImagePlaceholder(container) {
+    const placeholder = document.createElement('div');
+    placeholder.className = 'image-placeholder';
+    placeholder.innerHTML = '<div class="image-loading-indicator"><i class="bi bi-hourglass-split"></i> 加载中...</div>';
+    return placeholder;
+}
+
+// 图片渐进式加载（可选功能）
+function enableProgressiveLoading() {
+    const images = document.querySelectorAll('img[data-src]');
+
+    const imageObserver = new IntersectionObserver((entries, observer) => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                const img = entry.target;
+                const src = img.getAttribute('data-src');
+
+                if (src) {
+                    // 先加载低质量占位图
+                    if (img.hasAttribute('data-src-low')) {
+                        img.src = img.getAttribute('data-src-low');
+                    }
+
+                    // 然后加载高质量图片
+                    const highQualityImg = new Image();
+                    highQualityImg.src = src;
+                    highQualityImg.onload = function() {
+                        img.src = src;
+                        img.classList.add('image-loaded');
+                    };
+
+                    observer.unobserve(img);
+                }
+            }
+        });
+    }, {
+        rootMargin: '50px',
+        threshold: 0.01
+    });
+
+    images.forEach(img => imageObserver.observe(img));
+}
+
+// 启用渐进式加载（如果需要）
+// enableProgressiveLoading();
+
+// ========================================
+// 图片灯箱功能
+// ========================================
+
+// 创建灯箱 HTML 结构
+function createLightbox() {
+    const lightboxHTML = `
+        <div id="imageLightbox" class="lightbox" style="display: none;">
+            <div class="lightbox-overlay" onclick="closeLightbox()"></div>
+            <div class="lightbox-content">
+                <button class="lightbox-close" onclick="closeLightbox()" title="关闭">
+                    <i class="bi bi-x-lg"></i>
+                </button>
+                <button class="lightbox-prev" onclick="showPrevImage()" title="上一张">
+                    <i class="bi bi-chevron-left"></i>
+                </button>
+                <button class="lightbox-next" onclick="showNextImage()" title="下一张">
+                    <i class="bi bi-chevron-right"></i>
+                </button>
+                <img id="lightboxImage" src="" alt="" class="lightbox-img">
+                <div class="lightbox-caption" id="lightboxCaption"></div>
+                <div class="lightbox-counter" id="lightboxCounter"></div>
+            </div>
+        </div>
+    `;
+    document.body.insertAdjacentHTML('beforeend', lightboxHTML);
+}
+
+// 灯箱相关变量
+let currentImageIndex = 0;
+let lightboxImages = [];
+
+// 初始化图片灯箱
+function initLightbox() {
+    createLightbox();
+
+    // 为所有可查看的图片添加点击事件
+    const images = document.querySelectorAll('#articleContent img, .typora-content img, .typora-cover img');
+
+    images.forEach((img, index) => {
+        if (!img.hasAttribute('data-lightbox-enabled')) {
+            img.setAttribute('data-lightbox-enabled', 'true');
+            img.style.cursor = 'pointer';
+            img.addEventListener('click', (e) => openLightbox(e, img, images));
+        }
+    });
+}
+
+// 打开灯箱
+function openLightbox(event, clickedImg, allImages) {
+    event.preventDefault();
+    event.stopPropagation();
+
+    // 收集所有图片
+    lightboxImages = Array.from(allImages).filter(img => img.src && !img.src.includes('default-og.png'));
+
+    // 找到当前点击的图片索引
+    currentImageIndex = lightboxImages.findIndex(img => img === clickedImg);
+
+    if (currentImageIndex === -1) {
+        currentImageIndex = 0;
+    }
+
+    // 显示当前图片
+    showCurrentImage();
+
+    // 显示灯箱
+    const lightbox = document.getElementById('imageLightbox');
+    lightbox.style.display = 'flex';
+    document.body.style.overflow = 'hidden';
+
+    // 添加键盘事件
+    document.addEventListener('keydown', handleLightboxKeyboard);
+}
+
+// 关闭灯箱
+function closeLightbox() {
+    const lightbox = document.getElementById('imageLightbox');
+    lightbox.style.display = 'none';
+    document.body.style.overflow = '';
+    document.removeEventListener('keydown', handleLightboxKeyboard);
+}
+
+// 显示当前图片
+function showCurrentImage() {
+    if (lightboxImages.length === 0) return;
+
+    const img = lightboxImages[currentImageIndex];
+    const lightboxImg = document.getElementById('lightboxImage');
+    const caption = document.getElementById('lightboxCaption');
+    const counter = document.getElementById('lightboxCounter');
+
+    // 设置图片源
+    lightboxImg.src = img.src;
+    lightboxImg.alt = img.alt || '图片';
+
+    // 设置标题
+    caption.textContent = img.alt || img.title || `图片 ${currentImageIndex + 1}`;
+
+    // 设置计数器
+    if (lightboxImages.length > 1) {
+        counter.textContent = `${currentImageIndex + 1} / ${lightboxImages.length}`;
+    } else {
+        counter.textContent = '';
+    }
+
+    // 更新按钮状态
+    updateLightboxButtons();
+}
+
+// 上一张图片
+function showPrevImage() {
+    if (lightboxImages.length === 0) return;
+    currentImageIndex = (currentImageIndex - 1 + lightboxImages.length) % lightboxImages.length;
+    showCurrentImage();
+}
+
+// 下一张图片
+function showNextImage() {
+    if (lightboxImages.length === 0) return;
+    currentImageIndex = (currentImageIndex + 1) % lightboxImages.length;
+    showCurrentImage();
+}
+
+// 更新按钮状态
+function updateLightboxButtons() {
+    const prevBtn = document.querySelector('.lightbox-prev');
+    const nextBtn = document.querySelector('.lightbox-next');
+
+    if (lightboxImages.length <= 1) {
+        prevBtn.style.display = 'none';
+        nextBtn.style.display = 'none';
+    } else {
+        prevBtn.style.display = 'flex';
+        nextBtn.style.display = 'flex';
+    }
+}
+
+// 键盘事件处理
+function handleLightboxKeyboard(e) {
+    switch(e.key) {
+        case 'Escape':
+            closeLightbox();
+            break;
+        case 'ArrowLeft':
+            showPrevImage();
+            break;
+        case 'ArrowRight':
+            showNextImage();
+            break;
+    }
+}
+
+// 页面加载完成后初始化灯箱
+if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', initLightbox);
+} else {
+    initLightbox();
+}
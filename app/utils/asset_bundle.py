@@ -0,0 +1,500 @@
+"""
+前端资源打包模块
+
+构建阶段（flask build-static）执行：
+- 按模板、脚本中出现的类名裁剪 bootstrap.min.css 和 bootstrap-icons.css（或其子集）中未使用的选择器
+- 与 style.css 合并压缩为 dist/css/bundle.css
+- 从中提取 base.html 外壳（导航栏、布局等）用到的规则作为首屏关键 CSS（dist/css/critical.css），
+  由模板内联，完整样式改为异步加载。关键 CSS 随每个 HTML 响应发送、不能被缓存，只保留首屏渲染需要的部分：
+  外壳中页面内容之前（导航栏等）class 属性里的类名、不含 :hover 等交互状态，不含图标、@font-face、@keyframes、
+  第三方样式中只有元素选择器的规则，以及没有被引用的 CSS 变量
+- bootstrap.bundle.min.js 与 js/base.js 合并为 dist/js/bundle.js，其他页面脚本压缩到 dist/js/
+
+生成的文件经 url_for('static') 输出带内容哈希的文件名（见 static_assets）。
+"""
+
+import os
+import re
+import logging
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 输出目录（相对 static）
+DIST_DIR = 'dist'
+
+# 参与裁剪的第三方样式（只保留模板和脚本中用到的类名）
+PURGE_STYLESHEETS = ['vendor/bootstrap/bootstrap.min.css', 'vendor/icons/bootstrap-icons.css']
+
+# 项目样式（全部保留，只压缩）
+STYLESHEETS = ['css/style.css']
+
+# 合并为 dist/js/bundle.js 的脚本（按顺序）
+SCRIPT_BUNDLE = ['vendor/bootstrap/bootstrap.bundle.min.js', 'js/base.js']
+
+# 单独压缩的页面脚本
+PAGE_SCRIPTS = ['js/post.js']
+
+# 首屏关键 CSS 的大小上限（字节），超过时 flask build-static 输出警告
+# 约为首个 TCP 往返能发送的数据量（初始拥塞窗口 10 × 1460 字节）
+CRITICAL_CSS_BUDGET = 14 * 1024
+
+# 首屏关键 CSS 的类名来源：外壳模板中页面内容之前（导航栏、提示消息）的 class 属性，
+# 页脚在首屏之外，脚本运行后添加的类名也不影响首次渲染
+CRITICAL_TEMPLATE = 'base.html'
+CRITICAL_TEMPLATE_END = '{% block content %}'
+
+# 外壳中首次渲染时不显示的部分（下拉菜单项、搜索建议列表、加载动画、提示消息的关闭按钮），不进入关键 CSS
+# 下拉菜单、搜索建议的容器本身保留（需要其 display: none）
+CRITICAL_EXCLUDE_CLASSES = {
+    'dropdown-item', 'dropdown-divider', 'suggestions-list', 'suggestions-loading',
+    'spinner-border', 'spinner-border-sm', 'btn-close',
+}
+
+# 第三方样式中首屏仍需保留的元素选择器（其余只有元素选择器的重置规则随完整样式加载）
+CRITICAL_ELEMENT_SELECTORS = {':root', '*', '*::before', '*::after', 'html', 'body'}
+
+# 扫描类名的来源：模板、项目脚本、Bootstrap 脚本（运行时添加的 show/collapsing 等）、Python 中拼接的 HTML
+CLASS_SOURCES = [
+    ('templates', ('.html',)),
+    ('static/js', ('.js',)),
+    ('static/vendor/bootstrap', ('.js',)),
+    ('routes', ('.py',)),
+    ('utils', ('.py',)),
+]
+
+# 始终保留的包含块 at-rule（内部规则递归裁剪）
+_GROUP_AT_RULES = ('@media', '@supports', '@layer', '@container')
+
+_TOKEN_PATTERN = re.compile(r'[A-Za-z0-9_-]+')
+_CLASS_PATTERN = re.compile(r'\.((?:\\.|[\w-])+)')
+_ATTRIBUTE_PATTERN = re.compile(r'\[[^\]]*\]')
+_STRING_PATTERN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+_COMMENT_PATTERN = re.compile(r'/\*(?!!).*?\*/', re.S)
+_LICENSE_COMMENT_PATTERN = re.compile(r'/\*!.*?\*/', re.S)
+_URL_PATTERN = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_CLASS_ATTRIBUTE_PATTERN = re.compile(r'\bclass="([^"]*)"')
+_ATTRIBUTE_NAME_PATTERN = re.compile(r'\[\s*([\w-]+)')
+# 交互状态（悬停、聚焦、展开等）和浏览器私有伪元素，首次渲染用不到
+_STATE_PATTERN = re.compile(
+    r':(?:hover|focus|focus-visible|focus-within|active|disabled|checked|invalid|valid)\b'
+    r'|\.(?:active|show|showing|hiding|collapsing|disabled)\b'
+    r'|::?-(?:webkit|moz|ms)-|::file-selector-button|::placeholder'
+)
+# :not(.show) 等否定条件描述的是初始状态（如折叠菜单默认隐藏），不算交互状态
+_NOT_PATTERN = re.compile(r':not\([^)]*\)')
+_BLOCK_PATTERN = re.compile(r'\{([^{}]*)\}')
+_EMPTY_RULE_PATTERN = re.compile(r'[^{}]+\{\}')
+_VAR_PATTERN = re.compile(r'var\(\s*(--[\w-]+)')
+
+
+def collect_tokens(app_root, sources=CLASS_SOURCES):
+    """
+    收集可能作为类名使用的所有单词
+
+    与 PurgeCSS 默认提取器一致：不解析 HTML/JS，任何出现过的单词都视为可能的类名，
+    宁可多保留也不误删动态拼接的类名。
+
+    Args:
+        app_root: app 包目录
+        sources: [(子目录, 扩展名元组)]
+
+    Returns:
+        set: 单词集合
+    """
+    tokens = set()
+    for subdir, extensions in sources:
+        for dirpath, _, filenames in os.walk(os.path.join(app_root, subdir)):
+            for filename in filenames:
+                if filename.endswith(extensions):
+                    with open(os.path.join(dirpath, filename), encoding='utf-8', errors='ignore') as f:
+                        tokens.update(_TOKEN_PATTERN.findall(f.read()))
+    return tokens
+
+
+def collect_class_attributes(app_root, template=CRITICAL_TEMPLATE, end=CRITICAL_TEMPLATE_END):
+    """模板中 end 之前的 class 属性里出现的单词（包括 Jinja 条件拼接的类名）"""
+    with open(os.path.join(app_root, 'templates', template), encoding='utf-8') as f:
+        html = f.read().split(end, 1)[0]
+    classes = set()
+    for value in _CLASS_ATTRIBUTE_PATTERN.findall(html):
+        classes.update(_TOKEN_PATTERN.findall(value))
+    return classes
+
+
+def split_rules(css):
+    """
+    把样式表切分为顶层规则
+
+    Returns:
+        list: [(前导, 块内容)]，语句型 at-rule（@import 等）的块内容为 None
+    """
+    rules = []
+    start = 0
+    depth = 0
+    prelude_end = 0
+    quote = None
+    i = 0
+    while i < len(css):
+        ch = css[i]
+        if quote:
+            if ch == '\\':
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in '"\'':
+            quote = ch
+        elif ch == '{':
+            if depth == 0:
+                prelude_end = i
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append((css[start:prelude_end].strip(), css[prelude_end + 1:i]))
+                start = i + 1
+        elif ch == ';' and depth == 0:
+            statement = css[start:i + 1].strip()
+            if statement:
+                rules.append((statement, None))
+            start = i + 1
+        i += 1
+    return rules
+
+
+def _split_selectors(prelude):
+    """按顶层逗号拆分选择器列表（忽略 :not(a, b) 等括号内的逗号）"""
+    selectors = []
+    depth = 0
+    current = []
+    for ch in prelude:
+        if ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            selectors.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(ch)
+    selectors.append(''.join(current).strip())
+    return [s for s in selectors if s]
+
+
+def selector_classes(selector):
+    """选择器中引用的类名（不含属性选择器里的内容）"""
+    selector = _ATTRIBUTE_PATTERN.sub('', _STRING_PATTERN.sub('', selector))
+    return {name.replace('\\', '') for name in _CLASS_PATTERN.findall(selector)}
+
+
+def purge_rules(rules, used):
+    """
+    删除引用了未使用类名的选择器
+
+    Args:
+        rules: split_rules() 的结果
+        used: 已使用的类名集合
+
+    Returns:
+        list: 保留下来的规则文本
+    """
+    output = []
+    for prelude, body in rules:
+        if body is None:
+            output.append(prelude)
+        elif prelude.startswith(_GROUP_AT_RULES):
+            inner = purge_rules(split_rules(body), used)
+            if inner:
+                output.append(f'{prelude}{{{"".join(inner)}}}')
+        elif prelude.startswith('@'):
+            # @font-face、@keyframes 等原样保留
+            output.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [s for s in _split_selectors(prelude) if selector_classes(s) <= used]
+            if selectors:
+                output.append(f'{",".join(selectors)}{{{body.strip()}}}')
+    return output
+
+
+def critical_rules(rules, classes, tokens, keep_elements=True):
+    """
+    挑选首屏关键规则
+
+    Args:
+        rules: split_rules() 的结果
+        classes: 首屏用到的类名（外壳模板的 class 属性）
+        tokens: 外壳模板和脚本中出现的单词，属性选择器的属性名需要在其中
+        keep_elements: 是否保留只有元素选择器的规则（第三方样式只保留 CRITICAL_ELEMENT_SELECTORS）
+
+    Returns:
+        list: 保留下来的规则文本
+    """
+    output = []
+    for prelude, body in rules:
+        if body is None:
+            continue
+        # 版权注释保留在完整样式中，关键 CSS 内联到页面，不重复输出
+        prelude = _LICENSE_COMMENT_PATTERN.sub('', prelude).strip()
+        if prelude.startswith('@media') and 'prefers-reduced-motion' in prelude:
+            # 只用于关闭过渡动画，首次渲染没有动画
+            continue
+        if prelude.startswith(_GROUP_AT_RULES):
+            inner = critical_rules(split_rules(body), classes, tokens, keep_elements)
+            if inner:
+                output.append(f'{prelude}{{{"".join(inner)}}}')
+        elif prelude.startswith('@'):
+            # @font-face、@keyframes 随完整样式加载
+            continue
+        else:
+            selectors = []
+            for selector in _split_selectors(prelude):
+                if _STATE_PATTERN.search(_NOT_PATTERN.sub('', selector)):
+                    continue
+                if not set(_ATTRIBUTE_NAME_PATTERN.findall(selector)) <= tokens:
+                    continue
+                selector_names = selector_classes(selector)
+                if selector_names:
+                    if selector_names <= classes:
+                        selectors.append(selector)
+                elif keep_elements or selector in CRITICAL_ELEMENT_SELECTORS:
+                    selectors.append(selector)
+            if selectors:
+                output.append(f'{",".join(selectors)}{{{body.strip()}}}')
+    return output
+
+
+def _split_declarations(block):
+    """按顶层分号拆分声明（忽略字符串和括号内的分号）"""
+    declarations = []
+    depth = 0
+    quote = None
+    current = []
+    for ch in block:
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in '"\'':
+            quote = ch
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ';' and depth == 0:
+            declarations.append(''.join(current))
+            current = []
+            continue
+        current.append(ch)
+    declarations.append(''.join(current))
+    return [d for d in declarations if d.strip()]
+
+
+def prune_custom_properties(css):
+    """
+    删除没有被引用的 CSS 变量声明（Bootstrap 的 :root 和组件变量大多只有交互状态使用）
+
+    Args:
+        css: 压缩后的样式表
+
+    Returns:
+        str: 删除未引用变量和空规则后的样式表
+    """
+    blocks = [_split_declarations(block) for block in _BLOCK_PATTERN.findall(css)]
+    custom = {}
+    used = set()
+    for declarations in blocks:
+        for declaration in declarations:
+            name, _, value = declaration.partition(':')
+            if name.strip().startswith('--'):
+                custom.setdefault(name.strip(), []).append(value)
+            else:
+                used.update(_VAR_PATTERN.findall(value))
+
+    # 变量的值中引用的变量同样需要保留
+    pending = list(used)
+    while pending:
+        for value in custom.get(pending.pop(), []):
+            for name in _VAR_PATTERN.findall(value):
+                if name not in used:
+                    used.add(name)
+                    pending.append(name)
+
+    def prune(match):
+        declarations = [d for d in _split_declarations(match.group(1))
+                        if not d.strip().startswith('--') or d.partition(':')[0].strip() in used]
+        return '{' + ';'.join(declarations) + '}'
+
+    css = _BLOCK_PATTERN.sub(prune, css)
+    # 删除变空的规则（@media 内的规则删除后 @media 本身也可能变空）
+    while True:
+        pruned = _EMPTY_RULE_PATTERN.sub('', css)
+        if pruned == css:
+            return css
+        css = pruned
+
+
+def minify_css(css):
+    """压缩 CSS：去注释、合并空白（字符串内容保持不变）"""
+    css = _COMMENT_PATTERN.sub('', css)
+    parts = []
+    last = 0
+    for match in _STRING_PATTERN.finditer(css):
+        parts.append(_minify_css_fragment(css[last:match.start()]))
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(_minify_css_fragment(css[last:]))
+    return ''.join(parts).strip()
+
+
+def _minify_css_fragment(fragment):
+    fragment = re.sub(r'\s+', ' ', fragment)
+    fragment = re.sub(r'\s*([{};,>])\s*', r'\1', fragment)
+    return fragment.replace(';}', '}')
+
+
+def minify_js(js):
+    """
+    保守地压缩 JavaScript
+
+    只去掉整行注释、块注释行和缩进，不合并行，避免破坏自动分号插入、
+    字符串和正则表达式。多行模板字符串内的行原样保留。
+    """
+    lines = []
+    in_block_comment = False
+    in_template = False
+    for line in js.splitlines():
+        stripped = line.strip()
+        if in_template:
+            lines.append(line)
+        elif in_block_comment:
+            if '*/' in stripped:
+                in_block_comment = False
+            continue
+        elif stripped.startswith('/*') and not stripped.startswith('/*!'):
+            if '*/' not in stripped:
+                in_block_comment = True
+            continue
+        elif not stripped or stripped.startswith('//'):
+            continue
+        else:
+            lines.append(stripped)
+
+        # 奇数个未转义的反引号表示进入或离开多行模板字符串
+        if len(re.findall(r'(?<!\\)`', line)) % 2:
+            in_template = not in_template
+    return '\n'.join(lines) + '\n'
+
+
+def rewrite_urls(css, source, static_folder, static_url_path='/static', hashed_filename=None):
+    """
+    把样式表中的相对 url() 改写为绝对路径
+
+    打包后样式表位置改变，关键 CSS 还会内联到页面中，相对路径都会失效。
+
+    Args:
+        css: 样式表内容
+        source: 样式表文件名（相对 static）
+        static_folder: static 目录
+        static_url_path: static 的 URL 前缀
+        hashed_filename: 文件名 → 带哈希文件名的函数（可选，用于字体等资源的永久缓存）
+    """
+    source_dir = os.path.dirname(source)
+
+    def replace(match):
+        url = match.group(2).strip()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+
+        path, sep, query = url.partition('?')
+        target = os.path.normpath(os.path.join(source_dir, path)).replace(os.sep, '/')
+        if hashed_filename is not None and os.path.isfile(os.path.join(static_folder, target)):
+            # 带哈希文件名后查询串里的版本号不再需要
+            target, sep, query = hashed_filename(target), '', ''
+        return f'url("{static_url_path}/{target}{sep}{query}")'
+
+    return _URL_PATTERN.sub(replace, css)
+
+
+def _read(static_folder, filename):
+    with open(os.path.join(static_folder, filename), encoding='utf-8') as f:
+        return f.read()
+
+
+def _write(static_folder, filename, content):
+    path = os.path.join(static_folder, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return len(content.encode('utf-8'))
+
+
+def build_assets(app_root, static_folder, static_url_path='/static', hashed_filename=None):
+    """
+    生成 dist/ 下的打包资源
+
+    Args:
+        app_root: app 包目录
+        static_folder: static 目录
+        static_url_path: static 的 URL 前缀
+        hashed_filename: 文件名 → 带哈希文件名的函数（可选）
+
+    Returns:
+        dict: {输出文件名: (原始大小, 输出大小)}
+    """
+    used = collect_tokens(app_root)
+    shell_tokens = collect_tokens(app_root, [('templates', (CRITICAL_TEMPLATE,)), ('static/js', ('base.js',))])
+    shell_classes = collect_class_attributes(app_root) - CRITICAL_EXCLUDE_CLASSES
+
+    bundle = []
+    critical = []
+    source_size = 0
+    # 已生成图标字体子集时改用子集样式（见 icon_subset）
+    from app.utils.icon_subset import ICON_STYLESHEET, SUBSET_STYLESHEET
+    purge_stylesheets = list(PURGE_STYLESHEETS)
+    if os.path.isfile(os.path.join(static_folder, SUBSET_STYLESHEET)):
+        purge_stylesheets[purge_stylesheets.index(ICON_STYLESHEET)] = SUBSET_STYLESHEET
+
+    for filename in purge_stylesheets + STYLESHEETS:
+        css = _read(static_folder, filename)
+        source_size += len(css.encode('utf-8'))
+        css = rewrite_urls(_COMMENT_PATTERN.sub('', css), filename, static_folder,
+                           static_url_path, hashed_filename)
+        # @charset 只能出现在样式表开头，合并后统一去掉（内容均为 UTF-8）
+        rules = [rule for rule in split_rules(css) if not rule[0].startswith('@charset')]
+
+        if filename in purge_stylesheets:
+            bundle.extend(purge_rules(rules, used))
+        else:
+            bundle.extend(f'{p}{{{b}}}' if b is not None else p for p, b in rules)
+        # 首屏只保留外壳用到的规则；图标在字体加载前本来就不显示，不进入关键 CSS
+        if filename in (ICON_STYLESHEET, SUBSET_STYLESHEET):
+            continue
+        critical.extend(critical_rules(rules, shell_classes, shell_tokens,
+                                       keep_elements=filename not in purge_stylesheets))
+
+    results = {}
+    size = _write(static_folder, f'{DIST_DIR}/css/bundle.css', minify_css(''.join(bundle)))
+    results[f'{DIST_DIR}/css/bundle.css'] = (source_size, size)
+    size = _write(static_folder, f'{DIST_DIR}/css/critical.css',
+                  prune_custom_properties(minify_css(''.join(critical))))
+    results[f'{DIST_DIR}/css/critical.css'] = (source_size, size)
+
+    scripts = []
+    source_size = 0
+    for filename in SCRIPT_BUNDLE:
+        js = _read(static_folder, filename)
+        source_size += len(js.encode('utf-8'))
+        # 第三方脚本已压缩，保持原样
+        scripts.append(js if filename.startswith('vendor/') else minify_js(js))
+    size = _write(static_folder, f'{DIST_DIR}/js/bundle.js', ';\n'.join(scripts))
+    results[f'{DIST_DIR}/js/bundle.js'] = (source_size, size)
+
+    for filename in PAGE_SCRIPTS:
+        js = _read(static_folder, filename)
+        target = f'{DIST_DIR}/{filename}'
+        results[target] = (len(js.encode('utf-8')), _write(static_folder, target, minify_js(js)))
+
+    for filename, (before, after) in results.items():
+        logger.info(f'{filename}: {before} -> {after} 字节')
+    return results
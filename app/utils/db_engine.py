@@ -0,0 +1,407 @@
+"""
+数据库引擎配置模块
+
+PostgreSQL 等服务端数据库：SQLALCHEMY_ENGINE_OPTIONS 由 DB_* 配置生成（build_engine_options），
+连接池大小与每个 gunicorn worker 的线程数匹配，取出连接前 pre-ping 检测被服务端断开的空闲连接，
+定期回收旧连接，并设置 statement_timeout。DB_PGBOUNCER 打开时改为每次新建连接（由 PgBouncer 复用），
+关闭预编译语句，statement_timeout 改为在每个事务开头 SET LOCAL。
+
+SQLite（默认的 instance/blog.db）在生产环境下的调优：
+- 每个连接建立时设置 PRAGMA：WAL 日志（读写互不阻塞）、synchronous=NORMAL、
+  busy_timeout（写锁冲突时等待而不是立即报错）、cache_size、mmap_size
+- 只读连接池：SQLALCHEMY_BINDS['read'] 以 mode=ro 打开同一个数据库文件，
+  GET/HEAD 请求中的查询通过 RoutingSession 走只读池；事务中一旦写入（flush），
+  直到提交前都使用主连接，保证读到自己未提交的修改
+- benchmark_sqlite(): 有写入并发时默认配置与调优配置的读吞吐对比（flask benchmark-sqlite）
+
+只读副本（DATABASE_REPLICA_URL）：配置后作为 SQLALCHEMY_BINDS['replica']，
+REPLICA_ENDPOINTS 中的 GET/HEAD 处理函数（首页、文章、搜索、归档、订阅源等）的查询走副本。
+副本有复制延迟，因此非 GET 请求提交写入后，在 session 中记录一个时间戳，
+REPLICA_STICKY_SECONDS 秒内该客户端的请求都走主库（后台编辑文章后立刻能看到修改）。
+本地可以用两个 SQLite 文件测试：DATABASE_REPLICA_URL 指向另一个文件，
+flask db sync-replica 把主库复制过去。
+"""
+
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+import weakref
+from flask import current_app, has_request_context, request, session as http_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql.dml import UpdateBase
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 只读连接池的 bind 名
+READ_BIND = 'read'
+
+# 只读副本的 bind 名
+REPLICA_BIND = 'replica'
+
+# session 中记录"在此时间之前读主库"的键
+PRIMARY_UNTIL_KEY = '_db_primary_until'
+
+# 可以使用只读连接的请求方法
+READ_METHODS = ('GET', 'HEAD')
+
+# 需要在事务开头设置 statement_timeout 的引擎 → 毫秒
+_statement_timeouts = weakref.WeakKeyDictionary()
+
+
+def sqlite_path(uri):
+    """
+    SQLite 数据库文件路径
+
+    Returns:
+        str|None: 文件路径，非 SQLite 或内存数据库时返回 None
+    """
+    url = make_url(uri)
+    if not url.drivername.startswith('sqlite'):
+        return None
+    if not url.database or url.database == ':memory:' or url.database.startswith('file:'):
+        return None
+    return os.path.abspath(url.database)
+
+
+def sqlite_pragmas(config, readonly=False):
+    """
+    连接建立时执行的 PRAGMA 语句
+
+    Args:
+        config: 应用配置
+        readonly: 只读连接（不能修改日志模式）
+    """
+    pragmas = []
+    if config['SQLITE_WAL'] and not readonly:
+        pragmas.append('PRAGMA journal_mode=WAL')
+    pragmas.extend([
+        f'PRAGMA synchronous={config["SQLITE_SYNCHRONOUS"]}',
+        f'PRAGMA busy_timeout={int(config["SQLITE_BUSY_TIMEOUT"])}',
+        f'PRAGMA cache_size={int(config["SQLITE_CACHE_SIZE"])}',
+        f'PRAGMA mmap_size={int(config["SQLITE_MMAP_SIZE"])}',
+        'PRAGMA temp_store=MEMORY',
+    ])
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """在 engine 的每个新连接上执行 pragmas"""
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def build_engine_options(config):
+    """
+    根据 DB_* 配置生成 SQLALCHEMY_ENGINE_OPTIONS
+
+    只对 PostgreSQL 生效，SQLite 使用 SQLAlchemy 默认的连接池。
+
+    Returns:
+        dict: create_engine() 的参数
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'postgresql':
+        return {}
+
+    driver = url.get_driver_name()
+    connect_args = {}
+    if config['DB_PGBOUNCER']:
+        # 事务级连接复用下，连接池和会话级状态（预编译语句、启动参数）都不可靠
+        options = {'poolclass': NullPool}
+        if driver == 'psycopg':
+            connect_args['prepare_threshold'] = None
+        elif driver == 'asyncpg':
+            connect_args['statement_cache_size'] = 0
+            connect_args['prepared_statement_cache_size'] = 0
+    else:
+        options = {
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+            'pool_recycle': config['DB_POOL_RECYCLE'],
+            'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        }
+        if config['DB_STATEMENT_TIMEOUT'] and driver in ('psycopg2', 'psycopg'):
+            connect_args['options'] = f'-c statement_timeout={int(config["DB_STATEMENT_TIMEOUT"])}'
+
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+
+def configure_engines(app):
+    """
+    生成引擎参数并补充只读 bind（需在 db.init_app 之前调用）
+
+    SQLALCHEMY_ENGINE_OPTIONS 中显式配置的参数优先于 DB_* 生成的参数。
+    只有文件型 SQLite 数据库且打开 SQLITE_READ_POOL 时才创建只读连接池；
+    配置了 DATABASE_REPLICA_URL 时添加副本 bind。
+    """
+    options = build_engine_options(app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    if app.config.get('DATABASE_REPLICA_URL'):
+        binds.setdefault(REPLICA_BIND, app.config['DATABASE_REPLICA_URL'])
+
+    path = sqlite_path(app.config['SQLALCHEMY_DATABASE_URI'])
+    if app.config['SQLITE_READ_POOL'] and path is not None:
+        binds.setdefault(READ_BIND, f'sqlite:///file:{path}?mode=ro&uri=true')
+
+    if binds:
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def apply_statement_timeout(engine, timeout):
+    """
+    每个事务开头 SET LOCAL statement_timeout（PgBouncer 事务模式下会话级设置不生效）
+
+    由 RoutingSession 的 after_begin 事件执行，只覆盖 ORM 会话中的查询。
+    """
+    _statement_timeouts[engine] = int(timeout)
+
+
+def init_engines(app, db):
+    """为 SQLite 引擎注册 PRAGMA，为 PgBouncer 模式注册 statement_timeout（需在 db.init_app 之后调用）"""
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name == 'postgresql':
+                if app.config['DB_PGBOUNCER'] and app.config['DB_STATEMENT_TIMEOUT']:
+                    apply_statement_timeout(engine, app.config['DB_STATEMENT_TIMEOUT'])
+                continue
+            if not app.config['SQLITE_TUNING']:
+                continue
+            if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+                continue
+            apply_sqlite_pragmas(engine, sqlite_pragmas(app.config, readonly=key == READ_BIND))
+
+
+def sync_sqlite_replica(primary_uri, replica_uri):
+    """
+    把 SQLite 主库复制到副本文件（本地测试副本路由用）
+
+    使用 SQLite 在线备份，主库可以在使用中。
+
+    Raises:
+        ValueError: 主库或副本不是文件型 SQLite 数据库
+    """
+    source, target = sqlite_path(primary_uri), sqlite_path(replica_uri)
+    if source is None or target is None:
+        raise ValueError('只支持文件型 SQLite 数据库，PostgreSQL 副本请使用流复制')
+
+    import sqlite3
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    return target
+
+
+def pinned_to_primary():
+    """当前客户端最近提交过写入，读请求仍走主库"""
+    return http_session.get(PRIMARY_UNTIL_KEY, 0) > time.time()
+
+
+class RoutingSession(Session):
+    """
+    读写分离的会话
+
+    GET/HEAD 请求中的查询：REPLICA_ENDPOINTS 中的处理函数使用副本（客户端未被固定到主库时），
+    其余使用 SQLite 只读 bind；写入语句、flush 以及 flush 之后到事务结束前的查询使用主库。
+    未配置只读 bind 和副本时与默认会话相同。
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            name = self._read_bind(clause)
+            if name is not None:
+                return self._db.engines[name]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _read_bind(self, clause):
+        """可以使用的只读 bind 名，None 表示主库"""
+        if isinstance(clause, UpdateBase):
+            # 不经过 flush 的 UPDATE/DELETE 语句同样算作写入
+            self.info['wrote'] = True
+            return None
+        if self._flushing or self.info.get('wrote'):
+            return None
+        if not has_request_context() or request.method not in READ_METHODS:
+            return None
+
+        engines = self._db.engines
+        if (REPLICA_BIND in engines
+                and request.endpoint in current_app.config['REPLICA_ENDPOINTS']
+                and not pinned_to_primary()):
+            return REPLICA_BIND
+        if READ_BIND in engines:
+            return READ_BIND
+        return None
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _pin_to_primary(session, flush_context):
+    """本事务已写入，之后的查询都走主库"""
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _pin_client_to_primary(session):
+    """
+    非 GET 请求提交写入后，该客户端在 REPLICA_STICKY_SECONDS 秒内读主库
+
+    GET 请求中的写入（如浏览量计数）不固定，否则每个读者都会绕过副本。
+    """
+    if not session.info.get('wrote') or not has_request_context() or request.method in READ_METHODS:
+        return
+    if REPLICA_BIND not in session._db.engines:
+        return
+    sticky = current_app.config['REPLICA_STICKY_SECONDS']
+    if sticky:
+        http_session[PRIMARY_UNTIL_KEY] = time.time() + sticky
+
+
+@event.listens_for(RoutingSession, 'after_begin')
+def _set_statement_timeout(session, transaction, connection):
+    timeout = _statement_timeouts.get(connection.engine)
+    if timeout:
+        connection.exec_driver_sql(f'SET LOCAL statement_timeout = {timeout}')
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _unpin(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('wrote', None)
+
+
+def benchmark_sqlite(config, readers=4, writers=1, duration=3.0, posts=500):
+    """
+    有写入并发时的 SQLite 读吞吐对比
+
+    在临时数据库上分别以默认配置（回滚日志）和调优配置（WAL + PRAGMA + 只读连接）运行：
+    writers 个线程不断给文章加浏览量并提交，readers 个线程不断查询首页文章列表。
+
+    Args:
+        config: 应用配置（读取 SQLITE_* 调优参数）
+        readers: 读线程数
+        writers: 写线程数
+        duration: 每种配置的运行时间（秒）
+        posts: 测试数据中的文章数
+
+    Returns:
+        list: [{'name', 'reads_per_sec', 'writes_per_sec', 'read_p95_ms', 'errors'}]
+    """
+    from app import db
+
+    listing = text('SELECT id, title, summary FROM post WHERE published = 1 '
+                   'ORDER BY created_at DESC LIMIT 10')
+    bump = text('UPDATE post SET views = views + 1 WHERE id = :id')
+
+    results = []
+    for name, tuned in (('默认（回滚日志）', False), ('WAL + PRAGMA + 只读连接', True)):
+        workdir = tempfile.mkdtemp(prefix='sqlite-bench-')
+        path = os.path.join(workdir, 'bench.db')
+        try:
+            # 默认配置同样设置 busy_timeout，只比较日志模式等调优项的影响
+            engine_options = {'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT'] / 1000}}
+            writer_engine = create_engine(f'sqlite:///{path}', **engine_options)
+            reader_engine = writer_engine
+            if tuned:
+                apply_sqlite_pragmas(writer_engine, sqlite_pragmas(config))
+                reader_engine = create_engine(f'sqlite:///file:{path}?mode=ro&uri=true', **engine_options)
+                apply_sqlite_pragmas(reader_engine, sqlite_pragmas(config, readonly=True))
+
+            db.metadata.create_all(writer_engine)
+            with writer_engine.begin() as conn:
+                conn.execute(text('INSERT INTO user (id, username, email) VALUES (1, :u, :e)'),
+                             {'u': 'bench', 'e': 'bench@example.com'})
+                conn.execute(
+                    text('INSERT INTO post (title, content, summary, user_id, views, created_at, published) '
+                         "VALUES (:title, :content, '', 1, 0, datetime('now', :offset), 1)"),
+                    [{'title': f'Post {i}', 'content': 'x' * 2000, 'offset': f'-{i} minutes'}
+                     for i in range(posts)]
+                )
+
+            stop = threading.Event()
+            lock = threading.Lock()
+            stats = {'reads': 0, 'writes': 0, 'errors': 0, 'latencies': []}
+
+            def read_loop():
+                latencies = []
+                reads = errors = 0
+                with reader_engine.connect() as conn:
+                    while not stop.is_set():
+                        start = time.perf_counter()
+                        try:
+                            conn.execute(listing).fetchall()
+                            conn.rollback()
+                            reads += 1
+                            latencies.append(time.perf_counter() - start)
+                        except OperationalError:
+                            conn.rollback()
+                            errors += 1
+                with lock:
+                    stats['reads'] += reads
+                    stats['errors'] += errors
+                    stats['latencies'].extend(latencies)
+
+            def write_loop(seed):
+                writes = errors = 0
+                post_id = seed
+                with writer_engine.connect() as conn:
+                    while not stop.is_set():
+                        post_id = post_id % posts + 1
+                        try:
+                            conn.execute(bump, {'id': post_id})
+                            conn.commit()
+                            writes += 1
+                        except OperationalError:
+                            conn.rollback()
+                            errors += 1
+                with lock:
+                    stats['writes'] += writes
+                    stats['errors'] += errors
+
+            threads = [threading.Thread(target=read_loop) for _ in range(readers)]
+            threads += [threading.Thread(target=write_loop, args=(i,)) for i in range(writers)]
+            for thread in threads:
+                thread.start()
+            time.sleep(duration)
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+            latencies = sorted(stats['latencies'])
+            results.append({
+                'name': name,
+                'reads_per_sec': stats['reads'] / duration,
+                'writes_per_sec': stats['writes'] / duration,
+                'read_p95_ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+                'errors': stats['errors'],
+            })
+            writer_engine.dispose()
+            reader_engine.dispose()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
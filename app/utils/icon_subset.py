@@ -0,0 +1,149 @@
+"""
+Bootstrap Icons 字体子集化模块
+
+扫描模板和脚本中用到的 bi-* 图标，用 fontTools 从完整字体中裁出这些字形，
+生成 dist/icons/ 下的子集 WOFF2/WOFF 和只含这些图标的 CSS。
+打包（asset_bundle）时优先使用子集 CSS，页面只需下载几 KB 的图标字体。
+
+fontTools（写 WOFF2 还需要 brotli）为构建期依赖，未安装时跳过子集化，继续使用完整字体。
+"""
+
+import os
+import re
+import logging
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 完整图标样式和字体（相对 static）
+ICON_STYLESHEET = 'vendor/icons/bootstrap-icons.css'
+ICON_FONT = 'vendor/icons/fonts/bootstrap-icons.woff2'
+
+# 子集输出（相对 static）
+SUBSET_DIR = 'dist/icons'
+SUBSET_STYLESHEET = f'{SUBSET_DIR}/bootstrap-icons.css'
+
+# 扫描图标名的来源
+ICON_SOURCES = [
+    ('templates', ('.html',)),
+    ('static/js', ('.js',)),
+]
+
+# 运行时拼接的图标名（如导航栏搜索建议中的 bi-${iconClass}）
+ICON_SAFELIST = {'file-earmark-text', 'tag', 'folder'}
+
+_ICON_USE_PATTERN = re.compile(r'\bbi-([a-z0-9]+(?:-[a-z0-9]+)*)')
+_ICON_RULE_PATTERN = re.compile(r'\.bi-([a-z0-9-]+)::before\s*\{\s*content:\s*"\\([0-9a-fA-F]+)";\s*\}')
+
+
+def collect_icons(app_root, sources=ICON_SOURCES):
+    """
+    收集模板和脚本中用到的图标名
+
+    Returns:
+        set: 图标名（不含 bi- 前缀）
+    """
+    icons = set(ICON_SAFELIST)
+    for subdir, extensions in sources:
+        for dirpath, _, filenames in os.walk(os.path.join(app_root, subdir)):
+            for filename in filenames:
+                if filename.endswith(extensions):
+                    with open(os.path.join(dirpath, filename), encoding='utf-8', errors='ignore') as f:
+                        icons.update(_ICON_USE_PATTERN.findall(f.read()))
+    return icons
+
+
+def parse_icon_codepoints(css):
+    """
+    解析图标样式中的图标名 → 码位
+
+    Returns:
+        dict: {图标名: 码位}
+    """
+    return {name: int(codepoint, 16) for name, codepoint in _ICON_RULE_PATTERN.findall(css)}
+
+
+def _base_rule(css):
+    """.bi::before 等公共规则（字体族、行高等）"""
+    start = css.index('.bi::before')
+    return css[start:css.index('}', start) + 1]
+
+
+def build_icon_subset(app_root, static_folder):
+    """
+    生成图标字体子集和对应 CSS
+
+    Args:
+        app_root: app 包目录
+        static_folder: static 目录
+
+    Returns:
+        dict|None: {'icons', 'total', 'font_size', 'subset_size', 'missing'}，
+                   未安装 fontTools 时返回 None
+    """
+    try:
+        from fontTools import subset
+        from fontTools.ttLib import TTFont
+    except ImportError:
+        logger.warning('未安装 fontTools，跳过图标字体子集化')
+        return None
+
+    with open(os.path.join(static_folder, ICON_STYLESHEET), encoding='utf-8') as f:
+        css = f.read()
+    codepoints = parse_icon_codepoints(css)
+
+    used = collect_icons(app_root)
+    icons = sorted(name for name in used if name in codepoints)
+    missing = sorted(used - set(codepoints))
+
+    output_dir = os.path.join(static_folder, SUBSET_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+
+    font_path = os.path.join(static_folder, ICON_FONT)
+    options = subset.Options()
+    options.layout_features = []
+    options.name_IDs = []
+    options.notdef_outline = True
+
+    sizes = {}
+    for flavor in ('woff2', 'woff'):
+        font = TTFont(font_path)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=[codepoints[name] for name in icons])
+        subsetter.subset(font)
+        font.flavor = flavor
+
+        target = os.path.join(output_dir, f'bootstrap-icons.{flavor}')
+        tmp_path = target + '.tmp'
+        font.save(tmp_path)
+        os.replace(tmp_path, target)
+        sizes[flavor] = os.path.getsize(target)
+
+    rules = [
+        '@font-face {',
+        '  font-display: block;',
+        '  font-family: "bootstrap-icons";',
+        '  src: url("./bootstrap-icons.woff2") format("woff2"),',
+        'url("./bootstrap-icons.woff") format("woff");',
+        '}',
+        '',
+        _base_rule(css),
+        '',
+    ]
+    rules.extend(f'.bi-{name}::before {{ content: "\\{codepoints[name]:x}"; }}' for name in icons)
+
+    target = os.path.join(static_folder, SUBSET_STYLESHEET)
+    with open(target + '.tmp', 'w', encoding='utf-8') as f:
+        f.write('\n'.join(rules) + '\n')
+    os.replace(target + '.tmp', target)
+
+    if missing:
+        logger.warning(f'以下图标在 bootstrap-icons 中不存在: {", ".join(missing)}')
+
+    return {
+        'icons': len(icons),
+        'total': len(codepoints),
+        'font_size': os.path.getsize(font_path),
+        'subset_size': sizes['woff2'],
+        'missing': missing,
+    }
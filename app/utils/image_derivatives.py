@@ -0,0 +1,237 @@
+"""
+封面图衍生尺寸生成模块
+
+上传封面后在后台线程中生成多个宽度的 WebP/JPEG（可选 AVIF）版本，
+通过 get_storage() 上传，并记录到 ImageDerivative 和 Post.cover_variants，
+模板据此输出 srcset，避免列表页和文章页直接加载原图。
+
+相同内容（SHA-256）的图片只生成一次。
+"""
+
+import json
+import logging
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps, features
+from app.utils.image_upload import file_sha256, remove_quietly
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 格式 → (PIL 格式名, 文件扩展名)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+    'avif': ('AVIF', 'avif'),
+}
+
+# 后台生成线程池（进程内共享）
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-derivatives')
+
+
+def _enabled_formats(formats):
+    """过滤当前 Pillow 不支持的格式"""
+    enabled = []
+    for image_format in formats:
+        image_format = image_format.strip().lower()
+        if image_format not in DERIVATIVE_FORMATS:
+            logger.warning(f'未知的衍生图格式: {image_format}')
+            continue
+        if image_format in ('webp', 'avif') and not features.check(image_format):
+            logger.warning(f'当前 Pillow 不支持 {image_format}，跳过')
+            continue
+        enabled.append(image_format)
+    return enabled
+
+
+def build_variants(source, digest, storage, widths, formats, quality=80):
+    """
+    生成并上传衍生图
+
+    Args:
+        source: 原图路径或文件对象
+        digest: 原图 SHA-256
+        storage: 存储后端
+        widths: 目标宽度列表
+        formats: 目标格式列表
+        quality: 编码质量
+
+    Returns:
+        dict: {格式: {宽度字符串: URL}}
+    """
+    variants = {}
+
+    with Image.open(source) as original:
+        source = ImageOps.exif_transpose(original)
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert('RGBA' if 'transparency' in source.info else 'RGB')
+
+        # 不放大：只保留小于原图宽度的尺寸，原图过小时至少输出一张原宽度
+        targets = sorted({w for w in widths if w < source.width}) or [source.width]
+
+        uploads = []
+        for width in targets:
+            height = max(1, round(source.height * width / source.width))
+            resized = source.resize((width, height), Image.Resampling.LANCZOS)
+
+            for image_format in _enabled_formats(formats):
+                pil_format, ext = DERIVATIVE_FORMATS[image_format]
+                image = resized
+                if pil_format == 'JPEG' and image.mode != 'RGB':
+                    # JPEG 不支持透明通道，铺白底
+                    background = Image.new('RGB', image.size, (255, 255, 255))
+                    background.paste(image, mask=image.getchannel('A'))
+                    image = background
+
+                buffer = BytesIO()
+                save_kwargs = {'quality': quality}
+                if pil_format == 'JPEG':
+                    save_kwargs.update(optimize=True, progressive=True)
+                image.save(buffer, format=pil_format, **save_kwargs)
+                buffer.seek(0)
+
+                object_name = f'covers/derivatives/{digest[:2]}/{digest}_{width}.{ext}'
+                uploads.append((image_format, width, object_name, buffer))
+
+    # 所有尺寸并发上传，并合并为一次存储提交
+    with storage.batch(f'Add cover derivatives: {digest[:12]}'):
+        futures = storage.upload_many(
+            (buffer, object_name) for _, _, object_name, buffer in uploads
+        )
+        for (image_format, width, object_name, _), future in zip(uploads, futures):
+            if not future.result():
+                raise IOError(f'衍生图上传失败: {object_name}')
+            variants.setdefault(image_format, {})[str(width)] = storage.get_url(object_name)
+
+    return variants
+
+
+def _apply_to_posts(source_url, variants_json):
+    """把衍生图写回使用该封面的文章"""
+    from app import db
+    from app.models.post import Post
+
+    Post.query.filter_by(cover_image=source_url).update(
+        {Post.cover_variants: variants_json}, synchronize_session=False
+    )
+    db.session.commit()
+
+
+def _process(app, record_id, file_path, remove_after):
+    """后台任务：生成衍生图并更新记录"""
+    from app import db
+    from app.models.image_derivative import ImageDerivative
+    from app.utils.storage import get_storage
+
+    with app.app_context():
+        record = ImageDerivative.query.get(record_id)
+        if record is None:
+            return
+
+        try:
+            variants = build_variants(
+                file_path,
+                record.content_hash,
+                get_storage(),
+                app.config['IMAGE_DERIVATIVE_WIDTHS'],
+                app.config['IMAGE_DERIVATIVE_FORMATS'],
+                app.config['IMAGE_DERIVATIVE_QUALITY'],
+            )
+            record.variants = json.dumps(variants)
+            record.status = 'ready'
+            db.session.commit()
+            _apply_to_posts(record.source_url, record.variants)
+            logger.info(f'衍生图生成完成: {record.source_url}')
+        except Exception as e:
+            db.session.rollback()
+            record = ImageDerivative.query.get(record_id)
+            if record is not None:
+                record.status = 'failed'
+                db.session.commit()
+            logger.error(f'衍生图生成失败: {str(e)}')
+        finally:
+            db.session.remove()
+            if remove_after:
+                remove_quietly(file_path)
+
+
+def schedule_derivatives(file_path, source_url, remove_after=False, digest=None):
+    """
+    登记并安排生成衍生图
+
+    若已有相同内容的衍生图则直接复用，不再重复生成和上传。
+    需要在应用上下文中调用。
+
+    Args:
+        file_path: 处理后的原图文件路径
+        source_url: 原图 URL
+        remove_after: 处理完成后删除 file_path（所有权交给本函数）
+        digest: 已算好的文件 SHA-256（可选）
+
+    Returns:
+        ImageDerivative: 衍生图记录
+    """
+    from flask import current_app
+    from app import db
+    from app.models.image_derivative import ImageDerivative
+
+    try:
+        digest = digest or file_sha256(file_path)
+    except Exception:
+        if remove_after:
+            remove_quietly(file_path)
+        raise
+
+    record = ImageDerivative.query.filter_by(source_url=source_url).first()
+    if record is not None and record.content_hash == digest and record.status != 'failed':
+        if remove_after:
+            remove_quietly(file_path)
+        return record
+
+    # 内容去重：复用已生成的同一图片
+    existing = ImageDerivative.query.filter_by(content_hash=digest, status='ready').first()
+
+    if record is None:
+        record = ImageDerivative(source_url=source_url)
+        db.session.add(record)
+    record.content_hash = digest
+
+    if existing is not None:
+        record.variants = existing.variants
+        record.status = 'ready'
+        db.session.commit()
+        logger.info(f'复用已有衍生图: {source_url}')
+        if remove_after:
+            remove_quietly(file_path)
+        return record
+
+    record.variants = None
+    record.status = 'pending'
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    if app.config.get('IMAGE_DERIVATIVES_ASYNC', True):
+        _executor.submit(_process, app, record.id, file_path, remove_after)
+    else:
+        _process(app, record.id, file_path, remove_after)
+    return record
+
+
+def attach_derivatives(post):
+    """
+    按封面 URL 把已生成的衍生图记录到文章上
+
+    衍生图尚未生成时置空，生成完成后由后台任务回填。
+
+    Args:
+        post: 文章对象
+    """
+    from app.models.image_derivative import ImageDerivative
+
+    post.cover_variants = None
+    if not post.cover_image:
+        return
+
+    record = ImageDerivative.query.filter_by(source_url=post.cover_image, status='ready').first()
+    if record is not None:
+        post.cover_variants = record.variants
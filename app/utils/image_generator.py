@@ -10,8 +10,10 @@ import os
 import uuid
 import re
 import logging
+import threading
 from datetime import datetime
 from io import BytesIO
+from flask import current_app, has_app_context
 from PIL import Image, ImageDraw, ImageFont
 
 # 配置日志
@@ -25,8 +27,61 @@ UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static
 # 确保上传目录存在
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# 字体缓存（避免重复加载）
-_font_cache = {}
+# 封面编码默认值（应用中使用 config.py 的 COVER_* 配置，见 cover_encode_options）
+DEFAULT_COVER_FORMAT = 'png'
+DEFAULT_COVER_PNG_COLORS = 16
+DEFAULT_COVER_PNG_COMPRESS_LEVEL = 6
+DEFAULT_COVER_WEBP_QUALITY = 80
+
+SUPPORTED_COVER_FORMATS = ('png', 'webp')
+
+# 项目内字体（按优先级排序，文件名相对于 app/static/fonts/）
+PROJECT_FONT_NAMES = [
+    'simkai.ttf',      # 楷体
+    'simsunb.ttf',     # 加粗宋体
+    'simsun.ttc',      # 宋体
+    'msyhbd.ttc',      # 微软雅黑粗体
+    'msyh.ttc',        # 微软雅黑
+    'simhei.ttf',      # 黑体
+    'wqy-zenhei.ttc',  # 文泉驿正黑
+]
+
+# 系统字体路径（按优先级排序）
+SYSTEM_FONT_PATHS = [
+    # === macOS 系统字体 ===
+    '/System/Library/Fonts/PingFang.ttc',
+    '/System/Library/Fonts/STHeiti Medium.ttc',
+    '/System/Library/Fonts/Hiragino Sans GB.ttc',
+    '/Library/Fonts/Arial Unicode.ttf',
+
+    # === Windows 系统字体 ===
+    'C:/Windows/Fonts/msyhbd.ttc',
+    'C:/Windows/Fonts/msyh.ttc',
+    'C:/Windows/Fonts/simhei.ttf',
+    'C:/Windows/Fonts/simsun.ttc',
+    'C:/Windows/Fonts/simkai.ttf',
+
+    # === Linux 中文字体（Render/服务器环境）===
+    '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc',
+    '/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',  # 备用
+]
+
+# 标题排版参数
+TITLE_MARGIN = 40
+TITLE_MAX_FONT_SIZE = 52
+TITLE_MIN_FONT_SIZE = 16
+TITLE_MAX_LINES = 3
+TITLE_LINE_SPACING = 1.25
+
+# 不可单独换行的英文/数字片段
+_WORD_PATTERN = re.compile(r'[A-Za-z0-9][A-Za-z0-9\'\-\.]*|\s+|.', re.S)
 
 
 def get_project_font_dir():
@@ -35,6 +90,201 @@ def get_project_font_dir():
     return os.path.join(os.path.dirname(current_dir), 'static', 'fonts')
 
 
+class FontManager:
+    """
+    封面字体管理器
+
+    字体文件只解析一次，之后按字号缓存 FreeTypeFont 对象和行高等度量，
+    供二分查找字号和多行排版复用。线程安全（gunicorn 多线程下共享）。
+    """
+
+    def __init__(self, font_path=None):
+        """
+        Args:
+            font_path: 指定字体文件路径（可选，默认自动检测）
+        """
+        self._font_path = font_path
+        self._resolved = font_path is not None
+        self._fonts = {}
+        self._line_heights = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _candidate_paths():
+        """按优先级列出候选字体路径"""
+        project_font_dir = get_project_font_dir()
+        candidates = [os.path.join(project_font_dir, name) for name in PROJECT_FONT_NAMES]
+
+        # 项目字体目录中的其他字体文件
+        if os.path.isdir(project_font_dir):
+            for name in sorted(os.listdir(project_font_dir)):
+                full_path = os.path.join(project_font_dir, name)
+                if name.endswith(('.ttf', '.ttc', '.otf')) and full_path not in candidates:
+                    candidates.append(full_path)
+
+        return candidates + SYSTEM_FONT_PATHS
+
+    def _resolve_font_path(self):
+        """探测第一个可加载的字体文件，返回路径或 None"""
+        for font_path in self._candidate_paths():
+            if not os.path.exists(font_path):
+                continue
+            try:
+                ImageFont.truetype(font_path, TITLE_MIN_FONT_SIZE)
+                logger.info(f"封面字体: {font_path}")
+                return font_path
+            except Exception as e:
+                logger.warning(f"字体加载失败 {font_path}: {e}")
+
+        logger.warning("无法加载中文字体，使用默认字体（中文将显示为方块）")
+        return None
+
+    @property
+    def font_path(self):
+        """已解析的字体文件路径（首次访问时探测）"""
+        if not self._resolved:
+            with self._lock:
+                if not self._resolved:
+                    self._font_path = self._resolve_font_path()
+                    self._resolved = True
+        return self._font_path
+
+    def get_font(self, size):
+        """
+        获取指定字号的字体（带缓存）
+
+        Args:
+            size: 字体大小
+
+        Returns:
+            PIL.ImageFont: 字体对象
+        """
+        font = self._fonts.get(size)
+        if font is not None:
+            return font
+
+        font_path = self.font_path
+        if font_path:
+            font = ImageFont.truetype(font_path, size)
+        else:
+            try:
+                font = ImageFont.load_default(size)
+            except TypeError:
+                # Pillow < 10.1 不支持指定默认字体大小
+                font = ImageFont.load_default()
+
+        self._fonts[size] = font
+        return font
+
+    def line_height(self, size):
+        """单行文字高度（ascent + descent）"""
+        height = self._line_heights.get(size)
+        if height is None:
+            font = self.get_font(size)
+            try:
+                ascent, descent = font.getmetrics()
+                height = ascent + descent
+            except AttributeError:
+                height = size
+            self._line_heights[size] = height
+        return height
+
+    def text_width(self, text, size):
+        """测量单行文字宽度"""
+        font = self.get_font(size)
+        try:
+            return font.getlength(text)
+        except AttributeError:
+            bbox = font.getbbox(text)
+            return bbox[2] - bbox[0]
+
+    def wrap_text(self, text, size, max_width):
+        """
+        按宽度贪心折行
+
+        中文按字符断行，英文单词和数字保持完整（超长单词按字符断开）。
+
+        Args:
+            text: 文本
+            size: 字体大小
+            max_width: 每行最大宽度
+
+        Returns:
+            list: 行列表
+        """
+        lines = []
+        current = ''
+        for token in _WORD_PATTERN.findall(text):
+            candidate = current + token
+            if self.text_width(candidate, size) <= max_width:
+                current = candidate
+                continue
+
+            if current.strip():
+                lines.append(current.rstrip())
+            current = token.lstrip()
+
+            # 单个片段本身超宽，逐字符断开
+            while current and self.text_width(current, size) > max_width:
+                cut = len(current) - 1
+                while cut > 1 and self.text_width(current[:cut], size) > max_width:
+                    cut -= 1
+                lines.append(current[:cut])
+                current = current[cut:]
+
+        if current.strip():
+            lines.append(current.rstrip())
+        return lines
+
+    def block_height(self, line_count, size):
+        """多行文字块的总高度"""
+        line_height = self.line_height(size)
+        return line_height + int(line_height * TITLE_LINE_SPACING) * (line_count - 1)
+
+    def fit_text(self, text, max_width, max_height, min_size=TITLE_MIN_FONT_SIZE,
+                 max_size=TITLE_MAX_FONT_SIZE, max_lines=TITLE_MAX_LINES):
+        """
+        二分查找能放下文本的最大字号
+
+        Args:
+            text: 文本
+            max_width: 最大宽度
+            max_height: 最大高度
+            min_size: 最小字号
+            max_size: 最大字号
+            max_lines: 最多行数
+
+        Returns:
+            tuple: (字号, 行列表)
+        """
+        def layout(size):
+            lines = self.wrap_text(text, size, max_width)
+            fits = len(lines) <= max_lines and self.block_height(len(lines), size) <= max_height
+            return fits, lines
+
+        best_size = min_size
+        best_lines = None
+        low, high = min_size, max_size
+        while low <= high:
+            mid = (low + high) // 2
+            fits, lines = layout(mid)
+            if fits:
+                best_size, best_lines = mid, lines
+                low = mid + 1
+            else:
+                high = mid - 1
+
+        if best_lines is None:
+            # 最小字号也放不下：截断到最大行数
+            best_lines = layout(min_size)[1][:max_lines]
+
+        return best_size, best_lines
+
+
+# 全局字体管理器
+font_manager = FontManager()
+
+
 def get_font(size, bold=True):
     """
     获取支持中文的字体
@@ -47,104 +297,26 @@ def get_font(size, bold=True):
 
     Args:
         size: 字体大小
-        bold: 是否使用粗体
+        bold: 是否使用粗体（保留参数，字体文件由 FontManager 统一解析）
 
     Returns:
         PIL.ImageFont: 字体对象
     """
-    # 使用缓存键
-    cache_key = f"font_{size}_{bold}"
-    if cache_key in _font_cache:
-        return _font_cache[cache_key]
-
-    # 项目内字体目录
-    project_font_dir = get_project_font_dir()
-
-    # 字体路径列表（按优先级排序）
-    font_paths = [
-        # === 项目内字体（最高优先级，确保部署可用）===
-        os.path.join(project_font_dir, 'simkai.ttf'),  # 楷体
-        os.path.join(project_font_dir, 'simsunb.ttf'), # 加粗宋体
-        os.path.join(project_font_dir, 'simsun.ttc'),  # 宋体
-        os.path.join(project_font_dir, 'msyhbd.ttc'),  # 微软雅黑粗体
-        os.path.join(project_font_dir, 'msyh.ttc'),    # 微软雅黑
-        os.path.join(project_font_dir, 'simhei.ttf'),  # 黑体
-        os.path.join(project_font_dir, 'wqy-zenhei.ttc'),  # 文泉驿正黑
-        os.path.join(project_font_dir, '*.ttf'),       # 任意 ttf
-        os.path.join(project_font_dir, '*.ttc'),       # 任意 ttc
-
-        # === macOS 系统字体 ===
-        '/System/Library/Fonts/PingFang.ttc',
-        '/System/Library/Fonts/STHeiti Medium.ttc',
-        '/System/Library/Fonts/Hiragino Sans GB.ttc',
-        '/Library/Fonts/Arial Unicode.ttf',
-
-        # === Windows 系统字体 ===
-        'C:/Windows/Fonts/msyhbd.ttc',
-        'C:/Windows/Fonts/msyh.ttc',
-        'C:/Windows/Fonts/simhei.ttf',
-        'C:/Windows/Fonts/simsun.ttc',
-        'C:/Windows/Fonts/simkai.ttf',
-
-        # === Linux 中文字体（Render/服务器环境）===
-        '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
-        '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
-        '/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc',
-        '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
-        '/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc',
-        '/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc',
-        '/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc',
-        '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
-        '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',  # 备用
-    ]
-
-    # 如果项目内有字体文件，也动态扫描
-    if os.path.exists(project_font_dir):
-        for f in sorted(os.listdir(project_font_dir)):
-            if f.endswith(('.ttf', '.ttc', '.otf')):
-                full_path = os.path.join(project_font_dir, f)
-                if full_path not in font_paths:
-                    font_paths.insert(0, full_path)  # 插入到最前面
-
-    # 尝试加载字体
-    for font_path in font_paths:
-        # 跳过通配符路径
-        if '*' in font_path:
-            continue
-
-        if os.path.exists(font_path):
-            try:
-                font = ImageFont.truetype(font_path, size)
-                logger.debug(f"使用字体: {font_path} (size={size})")
-                _font_cache[cache_key] = font
-                return font
-            except Exception as e:
-                logger.warning(f"字体加载失败 {font_path}: {e}")
-                continue
-
-    # 如果所有字体都失败，记录警告并使用默认字体
-    logger.warning("无法加载中文字体，使用默认字体（中文将显示为方块）")
-    default_font = ImageFont.load_default()
-    _font_cache[cache_key] = default_font
-    return default_font
+    return font_manager.get_font(size)
 
 
-def generate_cover_image(title, category_name=None, tags=None, content=None, storage=None):
+def render_cover(title):
     """
-    生成简约黑色风格封面图 - 完整标题显示
+    绘制封面图（灰度画布，黑字白底）
 
     Args:
         title: 文章标题
-        category_name: 分类名称（可选）
-        tags: 标签列表（可选）
-        content: 文章内容（可选，用于提取关键词）
-        storage: 存储后端对象（可选，如果不提供则自动获取）
 
     Returns:
-        str: 图片访问 URL（本地路径或 GitHub CDN URL）
+        PIL.Image: 'L' 模式图片
     """
-    # 创建纯白背景图片
-    image = Image.new('RGB', (COVER_WIDTH, COVER_HEIGHT), (255, 255, 255))
+    # 创建纯白背景图片（封面只有黑白两色，直接使用灰度画布）
+    image = Image.new('L', (COVER_WIDTH, COVER_HEIGHT), 255)
     draw = ImageDraw.Draw(image)
 
     if not title:
@@ -158,80 +330,155 @@ def generate_cover_image(title, category_name=None, tags=None, content=None, sto
         title = "文章标题"
 
     # 纯黑色
-    text_color = (0, 0, 0)
-
-    # 根据标题长度计算合适的字体大小
-    title_length = len(title)
-
-    # 智能字体大小计算
-    if title_length <= 10:
-        font_size = 52
-    elif title_length <= 15:
-        font_size = 44
-    elif title_length <= 20:
-        font_size = 38
-    elif title_length <= 30:
-        font_size = 32
-    elif title_length <= 45:
-        font_size = 26
+    text_color = 0
+
+    # 二分查找合适字号，长标题自动折行
+    max_width = COVER_WIDTH - TITLE_MARGIN * 2
+    max_height = COVER_HEIGHT - TITLE_MARGIN * 2
+    font_size, lines = font_manager.fit_text(title, max_width, max_height)
+    font = font_manager.get_font(font_size)
+
+    # 计算垂直居中位置
+    line_step = int(font_manager.line_height(font_size) * TITLE_LINE_SPACING)
+    block_height = font_manager.block_height(len(lines), font_size)
+    y = max(TITLE_MARGIN, (COVER_HEIGHT - block_height) // 2)
+
+    # 逐行水平居中绘制黑色文字
+    for line in lines:
+        line_width = font_manager.text_width(line, font_size)
+        x = max(TITLE_MARGIN, int((COVER_WIDTH - line_width) // 2))
+        draw.text((x, y), line, fill=text_color, font=font)
+        y += line_step
+
+    return image
+
+
+def _grey_palette_lut(colors):
+    """生成灰度 → 调色板索引的映射表和对应调色板"""
+    bits = max(1, (colors - 1).bit_length())
+    # PNG 调色板只支持 1/2/4/8 位
+    bits = next(b for b in (1, 2, 4, 8) if b >= bits)
+    levels = 2 ** bits
+    lut = [round(v * (levels - 1) / 255) for v in range(256)]
+    palette = []
+    for i in range(levels):
+        palette.extend([round(i * 255 / (levels - 1))] * 3)
+    return lut, palette, bits
+
+
+def cover_encode_options():
+    """
+    当前应用的封面编码参数（COVER_* 配置）
+
+    Returns:
+        dict: encode_cover 的关键字参数，不在应用上下文中时为空（使用默认值）
+    """
+    if not has_app_context():
+        return {}
+    config = current_app.config
+    return {
+        'image_format': config['COVER_FORMAT'],
+        'quality': config['COVER_WEBP_QUALITY'],
+        'colors': config['COVER_PNG_COLORS'],
+        'compress_level': config['COVER_PNG_COMPRESS_LEVEL'],
+    }
+
+
+def encode_cover(image, image_format=DEFAULT_COVER_FORMAT, quality=DEFAULT_COVER_WEBP_QUALITY,
+                 colors=DEFAULT_COVER_PNG_COLORS, compress_level=DEFAULT_COVER_PNG_COMPRESS_LEVEL):
+    """
+    编码封面图
+
+    - png: 灰度调色板 PNG（默认 16 阶 4-bit，保留抗锯齿边缘）
+    - webp: 有损/无损 WebP
+
+    Args:
+        image: 'L' 模式封面图
+        image_format: 输出格式（png / webp）
+        quality: WebP 质量（1-100，100 为无损）
+        colors: PNG 灰阶数（2 / 4 / 16 / 256）
+        compress_level: PNG zlib 压缩级别
+
+    Returns:
+        tuple: (编码后的字节, 文件扩展名)
+    """
+    image_format = image_format.lower()
+    if image_format not in SUPPORTED_COVER_FORMATS:
+        logger.warning(f"不支持的封面格式 {image_format}，使用 png")
+        image_format = 'png'
+
+    if image.mode != 'L':
+        image = image.convert('L')
+
+    buffer = BytesIO()
+    if image_format == 'webp':
+        if quality >= 100:
+            image.save(buffer, format='WEBP', lossless=True)
+        else:
+            image.save(buffer, format='WEBP', quality=quality)
     else:
-        font_size = 22
+        lut, palette, bits = _grey_palette_lut(colors)
+        # 查表映射灰度到调色板索引，比 quantize() 快一个数量级
+        indexed = Image.frombytes('P', image.size, image.point(lut).tobytes())
+        indexed.putpalette(palette)
+        indexed.save(buffer, format='PNG', bits=bits, compress_level=compress_level)
 
-    # 获取字体
-    font = get_font(font_size)
+    return buffer.getvalue(), image_format
 
-    # 测量文本尺寸
-    try:
-        bbox = font.getbbox(title)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-    except:
-        text_width = len(title) * (font_size // 2)
-        text_height = font_size
-
-    # 如果文字太宽，逐步缩小字体
-    max_width = COVER_WIDTH - 80
-    while text_width > max_width and font_size > 16:
-        font_size -= 2
-        font = get_font(font_size)
-        try:
-            bbox = font.getbbox(title)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-        except:
-            text_width = len(title) * (font_size // 2)
-            text_height = font_size
 
-    # 计算居中位置
-    center_x = COVER_WIDTH // 2
-    center_y = COVER_HEIGHT // 2
+def prepare_cover(title):
+    """
+    绘制并编码封面图
 
-    x = center_x - text_width // 2
-    y = center_y - text_height // 2
+    Args:
+        title: 文章标题
 
-    # 确保在画布内
-    x = max(40, min(x, COVER_WIDTH - text_width - 40))
-    y = max(40, min(y, COVER_HEIGHT - text_height - 40))
+    Returns:
+        tuple: (编码后的字节, 文件名)
+    """
+    # 只编码一次，上传和本地回退共用同一份字节
+    data, ext = encode_cover(render_cover(title), **cover_encode_options())
+    filename = f"cover_{uuid.uuid4().hex[:12]}_{int(datetime.now().timestamp())}.{ext}"
+    return data, filename
 
-    # 绘制黑色文字
-    draw.text((x, y), title, fill=text_color, font=font)
 
-    # 生成文件名
-    filename = f"cover_{uuid.uuid4().hex[:12]}_{int(datetime.now().timestamp())}.png"
+def _resolve_storage(storage):
+    """未提供存储后端时尝试获取默认后端"""
+    if storage is not None:
+        return storage
+    try:
+        from .storage import get_storage
+        return get_storage()
+    except Exception:
+        logger.warning("无法获取存储后端，将使用本地存储")
+        return None
 
-    # 先保存到内存（用于上传）
-    img_buffer = BytesIO()
-    image.save(img_buffer, format='PNG', optimize=True)
-    img_buffer.seek(0)
 
-    # 如果没有提供存储后端，尝试获取
-    if storage is None:
-        try:
-            from .storage import get_storage
-            storage = get_storage()
-        except:
-            storage = None
-            logger.warning("无法获取存储后端，将使用本地存储")
+def _save_local_cover(data, filename, title):
+    """回退到本地存储"""
+    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    with open(filepath, 'wb') as f:
+        f.write(data)
+    logger.info(f"封面图已保存到本地: {filename} (标题: {title})")
+    return f"/static/uploads/covers/{filename}"
+
+
+def generate_cover_image(title, category_name=None, tags=None, content=None, storage=None):
+    """
+    生成简约黑色风格封面图 - 完整标题显示
+
+    Args:
+        title: 文章标题
+        category_name: 分类名称（可选）
+        tags: 标签列表（可选）
+        content: 文章内容（可选，用于提取关键词）
+        storage: 存储后端对象（可选，如果不提供则自动获取）
+
+    Returns:
+        str: 图片访问 URL（本地路径或 GitHub CDN URL）
+    """
+    data, filename = prepare_cover(title)
+    storage = _resolve_storage(storage)
 
     # 使用存储后端上传
     if storage is not None:
@@ -239,7 +486,7 @@ def generate_cover_image(title, category_name=None, tags=None, content=None, sto
 
         # 上传文件对象
         try:
-            if storage.upload_fileobj(img_buffer, object_name):
+            if storage.upload_fileobj(BytesIO(data), object_name):
                 url = storage.get_url(object_name)
                 logger.info(f"封面图已上传到存储: {filename} (标题: {title})")
                 return url
@@ -248,12 +495,56 @@ def generate_cover_image(title, category_name=None, tags=None, content=None, sto
         except Exception as e:
             logger.warning(f"存储上传异常: {e}，回退到本地存储")
 
-    # 回退到本地存储
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
-    image.save(filepath, 'PNG', optimize=True)
-    logger.info(f"封面图已保存到本地: {filename} (标题: {title})")
+    return _save_local_cover(data, filename, title)
 
-    return f"/static/uploads/covers/{filename}"
+
+def generate_cover_images(titles, storage=None):
+    """
+    批量生成封面图并并发上传
+
+    通过 storage.upload_many 一次推送所有封面，上传失败的回退到本地存储。
+
+    Args:
+        titles: 标题列表
+        storage: 存储后端对象（可选）
+
+    Returns:
+        list: 与 titles 一一对应的图片 URL，生成失败的为 None
+    """
+    covers = []
+    for title in titles:
+        try:
+            covers.append(prepare_cover(title))
+        except Exception as e:
+            logger.error(f"封面图生成失败: {e} (标题: {title})")
+            covers.append(None)
+
+    storage = _resolve_storage(storage)
+    ready = [(index, cover) for index, cover in enumerate(covers) if cover is not None]
+
+    futures = {}
+    if storage is not None and ready:
+        submitted = storage.upload_many(
+            (BytesIO(data), f"covers/{filename}") for _, (data, filename) in ready
+        )
+        futures = {index: future for (index, _), future in zip(ready, submitted)}
+
+    urls = [None] * len(titles)
+    for index, (data, filename) in ready:
+        uploaded = False
+        if index in futures:
+            try:
+                uploaded = futures[index].result()
+            except Exception as e:
+                logger.warning(f"存储上传异常: {e}，回退到本地存储")
+
+        if uploaded:
+            urls[index] = storage.get_url(f"covers/{filename}")
+        else:
+            urls[index] = _save_local_cover(data, filename, titles[index])
+
+    logger.info(f"批量生成封面图: {len(ready)}/{len(titles)} 张")
+    return urls
 
 
 def generate_cover_from_post(post, storage=None):
@@ -272,6 +563,60 @@ def generate_cover_from_post(post, storage=None):
     return generate_cover_image(post.title, category_name, tags, post.content, storage=storage)
 
 
+def benchmark_cover_encoding(titles=None, rounds=10):
+    """
+    对比各封面编码方式的耗时和体积
+
+    Args:
+        titles: 测试标题列表（可选）
+        rounds: 每个标题的编码次数
+
+    Returns:
+        list: [{'name', 'avg_ms', 'avg_bytes'}]，按平均耗时升序
+    """
+    import time
+
+    titles = titles or [
+        "Flask 入门",
+        "信息安全专业大三突围指南",
+        "A fairly long English title about Flask performance engineering",
+        "从零开始搭建个人博客系统：数据库设计、缓存策略与部署实践全记录",
+    ]
+    images = [render_cover(title) for title in titles]
+    quality = cover_encode_options().get('quality', DEFAULT_COVER_WEBP_QUALITY)
+
+    def legacy_rgb_png(image):
+        # 旧实现：RGB PNG + optimize
+        buffer = BytesIO()
+        image.convert('RGB').save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue()
+
+    encoders = [
+        ('rgb-png-optimize (旧)', legacy_rgb_png),
+        ('png-16', lambda image: encode_cover(image, 'png', colors=16)[0]),
+        ('png-2 (1-bit)', lambda image: encode_cover(image, 'png', colors=2)[0]),
+        (f'webp-q{quality}', lambda image: encode_cover(image, 'webp', quality=quality)[0]),
+        ('webp-lossless', lambda image: encode_cover(image, 'webp', quality=100)[0]),
+    ]
+
+    results = []
+    for name, encoder in encoders:
+        total_bytes = 0
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for image in images:
+                total_bytes += len(encoder(image))
+        elapsed = time.perf_counter() - start
+        count = rounds * len(images)
+        results.append({
+            'name': name,
+            'avg_ms': elapsed * 1000 / count,
+            'avg_bytes': total_bytes // count,
+        })
+
+    return sorted(results, key=lambda r: r['avg_ms'])
+
+
 def test_font_loading():
     """测试字体加载（用于调试）"""
     print("=== 字体加载测试 ===")
@@ -287,6 +632,13 @@ def test_font_loading():
     font = get_font(40)
     bbox = font.getbbox(test_text)
     print(f"文本尺寸: {bbox}")
+    print(f"字体文件: {font_manager.font_path}")
+
+    # 测试长标题折行
+    long_title = test_text * 4
+    size, lines = font_manager.fit_text(long_title, COVER_WIDTH - TITLE_MARGIN * 2,
+                                        COVER_HEIGHT - TITLE_MARGIN * 2)
+    print(f"长标题排版: size={size}, lines={len(lines)}")
 
     # 项目字体目录
     project_font_dir = get_project_font_dir()
@@ -0,0 +1,206 @@
+"""
+图片上传处理模块
+
+上传内容先落盘到临时文件，再用 PIL 的 draft()/reduce() 在解码阶段缩小大图，
+结果写入另一个临时文件后交给存储后端流式上传。整个过程不把上传内容整体读入内存，
+单次上传的内存峰值取决于 MAX_IMAGE_SIZE，与文件大小无关（flask benchmark-upload 测量并检查上限）。
+"""
+
+import os
+import sys
+import shutil
+import resource
+import hashlib
+import tempfile
+import logging
+from PIL import Image
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 流式读写的块大小
+CHUNK_SIZE = 64 * 1024
+
+
+def spool_upload(stream, suffix=''):
+    """
+    把上传流分块写入临时文件
+
+    Args:
+        stream: 上传文件流（werkzeug FileStorage.stream 等）
+        suffix: 临时文件后缀
+
+    Returns:
+        str: 临时文件路径（调用方负责删除）
+    """
+    fd, path = tempfile.mkstemp(prefix='upload_', suffix=suffix)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            shutil.copyfileobj(stream, f, CHUNK_SIZE)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def downscale_image(src_path, max_size, quality=95):
+    """
+    校验并缩小图片，写入新的临时文件
+
+    JPEG 通过 draft() 在 DCT 解码阶段直接按 1/2、1/4、1/8 缩小，
+    其他格式先用 reduce() 做整数倍缩小，最后 thumbnail() 精确缩放到上限内。
+
+    Args:
+        src_path: 原图路径
+        max_size: 最大尺寸 (宽, 高)
+        quality: 编码质量
+
+    Returns:
+        tuple: (输出临时文件路径, 图片格式)
+    """
+    with Image.open(src_path) as img:
+        img_format = img.format or 'JPEG'
+        max_width, max_height = max_size
+
+        if img.width > max_width or img.height > max_height:
+            # 等比缩放后的目标尺寸：按较长的一边对齐上限，解码和整数倍缩小都以它为准
+            ratio = max(img.width / max_width, img.height / max_height)
+            target = (max(int(img.width / ratio), 1), max(int(img.height / ratio), 1))
+            if img_format == 'JPEG':
+                img.draft(img.mode, target)
+
+            factor = min(img.width // target[0], img.height // target[1])
+            if factor >= 2:
+                img = img.reduce(factor)
+
+            img.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+        fd, dest_path = tempfile.mkstemp(prefix='image_', suffix=f'.{img_format.lower()}')
+        os.close(fd)
+        try:
+            img.save(dest_path, format=img_format, quality=quality, optimize=True)
+        except Exception:
+            os.remove(dest_path)
+            raise
+
+    return dest_path, img_format
+
+
+def file_sha256(path):
+    """分块计算文件 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def remove_quietly(path):
+    """删除临时文件，忽略不存在的情况"""
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# benchmark-upload 的默认测试图片：4800 万像素照片（完整解码约 190MB，PIL 的 RGB 每像素 4 字节）
+BENCHMARK_IMAGE_SIZE = (8000, 6000)
+# 流式流程允许的 RSS 峰值增量（MB）：默认图片在解码阶段缩小到 4000x3000，再缩放到 3000x2250，实测约 115MB。
+# 两边都略小于 MAX_IMAGE_SIZE 两倍的 JPEG 无法在解码阶段缩小，是最坏情况（约 250MB），
+# 可用 --width/--height/--limit 单独检查
+UPLOAD_MEMORY_LIMIT_MB = 128
+
+
+def _peak_rss():
+    """
+    当前进程的 RSS 峰值（字节）
+
+    Linux 上读 /proc/self/status 的 VmHWM：ru_maxrss 在 exec 后保留 fork 前父进程的峰值，
+    spawn 出的子进程一开始就是父进程的大小。其他系统使用 ru_maxrss（macOS 以字节为单位）。
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _in_memory_flow(source_path, max_size):
+    """旧流程：整个文件读入内存，PIL 完整解码后缩小，再整体 base64"""
+    import base64
+    from io import BytesIO
+
+    with open(source_path, 'rb') as f:
+        data = f.read()
+    with Image.open(BytesIO(data)) as img:
+        img.thumbnail(max_size, Image.Resampling.LANCZOS)
+        output = BytesIO()
+        img.save(output, format='JPEG', quality=95, optimize=True)
+    base64.b64encode(output.getvalue()).decode('utf-8')
+
+
+def _streaming_flow(source_path, max_size):
+    """新流程：分块落盘，解码阶段缩小，请求体分块 base64"""
+    from app.utils.storage import Base64JSONBody
+
+    with open(source_path, 'rb') as f:
+        spooled = spool_upload(f, '.jpg')
+    processed = None
+    try:
+        processed, _ = downscale_image(spooled, max_size)
+        with open(processed, 'rb') as f:
+            for _ in Base64JSONBody({'message': 'benchmark'}, f):
+                pass
+    finally:
+        remove_quietly(spooled)
+        remove_quietly(processed)
+
+
+def _measure_flow(flow, source_path, max_size):
+    """在子进程中执行流程，返回 RSS 峰值相对执行前的增量（字节）"""
+    baseline = _peak_rss()
+    flow(source_path, max_size)
+    return max(_peak_rss() - baseline, 0)
+
+
+def benchmark_upload_memory(image_size=BENCHMARK_IMAGE_SIZE, max_size=(3000, 3000)):
+    """
+    测量单次上传处理的内存峰值
+
+    生成一张 image_size 尺寸的 JPEG，旧的全内存流程和新的落盘流程各在一个新的子进程中执行，
+    比较执行前后的 RSS 峰值（ru_maxrss）。RSS 包含 PIL 在 C 层分配的图像缓冲区，
+    tracemalloc 只统计 Python 对象，看不到这部分内存。
+
+    Args:
+        image_size: 测试图片尺寸 (宽, 高)
+        max_size: 最大尺寸（与上传接口的 MAX_IMAGE_SIZE 一致）
+
+    Returns:
+        dict: {'source_bytes', 'in_memory_peak', 'streaming_peak'}，峰值单位为字节
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    fd, source_path = tempfile.mkstemp(suffix='.jpg')
+    os.close(fd)
+    # 噪点叠加渐变，接近照片的压缩率；先在小图上生成再放大，避免生成过程本身占用大量内存
+    width, height = image_size
+    Image.effect_noise((width // 4, height // 4), 32).convert('RGB') \
+        .resize(image_size, Image.Resampling.BILINEAR).save(source_path, 'JPEG', quality=90)
+
+    results = {'source_bytes': os.path.getsize(source_path)}
+    # spawn 启动的子进程没有继承父进程的内存，每个流程单独一个进程，峰值互不影响
+    context = multiprocessing.get_context('spawn')
+    try:
+        for name, flow in (('in_memory_peak', _in_memory_flow), ('streaming_peak', _streaming_flow)):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results[name] = executor.submit(_measure_flow, flow, source_path, max_size).result()
+    finally:
+        remove_quietly(source_path)
+
+    return results
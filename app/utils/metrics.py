@@ -0,0 +1,161 @@
+"""
+Prometheus 指标模块
+
+指标在 /metrics 以 Prometheus 文本格式导出：
+- 请求数、耗时、SQL 条数与数据库耗时（按端点，数据来自 app.utils.request_metrics）
+- 缓存命中/未命中
+- 文章浏览数、尚未写入数据库的浏览数积压、限流拒绝数
+- GitHub 图床 API 请求耗时（按操作、状态码）
+- 定时发布任务的执行次数、发布文章数、上次执行时间、待发布文章数
+
+多个 gunicorn worker：设置环境变量 PROMETHEUS_MULTIPROC_DIR（启动前必须存在且为空）后，
+prometheus_client 把每个进程的指标写入该目录下的 mmap 文件，导出时合并所有进程的数据，
+flask publish-scheduled 等 CLI 进程的指标也会合并进来（见 gunicorn.conf.py）。
+未设置时只导出当前进程的指标。
+
+/metrics 需要 Authorization: Bearer <METRICS_TOKEN>，或已登录后台。
+"""
+
+import os
+import hmac
+import logging
+from urllib.parse import urlparse
+from flask import Response, current_app, request
+from flask_login import current_user
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess,
+)
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 请求耗时桶（秒），与 request_metrics.BUCKETS_MS 一致
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REQUESTS = Counter(
+    'blog_http_requests_total', '请求数',
+    ['endpoint', 'method', 'status'],
+)
+REQUEST_LATENCY = Histogram(
+    'blog_http_request_duration_seconds', '请求总耗时',
+    ['endpoint'], buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    'blog_http_request_db_seconds', '每个请求的 SQL 耗时',
+    ['endpoint'], buckets=LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    'blog_http_request_queries', '每个请求执行的 SQL 条数',
+    ['endpoint'], buckets=(1, 2, 5, 10, 20, 50, 100),
+)
+CACHE_REQUESTS = Counter(
+    'blog_cache_requests_total', '缓存读取次数',
+    ['result'],
+)
+POST_VIEWS = Counter(
+    'blog_post_views_total', '文章浏览数',
+)
+POST_VIEWS_PENDING = Gauge(
+    'blog_post_views_pending', '已记录但尚未写入数据库的文章浏览数（见 app.utils.view_counter）',
+    multiprocess_mode='livesum',
+)
+RATE_LIMITED = Counter(
+    'blog_rate_limited_total', '被限流拒绝的请求数',
+    ['endpoint'],
+)
+GITHUB_API_LATENCY = Histogram(
+    'blog_github_api_duration_seconds', 'GitHub 图床 API 请求耗时',
+    ['operation', 'method'], buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+GITHUB_API_REQUESTS = Counter(
+    'blog_github_api_requests_total', 'GitHub 图床 API 请求数',
+    ['operation', 'method', 'status'],
+)
+SCHEDULER_RUNS = Counter(
+    'blog_scheduler_runs_total', '定时发布任务执行次数',
+    ['result'],
+)
+SCHEDULER_PUBLISHED = Counter(
+    'blog_scheduler_published_posts_total', '定时发布的文章数',
+)
+SCHEDULER_LAST_RUN = Gauge(
+    'blog_scheduler_last_run_timestamp_seconds', '定时发布任务上次执行时间',
+    multiprocess_mode='max',
+)
+SCHEDULED_PENDING = Gauge(
+    'blog_scheduled_posts_pending', '尚未到发布时间的定时文章数（上次执行任务时统计）',
+    multiprocess_mode='mostrecent',
+)
+
+
+def observe_request(endpoint, method, status_code, total, stats):
+    """
+    记录一个请求
+
+    Args:
+        total: 总耗时（秒）
+        stats: request_metrics.RequestStats
+    """
+    REQUESTS.labels(endpoint, method, str(status_code)).inc()
+    REQUEST_LATENCY.labels(endpoint).observe(total)
+    REQUEST_DB_TIME.labels(endpoint).observe(stats.db_time)
+    REQUEST_QUERIES.labels(endpoint).observe(stats.queries)
+
+
+def observe_cache(hit):
+    CACHE_REQUESTS.labels('hit' if hit else 'miss').inc()
+
+
+def _github_operation(url):
+    """GitHub API 地址对应的操作名（contents、blobs、trees、commits、refs）"""
+    parts = urlparse(url).path.split('/')
+    for name in ('contents', 'blobs', 'trees', 'commits', 'refs'):
+        if name in parts:
+            return name
+    return 'other'
+
+
+def observe_github_response(response, *args, **kwargs):
+    """requests 响应钩子：记录 GitHub API 请求耗时（重试的每次请求分别记录）"""
+    operation = _github_operation(response.url)
+    method = response.request.method
+    GITHUB_API_LATENCY.labels(operation, method).observe(response.elapsed.total_seconds())
+    GITHUB_API_REQUESTS.labels(operation, method, str(response.status_code)).inc()
+
+
+def render_latest():
+    """
+    生成 Prometheus 文本格式的指标
+
+    Returns:
+        tuple: (内容, Content-Type)
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def _authorized():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    return current_user.is_authenticated
+
+
+def metrics_view():
+    """Prometheus 抓取接口"""
+    if not _authorized():
+        return Response('Unauthorized\n', status=401, mimetype='text/plain',
+                        headers={'WWW-Authenticate': 'Bearer'})
+    body, content_type = render_latest()
+    return Response(body, content_type=content_type)
+
+
+def init_app(app):
+    """注册 /metrics（METRICS_ENABLED 关闭时不注册）"""
+    if app.config['METRICS_ENABLED']:
+        app.add_url_rule('/metrics', 'metrics', metrics_view)
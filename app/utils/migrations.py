@@ -0,0 +1,263 @@
+"""
+数据库迁移模块
+
+迁移脚本放在 app/migrations/ 下，文件名为 <四位版本号>_<名称>.py，按版本号顺序执行，
+已执行的版本记录在 schema_version 表中：
+- flask db upgrade: 执行所有未执行的迁移（--to 指定目标版本）
+- flask db current / flask db history: 查看当前版本和迁移列表
+
+每个迁移脚本定义 upgrade(ctx)，ctx 为 MigrationContext。默认在事务中执行；
+脚本中设置 TRANSACTIONAL = False 时以自动提交模式执行，用于
+PostgreSQL 的 CREATE INDEX CONCURRENTLY（不能在事务中执行，建索引期间不锁写）。
+迁移脚本需要可重复执行（先检查列、索引是否存在），这样没有版本表的旧数据库也能直接升级。
+
+应用启动时只读取一次当前版本号与最新迁移比较，不再反射表结构；
+AUTO_MIGRATE 打开时（开发、测试环境）自动执行迁移。
+"""
+
+import os
+import re
+import logging
+import importlib
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.schema import CreateIndex
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 迁移脚本所在的包
+MIGRATIONS_PACKAGE = 'app.migrations'
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
+
+_MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+# PostgreSQL 咨询锁 ID，防止多个进程同时执行迁移
+_ADVISORY_LOCK_ID = 72167001
+
+# 版本表（不属于模型的 metadata，db.create_all() 不会处理它）
+version_table = Table(
+    'schema_version', MetaData(),
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+class Migration:
+    """一个迁移脚本"""
+
+    def __init__(self, version, name):
+        self.version = version
+        self.name = name
+        self._module = None
+
+    @property
+    def module(self):
+        if self._module is None:
+            self._module = importlib.import_module(f'{MIGRATIONS_PACKAGE}.{self.version:04d}_{self.name}')
+        return self._module
+
+    @property
+    def description(self):
+        """脚本文档字符串的第一行"""
+        return (self.module.__doc__ or self.name).strip().splitlines()[0]
+
+    @property
+    def transactional(self):
+        return getattr(self.module, 'TRANSACTIONAL', True)
+
+    def upgrade(self, ctx):
+        self.module.upgrade(ctx)
+
+    def __repr__(self):
+        return f'<Migration {self.version:04d}_{self.name}>'
+
+
+class MigrationContext:
+    """迁移脚本中使用的辅助方法"""
+
+    def __init__(self, connection, db):
+        self.connection = connection
+        self.db = db
+        self.dialect = connection.dialect.name
+
+    def execute(self, sql, **params):
+        """执行 SQL"""
+        return self.connection.execute(text(sql), params)
+
+    def quote(self, name):
+        """引用标识符（user 等保留字）"""
+        return self.connection.dialect.identifier_preparer.quote(name)
+
+    def has_table(self, table):
+        return inspect(self.connection).has_table(table)
+
+    def has_column(self, table, column):
+        return column in {c['name'] for c in inspect(self.connection).get_columns(table)}
+
+    def has_index(self, table, index):
+        return index in {i['name'] for i in inspect(self.connection).get_indexes(table)}
+
+    def create_tables(self):
+        """创建模型中声明但不存在的表（已有的表不修改）"""
+        self.db.metadata.create_all(self.connection)
+
+    def add_column(self, table, column, ddl):
+        """
+        添加列（已存在时跳过）
+
+        Args:
+            table: 表名
+            column: 列名
+            ddl: 类型及约束，如 "VARCHAR(20) DEFAULT 'public'"
+
+        Returns:
+            bool: 是否新建
+        """
+        if self.has_column(table, column):
+            return False
+        self.execute(f'ALTER TABLE {self.quote(table)} ADD COLUMN {self.quote(column)} {ddl}')
+        logger.info(f'已添加列 {table}.{column}')
+        return True
+
+    def create_indexes(self, table):
+        """
+        创建模型中为 table 声明、但数据库中不存在的索引
+
+        PostgreSQL 上使用 CREATE INDEX CONCURRENTLY，调用的迁移需要设置 TRANSACTIONAL = False。
+
+        Returns:
+            list: 新建的索引名
+        """
+        created = []
+        for index in sorted(self.db.metadata.tables[table].indexes, key=lambda i: i.name):
+            if self.has_index(table, index.name):
+                continue
+            ddl = str(CreateIndex(index).compile(dialect=self.connection.dialect))
+            autocommit = self.connection.get_execution_options().get('isolation_level') == 'AUTOCOMMIT'
+            if self.dialect == 'postgresql' and autocommit:
+                ddl = re.sub(r'^CREATE (UNIQUE )?INDEX', r'CREATE \1INDEX CONCURRENTLY', ddl)
+            self.connection.exec_driver_sql(ddl)
+            logger.info(f'已创建索引 {index.name} ON {table}')
+            created.append(index.name)
+        return created
+
+
+def load_migrations():
+    """
+    按版本号排序的迁移列表
+
+    Raises:
+        ValueError: 版本号重复
+    """
+    migrations = {}
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = _MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f'迁移版本号重复: {version:04d}')
+        migrations[version] = Migration(version, match.group(2))
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def head_version():
+    """最新迁移的版本号（只读取文件名）"""
+    versions = [int(m.group(1)) for m in map(_MIGRATION_FILE.match, os.listdir(MIGRATIONS_DIR)) if m]
+    return max(versions, default=0)
+
+
+def current_version(engine):
+    """
+    数据库当前的版本号
+
+    Returns:
+        int|None: 版本号，没有版本表（从未执行过迁移）时返回 None
+    """
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(version_table.c.version))).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return None
+
+
+def applied_versions(engine):
+    """已执行的迁移 {版本号: 执行时间}"""
+    if current_version(engine) is None:
+        return {}
+    with engine.connect() as conn:
+        return dict(conn.execute(select(version_table.c.version, version_table.c.applied_at)).all())
+
+
+def upgrade(db, target=None):
+    """
+    执行未执行的迁移
+
+    Args:
+        db: Flask-SQLAlchemy 实例
+        target: 目标版本号，None 表示最新
+
+    Returns:
+        list: 本次执行的 Migration
+    """
+    engine = db.engine
+    version_table.create(engine, checkfirst=True)
+
+    lock_conn = None
+    if engine.dialect.name == 'postgresql':
+        # 会话级锁，连接本身不开事务（空闲事务会让 CREATE INDEX CONCURRENTLY 一直等待）
+        lock_conn = engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+        lock_conn.exec_driver_sql(f'SELECT pg_advisory_lock({_ADVISORY_LOCK_ID})')
+
+    try:
+        # 获取锁之后再读取版本，其他进程可能刚执行完
+        done = set(applied_versions(engine))
+        pending = [m for m in load_migrations()
+                   if m.version not in done and (target is None or m.version <= target)]
+
+        for migration in pending:
+            logger.info(f'执行迁移 {migration.version:04d}_{migration.name}')
+            if migration.transactional:
+                with engine.begin() as conn:
+                    migration.upgrade(MigrationContext(conn, db))
+                    _record(conn, migration)
+            else:
+                with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                    migration.upgrade(MigrationContext(conn, db))
+                with engine.begin() as conn:
+                    _record(conn, migration)
+        return pending
+    finally:
+        if lock_conn is not None:
+            lock_conn.exec_driver_sql(f'SELECT pg_advisory_unlock({_ADVISORY_LOCK_ID})')
+            lock_conn.close()
+
+
+def _record(conn, migration):
+    conn.execute(version_table.insert().values(
+        version=migration.version, name=migration.name, applied_at=datetime.utcnow()
+    ))
+
+
+def check_schema(app, db):
+    """
+    启动时检查数据库版本
+
+    只读取一次版本号；落后时如果打开了 AUTO_MIGRATE 则执行迁移，否则记录警告。
+    """
+    with app.app_context():
+        version = current_version(db.engine)
+        head = head_version()
+        if version is not None and version >= head:
+            return
+
+        if app.config.get('AUTO_MIGRATE'):
+            applied = upgrade(db)
+            app.logger.info(f'已执行 {len(applied)} 个数据库迁移')
+        else:
+            app.logger.warning(
+                f'数据库版本 {version or 0} 落后于最新迁移 {head}，请执行 flask db upgrade'
+            )
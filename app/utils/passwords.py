@@ -0,0 +1,126 @@
+"""
+密码哈希策略模块
+
+- 哈希算法和成本由 PASSWORD_HASH_METHOD 配置（werkzeug 的 method 格式，
+  如 scrypt:32768:8:1、pbkdf2:sha256:600000），测试环境使用低成本参数
+- 登录验证成功后，如果存储的哈希参数与当前配置不一致，透明地用新参数重新哈希
+- 哈希和验证在有界线程池中执行：同时进行的 KDF 计算不超过 PASSWORD_HASH_WORKERS 个，
+  排队超过 PASSWORD_HASH_QUEUE 个时等待 PASSWORD_HASH_TIMEOUT 秒后放弃，
+  暴力登录时不会把所有请求线程都耗在 KDF 上（hashlib 计算期间释放 GIL）
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from flask import current_app
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认哈希方式（与 werkzeug 默认值一致）
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+
+class PasswordHasherBusy(ServiceUnavailable):
+    """哈希线程池已满"""
+    description = '服务器繁忙，请稍后再试'
+
+
+class PasswordHasher:
+    """有界线程池中执行的密码哈希"""
+
+    def __init__(self, workers=2, queue_size=8, timeout=5):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        # 执行中和排队中的任务总数上限
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def run(self, func, *args):
+        """
+        在线程池中执行 func 并等待结果
+
+        Raises:
+            PasswordHasherBusy: 等待 timeout 秒仍没有空位
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            logger.warning('密码哈希线程池已满，拒绝请求')
+            raise PasswordHasherBusy()
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+
+# 全局哈希器实例
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher():
+    """获取当前配置的哈希器"""
+    global _hasher
+
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                config = current_app.config
+                _hasher = PasswordHasher(
+                    workers=config['PASSWORD_HASH_WORKERS'],
+                    queue_size=config['PASSWORD_HASH_QUEUE'],
+                    timeout=config['PASSWORD_HASH_TIMEOUT']
+                )
+    return _hasher
+
+
+def _method():
+    return current_app.config.get('PASSWORD_HASH_METHOD') or DEFAULT_METHOD
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+    """
+    method 对应的哈希前缀（如 scrypt → scrypt:32768:8:1）
+
+    由 werkzeug 补全省略的默认参数，结果按 method 缓存，每个进程只计算一次。
+    """
+    return generate_password_hash('', method=method, salt_length=1).split('$', 1)[0]
+
+
+def hash_password(password):
+    """
+    按当前策略生成密码哈希
+
+    Args:
+        password: 明文密码
+
+    Returns:
+        str: 密码哈希
+    """
+    return get_password_hasher().run(generate_password_hash, password, _method())
+
+
+def verify_password(pwhash, password):
+    """
+    验证密码
+
+    Args:
+        pwhash: 存储的密码哈希
+        password: 明文密码
+
+    Returns:
+        bool: 密码是否正确
+    """
+    if not pwhash:
+        return False
+    return get_password_hasher().run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """存储的哈希算法或参数是否与当前配置不一致"""
+    return bool(pwhash) and pwhash.split('$', 1)[0] != _method_prefix(_method())
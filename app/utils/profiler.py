@@ -0,0 +1,233 @@
+"""
+请求采样分析模块
+
+PROFILE_ENABLED 打开后，按 PROFILE_SAMPLE_RATE 的比例随机抽取请求，
+或对带 PROFILE_HEADER 请求头（默认 X-Profile）的请求，用 cProfile 记录整个请求的函数调用：
+- 请求头需要已登录后台，或值等于 PROFILE_TOKEN（命令行 curl 使用）
+- 同一进程同时只分析一个请求，其他请求照常处理、不再分析
+- 响应添加 X-Profile-Id 头，对应分析结果的编号
+
+每次分析写入 PROFILE_DIR 下的两个文件：
+- <编号>.prof: pstats 格式，可用 python -m pstats、snakeviz 等工具查看
+- <编号>.json: 请求信息和耗时最多的函数，管理后台 /admin/profiles 按耗时列出
+
+目录中最多保留 PROFILE_MAX_FILES 个分析结果，超出时删除最早的（多个 worker 共用同一目录）。
+"""
+
+import os
+import re
+import hmac
+import json
+import time
+import random
+import pstats
+import cProfile
+import logging
+import threading
+from datetime import datetime
+from flask import current_app, g, request
+from flask_login import current_user
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 分析结果中保存的函数个数
+TOP_FUNCTIONS = 20
+
+# 编号：纳秒时间戳-进程号，按时间戳排序即按时间排序
+_PROFILE_ID = re.compile(r'^\d+-\d+$')
+
+# 项目根目录，函数位置显示为相对路径
+_BASEDIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# cProfile 同一时间只能有一个分析器工作
+_lock = threading.Lock()
+
+
+def _header_requested(config):
+    """请求是否带有效的分析请求头"""
+    value = request.headers.get(config['PROFILE_HEADER'])
+    if not value:
+        return False
+    token = config.get('PROFILE_TOKEN')
+    if token and hmac.compare_digest(value, token):
+        return True
+    return current_user.is_authenticated
+
+
+def _start_profile():
+    config = current_app.config
+    if request.endpoint in (None, 'static'):
+        return
+
+    if _header_requested(config):
+        reason = 'header'
+    elif config['PROFILE_SAMPLE_RATE'] > 0 and random.random() < config['PROFILE_SAMPLE_RATE']:
+        reason = 'sample'
+    else:
+        return
+
+    if not _lock.acquire(blocking=False):
+        return
+    profile = cProfile.Profile()
+    g._profile = (profile, reason, time.perf_counter())
+    profile.enable()
+
+
+def _stop_profile():
+    """停止分析，返回 (profile, 触发原因, 耗时秒)，当前请求没有分析时返回 None"""
+    state = g.pop('_profile', None)
+    if state is None:
+        return None
+    profile, reason, start = state
+    profile.disable()
+    _lock.release()
+    return profile, reason, time.perf_counter() - start
+
+
+def _finish_profile(response):
+    state = _stop_profile()
+    if state is None:
+        return response
+    profile, reason, duration = state
+    try:
+        profile_id = save_profile(current_app.config, profile, {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'reason': reason,
+        })
+    except OSError as e:
+        logger.warning(f'保存请求分析结果失败: {e}')
+    else:
+        response.headers['X-Profile-Id'] = profile_id
+    return response
+
+
+def _teardown_profile(exc):
+    # 出错时 after_request 可能没有执行，确保分析器被关闭、锁被释放
+    _stop_profile()
+
+
+def _short_path(filename):
+    """函数所在文件的简短路径（项目内为相对路径，第三方库从 site-packages 之后开始）"""
+    if 'site-packages' + os.sep in filename:
+        return filename.split('site-packages' + os.sep, 1)[1]
+    if filename.startswith(_BASEDIR + os.sep):
+        return os.path.relpath(filename, _BASEDIR)
+    return filename
+
+
+def top_functions(profile, limit=TOP_FUNCTIONS):
+    """
+    自身耗时最多的函数
+
+    Returns:
+        list: [{'function', 'calls', 'own_ms', 'total_ms'}]，按自身耗时降序
+    """
+    stats = pstats.Stats(profile).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    functions = []
+    for (filename, lineno, name), (_, calls, own, total, _) in rows:
+        # 内置函数没有文件位置（filename 为 ~）
+        label = f'{name} ({_short_path(filename)}:{lineno})' if lineno else name
+        functions.append({
+            'function': label,
+            'calls': calls,
+            'own_ms': round(own * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        })
+    return functions
+
+
+def save_profile(config, profile, info):
+    """
+    保存分析结果并清理超出数量的旧结果
+
+    Args:
+        info: 请求信息（method、path、endpoint、status、duration_ms、reason）
+
+    Returns:
+        str: 分析结果编号
+    """
+    directory = config['PROFILE_DIR']
+    os.makedirs(directory, exist_ok=True)
+    profile_id = f'{time.time_ns()}-{os.getpid()}'
+    base = os.path.join(directory, profile_id)
+
+    profile.dump_stats(base + '.prof')
+    meta = {
+        'id': profile_id,
+        **info,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'functions': top_functions(profile),
+    }
+    # 先写临时文件再改名，后台列表不会读到写了一半的文件
+    with open(base + '.json.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(base + '.json.tmp', base + '.json')
+
+    _prune(directory, config['PROFILE_MAX_FILES'])
+    return profile_id
+
+
+def _profile_ids(directory):
+    """目录中的分析结果编号（按时间升序）"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    ids = [name[:-5] for name in names if name.endswith('.json') and _PROFILE_ID.match(name[:-5])]
+    return sorted(ids, key=lambda profile_id: int(profile_id.split('-')[0]))
+
+
+def _prune(directory, keep):
+    for profile_id in _profile_ids(directory)[:-keep or None]:
+        for suffix in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(directory, profile_id + suffix))
+            except FileNotFoundError:
+                # 其他 worker 已经删除
+                pass
+
+
+def list_profiles(directory):
+    """
+    保存的分析结果
+
+    Returns:
+        list: 各请求的信息（json 文件内容），按耗时降序
+    """
+    profiles = []
+    for profile_id in _profile_ids(directory):
+        try:
+            with open(os.path.join(directory, profile_id + '.json'), encoding='utf-8') as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda meta: meta['duration_ms'], reverse=True)
+
+
+def profile_file(directory, profile_id):
+    """
+    pstats 文件路径
+
+    Returns:
+        str|None: 路径，编号无效或文件不存在时返回 None
+    """
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(directory, profile_id + '.prof')
+    return path if os.path.exists(path) else None
+
+
+def init_app(app):
+    """注册请求分析钩子（PROFILE_ENABLED 关闭时不注册）"""
+    if not app.config['PROFILE_ENABLED']:
+        return
+    # 放在最前面，覆盖其他 before_request 钩子的耗时
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_teardown_profile)
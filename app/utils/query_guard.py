@@ -0,0 +1,64 @@
+"""
+N+1 查询检测模块
+
+关联集合（Post.tags 等）默认按需加载，列表查询需要显式 selectinload。
+漏写时模板遍历列表会为每篇文章各发一次查询（N+1）。
+
+QUERY_GUARD_RAISE 打开时（测试环境默认打开，本地开发可设置环境变量），同一请求中同一个关联被按需加载
+超过 QUERY_GUARD_LAZY_LIMIT 次即抛出 NPlusOneError，在开发阶段直接暴露问题。
+没有使用全局 raiseload('*')：文章详情页访问 post.author 这类单个对象的按需加载是正常的，
+只有同一关联被反复加载才说明缺少预加载。
+"""
+
+import logging
+from collections import Counter
+from flask import current_app, g, has_request_context
+from sqlalchemy import event
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class NPlusOneError(RuntimeError):
+    """同一请求中同一关联被反复按需加载"""
+
+
+def _lazy_load_key(orm_execute_state):
+    """按需加载的关联名（如 Post.tags），不是按需加载时返回 None"""
+    if not orm_execute_state.is_relationship_load or orm_execute_state.lazy_loaded_from is None:
+        return None
+    path = orm_execute_state.loader_strategy_path
+    return str(path[-1]) if path else None
+
+
+def _check_lazy_load(orm_execute_state):
+    if not has_request_context() or not current_app.config.get('QUERY_GUARD_RAISE'):
+        return
+    key = _lazy_load_key(orm_execute_state)
+    if key is None:
+        return
+
+    counts = g.setdefault('_lazy_loads', Counter())
+    counts[key] += 1
+    limit = current_app.config['QUERY_GUARD_LAZY_LIMIT']
+    if counts[key] > limit:
+        raise NPlusOneError(
+            f'{key} 在一个请求中被按需加载了 {counts[key]} 次（上限 {limit}），'
+            f'请在查询中使用 selectinload/joinedload 预加载'
+        )
+
+
+def _reset_counts():
+    # 应用上下文可能跨多个请求（如 CLI 中的测试客户端），每个请求重新计数
+    g.pop('_lazy_loads', None)
+
+
+def init_query_guard(app, session_class):
+    """
+    为会话类注册 N+1 检测
+
+    事件注册在会话类上，对所有应用生效；是否检查由各应用的 QUERY_GUARD_RAISE 决定。
+    """
+    app.before_request(_reset_counts)
+    if not event.contains(session_class, 'do_orm_execute', _check_lazy_load):
+        event.listen(session_class, 'do_orm_execute', _check_lazy_load)
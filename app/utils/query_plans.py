@@ -0,0 +1,287 @@
+"""
+查询计划检查模块
+
+依次请求各个前台路由，记录执行的 SELECT 语句，再对每条语句执行 EXPLAIN，
+如果大表（文章、文章标签、收藏）出现全表扫描则报告失败。
+由 flask check-query-plans 调用，可放在 CI 中防止索引失效或新查询绕过索引。
+
+count_queries() 统计各路由执行的 SQL 条数，与 QUERY_BUDGETS 比较（flask check-query-counts），
+数量随数据量增长（N+1）时超出预算。命令使用 scripts/query_fixture.py 在内存数据库中写入的固定数据
+（多个作者、分类、标签，首页和分类页都有两页以上），不依赖当前配置的数据库；
+测试配置打开了 QUERY_GUARD_RAISE，反复按需加载同一关联会直接返回 500。
+/admin/ 下的路由以第一个用户的身份登录后请求。
+
+check_listing_columns() 检查列表路由查询的列：SELECT 列中出现文章正文（post.content）
+即为失败（flask check-listing-columns），防止列表查询漏掉 Post.listing_option()。
+
+路由返回 5xx 时没有执行完查询，三个检查都把它记为失败，不会因为少了语句而误报通过。
+
+- SQLite: EXPLAIN QUERY PLAN，计划中出现 "SCAN <表>"（未使用索引）视为全表扫描
+- PostgreSQL: 在事务中关闭 enable_seqscan 后 EXPLAIN，仍出现 "Seq Scan on <表>"
+  说明没有可用的索引（小表上规划器本来就倾向顺序扫描，不能直接看默认计划）
+"""
+
+import re
+import logging
+from sqlalchemy import event
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 需要检查的路由（占位符替换为数据库中实际存在的 ID）
+ROUTES = [
+    '/',
+    '/?page=2',
+    '/post/{post_id}',
+    '/category/{category_id}',
+    '/tag/{tag_id}',
+    '/categories',
+    '/archive',
+    '/search',
+    '/api/search/suggest?q=ab',
+    '/api/post/{post_id}/bookmarks',
+    '/sitemap.xml',
+    '/feed.xml',
+]
+
+# 列表路由（不应查询文章正文）
+LISTING_ROUTES = [
+    '/',
+    '/?page=2',
+    '/category/{category_id}',
+    '/tag/{tag_id}',
+    '/archive',
+    '/search',
+    '/search?q=ab',
+    '/api/search/suggest?q=ab',
+    '/sitemap.xml',
+]
+
+# 各路由（匿名访问、冷缓存、scripts/query_fixture.py 的数据）最多执行的 SQL 条数（flask check-query-counts）
+# 数量随文章数增长说明出现了 N+1 查询
+QUERY_BUDGETS = {
+    '/': 8,
+    '/?page=2': 8,
+    '/post/{post_id}': 8,
+    '/category/{category_id}': 6,
+    '/tag/{tag_id}': 4,
+    '/categories': 2,
+    '/archive': 5,
+    '/search?q=ab': 2,
+    '/api/search/suggest?q=ab': 3,
+    '/api/post/{post_id}/bookmarks': 2,
+    '/sitemap.xml': 3,
+    '/admin/': 4,
+    '/admin/bookmarks': 2,
+    '/admin/friend-links': 1,
+}
+
+# 需要登录的路由前缀
+ADMIN_PREFIX = '/admin/'
+
+# 不允许全表扫描的表（分类、标签、友链等小表不检查）
+CHECKED_TABLES = {'post', 'post_tags', 'post_bookmark'}
+
+# 允许全表扫描的语句（LIKE '%关键词%' 无法使用 B-tree 索引）
+ALLOWED_PATTERNS = [
+    re.compile(r'LIKE', re.I),
+]
+
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+?)(?:_\d+)?(?: |$)(?!.*USING)')
+_POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+_CONTENT_COLUMN = re.compile(r'\bpost(?:_\d+)?\.content\b')
+_FROM = re.compile(r'\sFROM\s', re.I)
+
+
+def _route_ids(db):
+    """路由占位符对应的 ID（优先使用已发布的文章），以及后台路由登录的用户 ID"""
+    from app.models import User, Post, Category, Tag
+
+    post = Post.query.filter_by(published=True).first()
+    category = Category.query.first()
+    tag = Tag.query.first()
+    user = User.query.order_by(User.id).first()
+    return {
+        'post_id': post.id if post else 1,
+        'category_id': category.id if category else 1,
+        'tag_id': tag.id if tag else 1,
+        'user_id': user.id if user else 1,
+    }
+
+
+def _request_routes(app, db, routes, on_statement, clear_cache=False):
+    """
+    依次请求各路由，期间执行的每条 SQL 调用 on_statement(路由, 语句, 参数)
+
+    Args:
+        clear_cache: 每个路由前清空缓存（统计冷缓存下的查询数）
+
+    Returns:
+        dict: {路由: 响应状态码}
+    """
+    from app import cache
+
+    with app.app_context():
+        ids = _route_ids(db)
+        # 查询可能路由到只读连接池或副本
+        engines = list(db.engines.values())
+
+    current = {'route': None}
+    statuses = {}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current['route']:
+            on_statement(current['route'], statement, parameters)
+
+    saved_config = {key: app.config.get(key) for key in ('RATE_LIMIT_ENABLED', 'PROPAGATE_EXCEPTIONS')}
+    app.config['RATE_LIMIT_ENABLED'] = False
+    # 测试、调试模式下异常默认直接抛出，这里记为 500 继续检查其他路由
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        client = app.test_client()
+        admin_client = app.test_client()
+        # Flask-Login 会话中的用户 ID
+        with admin_client.session_transaction() as session:
+            session['_user_id'] = str(ids['user_id'])
+            session['_fresh'] = True
+        for index, route in enumerate(routes):
+            if clear_cache or index == 0:
+                # 被缓存的查询（热门文章等）也要执行；在 app 的上下文中清空
+                # （CLI 中 app 可能不是当前应用，如 scripts/query_fixture.py 的应用）。上下文不能包住请求，
+                # 否则各请求共用同一个 g（Flask-Login 的当前用户等）
+                with app.app_context():
+                    cache.clear()
+            current['route'] = route.format(**ids)
+            response = (admin_client if route.startswith(ADMIN_PREFIX) else client).get(current['route'])
+            statuses[current['route']] = response.status_code
+            if response.status_code >= 500:
+                logger.warning(f'{current["route"]} 返回 {response.status_code}')
+    finally:
+        current['route'] = None
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+        app.config.update(saved_config)
+    return statuses
+
+
+def _server_errors(statuses):
+    """返回 5xx 的路由 {路由: 状态码}"""
+    return {route: status for route, status in statuses.items() if status >= 500}
+
+
+def capture_queries(app, db, routes=ROUTES):
+    """
+    请求各路由并记录执行的 SELECT 语句
+
+    Returns:
+        tuple: ([(路由, 语句, 参数)]，同一语句只保留第一次, {返回 5xx 的路由: 状态码})
+    """
+    captured = []
+    seen = set()
+
+    def on_statement(route, statement, parameters):
+        if statement.lstrip().upper().startswith('SELECT') and statement not in seen:
+            seen.add(statement)
+            captured.append((route, statement, parameters))
+
+    statuses = _request_routes(app, db, routes, on_statement)
+    return captured, _server_errors(statuses)
+
+
+def count_queries(app, db, budgets=QUERY_BUDGETS):
+    """
+    统计各路由在冷缓存下执行的 SQL 条数
+
+    Returns:
+        list: [{'route', 'status', 'count', 'budget', 'statements'}]
+    """
+    statements = {}
+
+    def on_statement(route, statement, parameters):
+        statements.setdefault(route, []).append(statement)
+
+    with app.app_context():
+        ids = _route_ids(db)
+    statuses = _request_routes(app, db, list(budgets), on_statement, clear_cache=True)
+    results = []
+    for route, budget in budgets.items():
+        route = route.format(**ids)
+        executed = statements.get(route, [])
+        results.append({
+            'route': route,
+            'status': statuses.get(route),
+            'count': len(executed),
+            'budget': budget,
+            'statements': executed,
+        })
+    return results
+
+
+def explain(connection, statement, parameters):
+    """
+    执行 EXPLAIN
+
+    Returns:
+        tuple: (计划文本行列表, 发生全表扫描的表集合)
+    """
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+        plan = [row[-1] for row in rows]
+        scans = {m.group(1) for m in map(_SQLITE_SCAN.match, plan) if m}
+    elif dialect == 'postgresql':
+        with connection.begin():
+            connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            rows = connection.exec_driver_sql(f'EXPLAIN {statement}', parameters).fetchall()
+        plan = [row[0] for row in rows]
+        scans = {m.group(1) for line in plan for m in _POSTGRES_SCAN.finditer(line)}
+    else:
+        raise ValueError(f'不支持的数据库: {dialect}')
+    return plan, scans & CHECKED_TABLES
+
+
+def check_query_plans(app, db, routes=ROUTES):
+    """
+    检查各路由 SQL 的查询计划
+
+    Returns:
+        tuple: ([{'route', 'sql', 'plan', 'full_scans', 'allowed'}], {返回 5xx 的路由: 状态码})
+    """
+    results = []
+    captured, errors = capture_queries(app, db, routes)
+    with app.app_context(), db.engine.connect() as connection:
+        for route, statement, parameters in captured:
+            plan, scans = explain(connection, statement, parameters)
+            results.append({
+                'route': route,
+                'sql': statement,
+                'plan': plan,
+                'full_scans': sorted(scans),
+                'allowed': bool(scans) and any(p.search(statement) for p in ALLOWED_PATTERNS),
+            })
+    return results, errors
+
+
+def select_columns(statement):
+    """SELECT 与第一个 FROM 之间的列列表"""
+    return _FROM.split(statement, 1)[0]
+
+
+def check_listing_columns(app, db, routes=LISTING_ROUTES):
+    """
+    检查列表路由的 SELECT 列中是否包含文章正文
+
+    Returns:
+        tuple: ([{'route', 'sql', 'loads_content'}], {返回 5xx 的路由: 状态码})
+    """
+    captured, errors = capture_queries(app, db, routes)
+    return [
+        {
+            'route': route,
+            'sql': statement,
+            'loads_content': bool(_CONTENT_COLUMN.search(select_columns(statement))),
+        }
+        for route, statement, parameters in captured
+    ], errors
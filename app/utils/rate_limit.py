@@ -0,0 +1,296 @@
+"""
+限流状态存储模块
+
+登录失败计数、IP 封禁、接口令牌桶等限流状态需要在所有 gunicorn worker 之间共享：
+- RedisRateLimitStore: 配置 RATE_LIMIT_STORAGE_URL（默认取 REDIS_URL）时使用，
+  计数用 INCR + EXPIRE，判断和封禁用 Lua 脚本在 Redis 端原子执行
+- MemoryRateLimitStore: 单进程回退方案，条目带过期时间，总数有上限，
+  超出时先清理过期条目再淘汰最久未更新的条目
+"""
+
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认键前缀
+DEFAULT_KEY_PREFIX = 'blog_rl:'
+
+# 内存存储默认最多保留的键数
+DEFAULT_MAX_KEYS = 10000
+
+# 失败计数 +1，达到上限时写入封禁键并清零计数
+# KEYS: 计数键, 封禁键  ARGV: 计数窗口(秒), 上限, 封禁时长(秒)
+_RECORD_FAILURE_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+if count >= tonumber(ARGV[2]) then
+    redis.call('SET', KEYS[2], '1', 'EX', ARGV[3])
+    redis.call('DEL', KEYS[1])
+end
+return count
+"""
+
+# 返回 {剩余封禁秒数, 当前计数}
+# KEYS: 计数键, 封禁键
+_CHECK_SCRIPT = """
+local ttl = redis.call('TTL', KEYS[2])
+if ttl > 0 then
+    return {ttl, 0}
+end
+return {0, tonumber(redis.call('GET', KEYS[1]) or '0')}
+"""
+
+# 令牌桶：按时间补充令牌后尝试扣除，时间取 Redis 服务器时间，各 worker 时钟不一致也不影响
+# KEYS: 桶键  ARGV: 每秒补充数, 容量, 本次消耗
+# 返回 {是否放行, 需等待秒数, 剩余令牌}（小数以字符串返回）
+_TAKE_TOKEN_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(retry_after), tostring(tokens)}
+"""
+
+
+class RateLimitStore:
+    """限流状态存储基类"""
+
+    def __init__(self, key_prefix=DEFAULT_KEY_PREFIX):
+        self.key_prefix = key_prefix
+
+    def record_failure(self, counter_key, block_key, limit, window, block_seconds):
+        """
+        记录一次失败
+
+        Args:
+            counter_key: 计数键
+            block_key: 封禁键
+            limit: 触发封禁的失败次数
+            window: 计数窗口（秒），窗口内无新失败则计数过期
+            block_seconds: 封禁时长（秒）
+
+        Returns:
+            int: 记录后的失败次数（达到 limit 时已写入封禁）
+        """
+        raise NotImplementedError
+
+    def check(self, counter_key, block_key):
+        """
+        查询封禁状态和失败次数
+
+        Returns:
+            tuple: (剩余封禁秒数, 当前失败次数)，未封禁时剩余秒数为 0
+        """
+        raise NotImplementedError
+
+    def take_token(self, key, rate, capacity, cost=1):
+        """
+        从令牌桶中取令牌
+
+        Args:
+            key: 桶键
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（允许的突发请求数）
+            cost: 本次消耗的令牌数
+
+        Returns:
+            tuple: (是否放行, 需等待的秒数, 剩余令牌数)
+        """
+        raise NotImplementedError
+
+    def clear(self, *keys):
+        """删除键"""
+        raise NotImplementedError
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """进程内存储（只在单个 worker 内有效）"""
+
+    def __init__(self, key_prefix=DEFAULT_KEY_PREFIX, max_keys=DEFAULT_MAX_KEYS):
+        super().__init__(key_prefix)
+        self.max_keys = max_keys
+        # 键 → [值, 过期时间(monotonic)]，按最近写入排序
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key, now):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def _set(self, key, value, expire_at, now):
+        self._data[key] = [value, expire_at]
+        self._data.move_to_end(key)
+
+        if len(self._data) > self.max_keys:
+            for expired in [k for k, (_, expires) in self._data.items() if expires <= now]:
+                del self._data[expired]
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+
+    def record_failure(self, counter_key, block_key, limit, window, block_seconds):
+        counter_key = self.key_prefix + counter_key
+        block_key = self.key_prefix + block_key
+        with self._lock:
+            now = time.monotonic()
+            entry = self._get(counter_key, now)
+            count = entry[0] + 1 if entry else 1
+            if count >= limit:
+                self._data.pop(counter_key, None)
+                self._set(block_key, 1, now + block_seconds, now)
+            else:
+                self._set(counter_key, count, entry[1] if entry else now + window, now)
+            return count
+
+    def check(self, counter_key, block_key):
+        with self._lock:
+            now = time.monotonic()
+            block = self._get(self.key_prefix + block_key, now)
+            if block is not None:
+                return math.ceil(block[1] - now), 0
+            entry = self._get(self.key_prefix + counter_key, now)
+            return 0, entry[0] if entry else 0
+
+    def take_token(self, key, rate, capacity, cost=1):
+        key = self.key_prefix + key
+        with self._lock:
+            now = time.monotonic()
+            entry = self._get(key, now)
+            tokens, last = entry[0] if entry else (capacity, now)
+            tokens = min(capacity, tokens + (now - last) * rate)
+
+            allowed = tokens >= cost
+            retry_after = 0.0
+            if allowed:
+                tokens -= cost
+            else:
+                retry_after = (cost - tokens) / rate
+
+            # 桶补满后与新桶等价，可以过期
+            self._set(key, (tokens, now), now + capacity / rate, now)
+            return allowed, retry_after, tokens
+
+    def clear(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(self.key_prefix + key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """
+    Redis 存储（所有 worker 共享）
+
+    Redis 不可用时记录警告并放行（返回未封禁），避免限流组件故障导致无法登录。
+    """
+
+    def __init__(self, client, key_prefix=DEFAULT_KEY_PREFIX):
+        super().__init__(key_prefix)
+        self.client = client
+        self._record_failure = client.register_script(_RECORD_FAILURE_SCRIPT)
+        self._check = client.register_script(_CHECK_SCRIPT)
+        self._take_token = client.register_script(_TAKE_TOKEN_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url, key_prefix=DEFAULT_KEY_PREFIX):
+        import redis
+        return cls(redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1), key_prefix)
+
+    def record_failure(self, counter_key, block_key, limit, window, block_seconds):
+        import redis
+        try:
+            return int(self._record_failure(
+                keys=[self.key_prefix + counter_key, self.key_prefix + block_key],
+                args=[int(window), int(limit), int(block_seconds)]
+            ))
+        except redis.RedisError as e:
+            logger.warning(f'限流存储写入失败: {str(e)}')
+            return 0
+
+    def check(self, counter_key, block_key):
+        import redis
+        try:
+            ttl, count = self._check(keys=[self.key_prefix + counter_key, self.key_prefix + block_key])
+            return int(ttl), int(count)
+        except redis.RedisError as e:
+            logger.warning(f'限流存储读取失败: {str(e)}')
+            return 0, 0
+
+    def take_token(self, key, rate, capacity, cost=1):
+        import redis
+        try:
+            allowed, retry_after, tokens = self._take_token(
+                keys=[self.key_prefix + key], args=[rate, capacity, cost]
+            )
+            return bool(allowed), float(retry_after), float(tokens)
+        except redis.RedisError as e:
+            logger.warning(f'限流存储读取失败: {str(e)}')
+            return True, 0.0, float(capacity)
+
+    def clear(self, *keys):
+        import redis
+        try:
+            self.client.delete(*[self.key_prefix + key for key in keys])
+        except redis.RedisError as e:
+            logger.warning(f'限流存储删除失败: {str(e)}')
+
+
+# 全局存储实例
+_store = None
+
+
+def get_rate_limit_store():
+    """获取当前配置的限流存储"""
+    global _store
+
+    if _store is not None:
+        return _store
+
+    from flask import current_app
+    url = current_app.config.get('RATE_LIMIT_STORAGE_URL')
+    key_prefix = current_app.config.get('RATE_LIMIT_KEY_PREFIX', DEFAULT_KEY_PREFIX)
+
+    if url:
+        try:
+            _store = RedisRateLimitStore.from_url(url, key_prefix)
+            logger.info('限流状态使用 Redis 存储')
+            return _store
+        except ImportError:
+            logger.warning('未安装 redis，限流状态回退到进程内存储')
+
+    _store = MemoryRateLimitStore(
+        key_prefix, current_app.config.get('RATE_LIMIT_MAX_KEYS', DEFAULT_MAX_KEYS)
+    )
+    return _store
+
+
+def reset_rate_limit_store():
+    """重置存储实例（用于测试或配置更改）"""
+    global _store
+    _store = None
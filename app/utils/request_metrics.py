@@ -0,0 +1,271 @@
+"""
+请求耗时统计模块
+
+每个请求记录：
+- SQL 条数和数据库耗时（SQLAlchemy before/after_cursor_execute 事件，覆盖所有 bind）
+- 模板渲染耗时（Flask before_render_template/template_rendered 信号，
+  渲染中按需加载的查询同时计入两者）
+- 缓存命中/未命中次数（包装 Flask-Caching 的后端对象，memoize 和用户缓存都经过它）
+
+请求结束时：
+- 添加 Server-Timing 响应头，浏览器开发者工具中可以直接看到各部分耗时
+  （只发给已登录后台的用户，或请求头 X-Server-Timing 等于 SERVER_TIMING_TOKEN 的请求，
+  匿名访客看不到数据库耗时、查询数等后端细节）
+- 总耗时超过 SLOW_REQUEST_MS 时记录慢请求日志
+- 按端点累计耗时直方图（当前 worker 进程内），管理后台 /admin/api/request-metrics 查看
+- 同时写入 Prometheus 指标（app.utils.metrics，多 worker 合并后在 /metrics 导出）
+"""
+
+import hmac
+import time
+import logging
+import threading
+from collections import defaultdict
+from flask import before_render_template, current_app, g, has_request_context, request, request_started, template_rendered
+from flask_login import current_user
+from sqlalchemy import event
+from app.utils import metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 直方图桶上限（毫秒），最后一个桶为 +Inf
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# 未登录时获取 Server-Timing 的请求头（值为 SERVER_TIMING_TOKEN）
+SERVER_TIMING_HEADER = 'X-Server-Timing'
+
+
+class RequestStats:
+    """一个请求的统计"""
+
+    __slots__ = ('start', 'queries', 'db_time', 'render_time', 'cache_hits', 'cache_misses', '_render_start')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._render_start = None
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self, total):
+        """Server-Timing 响应头的值"""
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'render;dur={self.render_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def _server_timing_allowed(config):
+    """请求是否可以看到 Server-Timing（与 X-Profile 请求头的校验方式一致）"""
+    token = config.get('SERVER_TIMING_TOKEN')
+    value = request.headers.get(SERVER_TIMING_HEADER)
+    if token and value and hmac.compare_digest(value, token):
+        return True
+    return current_user.is_authenticated
+
+
+def current_stats():
+    """当前请求的统计，请求之外返回 None"""
+    if not has_request_context():
+        return None
+    return g.get('_request_stats')
+
+
+class EndpointHistogram:
+    """一个端点的累计统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.db_time = 0.0
+        self.queries = 0
+        self.render_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # 每个桶的请求数（不累加），最后一个为 +Inf
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def observe(self, stats, total, status_code):
+        self.count += 1
+        self.errors += status_code >= 500
+        self.total_time += total
+        self.max_time = max(self.max_time, total)
+        self.db_time += stats.db_time
+        self.queries += stats.queries
+        self.render_time += stats.render_time
+        self.cache_hits += stats.cache_hits
+        self.cache_misses += stats.cache_misses
+        total_ms = total * 1000
+        for i, bound in enumerate(BUCKETS_MS):
+            if total_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def to_dict(self):
+        count = self.count or 1
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': round(self.total_time / count * 1000, 1),
+            'max_ms': round(self.max_time * 1000, 1),
+            'avg_db_ms': round(self.db_time / count * 1000, 1),
+            'avg_queries': round(self.queries / count, 1),
+            'avg_render_ms': round(self.render_time / count * 1000, 1),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'buckets': {
+                **{f'le_{bound}ms': n for bound, n in zip(BUCKETS_MS, self.buckets)},
+                'inf': self.buckets[-1],
+            },
+        }
+
+
+class _InstrumentedCache:
+    """统计命中次数的缓存后端包装（其余方法直接转发）"""
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def __getattr__(self, name):
+        return getattr(self._backend, name)
+
+    def get(self, key):
+        # memoize 的版本号通过 get_many 读取，不计入
+        value = self._backend.get(key)
+        _record_cache(value is not None)
+        return value
+
+
+def _record_cache(hit):
+    metrics.observe_cache(hit)
+    stats = current_stats()
+    if stats is None:
+        return
+    if hit:
+        stats.cache_hits += 1
+    else:
+        stats.cache_misses += 1
+
+
+class RequestMetrics:
+    """请求统计扩展"""
+
+    def __init__(self):
+        # 端点 → EndpointHistogram
+        self._endpoints = defaultdict(EndpointHistogram)
+        self._lock = threading.Lock()
+
+    def init_app(self, app, db, cache):
+        """注册数据库事件、请求信号和响应钩子（需在 db、cache 初始化之后调用）"""
+        app.config.setdefault('REQUEST_METRICS_ENABLED', True)
+        if not app.config['REQUEST_METRICS_ENABLED']:
+            return
+
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+                event.listen(engine, 'handle_error', _handle_error)
+        extensions = app.extensions['cache']
+        extensions[cache] = _InstrumentedCache(extensions[cache])
+
+        request_started.connect(_start_request, app)
+        before_render_template.connect(_start_render, app)
+        template_rendered.connect(_end_render, app)
+        app.after_request(self._finish_request)
+        app.extensions['request_metrics'] = self
+
+    def _finish_request(self, response):
+        stats = current_stats()
+        if stats is None:
+            return response
+        total = stats.elapsed
+        config = current_app.config
+
+        if config['SERVER_TIMING'] and _server_timing_allowed(config):
+            response.headers['Server-Timing'] = stats.server_timing(total)
+
+        if total * 1000 >= config['SLOW_REQUEST_MS']:
+            logger.warning(
+                f'慢请求 {request.method} {request.full_path.rstrip("?")} -> {response.status_code}: '
+                f'{total * 1000:.0f}ms，SQL {stats.queries} 条 {stats.db_time * 1000:.0f}ms，'
+                f'渲染 {stats.render_time * 1000:.0f}ms'
+            )
+
+        endpoint = request.endpoint or '<unmatched>'
+        with self._lock:
+            self._endpoints[endpoint].observe(stats, total, response.status_code)
+        if config['METRICS_ENABLED']:
+            metrics.observe_request(endpoint, request.method, response.status_code, total, stats)
+        return response
+
+    def snapshot(self):
+        """
+        各端点的累计统计
+
+        Returns:
+            dict: {端点名: 统计}（当前 worker 进程内，按请求数降序）
+        """
+        with self._lock:
+            items = [(endpoint, histogram.to_dict()) for endpoint, histogram in self._endpoints.items()]
+        return dict(sorted(items, key=lambda item: item[1]['count'], reverse=True))
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+def _start_request(sender, **extra):
+    g._request_stats = RequestStats()
+
+
+def _start_render(sender, template, context, **extra):
+    stats = current_stats()
+    if stats is not None:
+        stats._render_start = time.perf_counter()
+
+
+def _end_render(sender, template, context, **extra):
+    stats = current_stats()
+    if stats is not None and stats._render_start is not None:
+        stats.render_time += time.perf_counter() - stats._render_start
+        stats._render_start = None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = current_stats()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def _handle_error(exception_context):
+    # 执行失败时 after_cursor_execute 不会触发
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('_query_start'):
+        conn.info['_query_start'].pop()
+
+
+# 全局实例
+request_metrics = RequestMetrics()
@@ -9,6 +9,7 @@
 from datetime import datetime
 from app import create_app, db
 from app.models.post import Post
+from app.utils import metrics
 import logging
 
 logger = logging.getLogger(__name__)
@@ -40,16 +41,29 @@ def publish_scheduled_posts():
             if published_count > 0:
                 db.session.commit()
                 logger.info(f'成功发布 {published_count} 篇定时文章')
-                return published_count
 
-            return 0
+            _record_run('success', published_count)
+            return published_count
 
         except Exception as e:
             logger.error(f'发布定时文章时出错: {str(e)}')
             db.session.rollback()
+            _record_run('error')
             return -1
 
 
+def _record_run(result, published_count=0):
+    """记录定时发布任务的 Prometheus 指标"""
+    metrics.SCHEDULER_RUNS.labels(result).inc()
+    metrics.SCHEDULER_PUBLISHED.inc(published_count)
+    metrics.SCHEDULER_LAST_RUN.set_to_current_time()
+    if result == 'success':
+        metrics.SCHEDULED_PENDING.set(Post.query.filter(
+            Post.published == False,
+            Post.scheduled_at.isnot(None)
+        ).count())
+
+
 def get_scheduled_posts_stats():
     """
     获取定时文章统计信息
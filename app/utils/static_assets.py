@@ -0,0 +1,276 @@
+"""
+静态资源发布模块
+
+- url_for('static') 生成带内容哈希的文件名（style.css → style.<hash>.css），
+  哈希匹配时返回 Cache-Control: immutable，内容变化后 URL 随之变化
+- 按内容 SHA-256 命名的上传文件（封面、衍生图）同样视为不可变
+- 构建阶段（flask build-static）为 CSS/JS 等生成 .gz/.br 预压缩文件，
+  客户端支持时直接返回，不在请求中实时压缩
+- 支持 X-Sendfile（USE_X_SENDFILE）和 nginx X-Accel-Redirect（STATIC_ACCEL_REDIRECT）
+- 模板通过 assets 变量使用打包资源（见 asset_bundle），未构建时回退到源文件
+"""
+
+import os
+import re
+import gzip
+import hashlib
+import logging
+import mimetypes
+import threading
+from flask import abort, current_app, request, send_file
+from markupsafe import Markup
+from werkzeug.security import safe_join
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 文件名中的内容哈希长度
+HASH_LENGTH = 12
+
+# style.<hash>.css
+_HASHED_NAME = re.compile(r'^(?P<stem>.+)\.(?P<digest>[0-9a-f]{%d})(?P<ext>\.[^./]+)$' % HASH_LENGTH)
+
+# 按 SHA-256 命名的上传文件
+_CONTENT_ADDRESSED = re.compile(r'[0-9a-f]{64}')
+
+# 需要预压缩的文件类型（图片、字体已压缩，不再处理）
+PRECOMPRESS_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.xml', '.html', '.map'}
+
+# 预压缩编码（按优先级）→ 文件后缀
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# 不可变资源缓存时间（一年）
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class StaticAssets:
+    """静态资源哈希与发送"""
+
+    def __init__(self, app=None):
+        # 路径 → (mtime_ns, size, 哈希)
+        self._digests = {}
+        # 关键 CSS 缓存 (mtime_ns, 内容)
+        self._critical = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """替换默认的 static 视图并注册 url_for 钩子"""
+        app.config.setdefault('STATIC_HASHED_URLS', True)
+        app.config.setdefault('STATIC_ACCEL_REDIRECT', None)
+        app.config.setdefault('ASSET_BUNDLES', True)
+        app.url_defaults(self._inject_hash)
+        app.view_functions['static'] = self.send_static
+        app.context_processor(lambda: {'assets': self})
+        app.extensions['static_assets'] = self
+
+    def _dist_path(self, filename):
+        from app.utils.asset_bundle import DIST_DIR
+        return os.path.join(current_app.static_folder, DIST_DIR, filename)
+
+    @property
+    def bundled(self):
+        """是否使用打包资源（已执行 flask build-static 且未关闭 ASSET_BUNDLES）"""
+        return current_app.config['ASSET_BUNDLES'] and os.path.isfile(self._dist_path('css/critical.css'))
+
+    def critical_css(self):
+        """内联到 <head> 的首屏关键 CSS"""
+        path = self._dist_path('css/critical.css')
+        mtime = os.stat(path).st_mtime_ns
+        if self._critical is None or self._critical[0] != mtime:
+            with open(path, encoding='utf-8') as f:
+                self._critical = (mtime, Markup(f.read()))
+        return self._critical[1]
+
+    def script(self, filename):
+        """页面脚本：已打包时返回 dist/ 下的压缩版本"""
+        if self.bundled and os.path.isfile(self._dist_path(filename)):
+            from app.utils.asset_bundle import DIST_DIR
+            return f'{DIST_DIR}/{filename}'
+        return filename
+
+    def file_digest(self, filename):
+        """
+        获取静态文件的内容哈希（按 mtime/大小缓存）
+
+        Args:
+            filename: 相对 static 目录的文件名
+
+        Returns:
+            str|None: 哈希前缀，文件不存在时返回 None
+        """
+        path = safe_join(current_app.static_folder, filename)
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        cached = self._digests.get(path)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                digest.update(chunk)
+        value = digest.hexdigest()[:HASH_LENGTH]
+        with self._lock:
+            self._digests[path] = (st.st_mtime_ns, st.st_size, value)
+        return value
+
+    def hashed_filename(self, filename):
+        """style.css → style.<hash>.css，文件不存在时原样返回"""
+        digest = self.file_digest(filename)
+        if digest is None:
+            return filename
+        stem, ext = os.path.splitext(filename)
+        return f'{stem}.{digest}{ext}'
+
+    def _inject_hash(self, endpoint, values):
+        """url_for('static', filename=...) 钩子"""
+        if endpoint != 'static' or not current_app.config['STATIC_HASHED_URLS']:
+            return
+        filename = values.get('filename')
+        # 上传文件由存储后端生成 URL，不经过这里
+        if filename and not filename.startswith('uploads/'):
+            values['filename'] = self.hashed_filename(filename)
+
+    def _resolve(self, filename):
+        """
+        还原带哈希的文件名
+
+        Returns:
+            tuple: (实际文件名, 是否可以永久缓存)
+        """
+        match = _HASHED_NAME.match(filename)
+        if match:
+            original = match['stem'] + match['ext']
+            digest = self.file_digest(original)
+            if digest is not None:
+                # 哈希过期（旧页面引用）时返回当前内容，但不标记为不可变
+                return original, digest == match['digest']
+
+        if filename.startswith('uploads/') and _CONTENT_ADDRESSED.search(filename):
+            return filename, True
+        return filename, False
+
+    @staticmethod
+    def _negotiate(path):
+        """选择客户端可接受且未过期的预压缩文件"""
+        if os.path.splitext(path)[1] not in PRECOMPRESS_EXTENSIONS:
+            return path, None
+
+        mtime = os.stat(path).st_mtime
+        for encoding, suffix in ENCODINGS:
+            if not request.accept_encodings[encoding]:
+                continue
+            candidate = path + suffix
+            try:
+                if os.stat(candidate).st_mtime >= mtime:
+                    return candidate, encoding
+            except OSError:
+                continue
+        return path, None
+
+    def send_static(self, filename):
+        """static 端点视图"""
+        filename, immutable = self._resolve(filename)
+        path = safe_join(current_app.static_folder, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+
+        served, encoding = self._negotiate(path)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        max_age = IMMUTABLE_MAX_AGE if immutable else current_app.get_send_file_max_age(filename)
+
+        accel_prefix = current_app.config['STATIC_ACCEL_REDIRECT']
+        if accel_prefix:
+            # 交给 nginx 发送：location <prefix> { internal; alias <static 目录>/; }
+            relative = os.path.relpath(served, current_app.static_folder).replace(os.sep, '/')
+            response = current_app.response_class(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = f'{accel_prefix.rstrip("/")}/{relative}'
+            if max_age is not None:
+                response.cache_control.public = True
+                response.cache_control.max_age = max_age
+        else:
+            # USE_X_SENDFILE 打开时 send_file 只返回 X-Sendfile 头
+            response = send_file(served, mimetype=mimetype, max_age=max_age, conditional=True)
+
+        if encoding:
+            response.content_encoding = encoding
+        if os.path.splitext(filename)[1] in PRECOMPRESS_EXTENSIONS:
+            response.vary.add('Accept-Encoding')
+        if immutable:
+            response.cache_control.immutable = True
+        return response
+
+
+def precompress_static(static_folder, level=9, force=False):
+    """
+    为静态文件生成 .gz/.br 预压缩文件
+
+    brotli 为可选依赖，未安装时只生成 .gz。
+    上传目录（uploads/）和压缩后不变小的文件跳过。
+
+    Args:
+        static_folder: static 目录
+        level: gzip 压缩级别
+        force: 忽略已有的最新预压缩文件，全部重新生成
+
+    Returns:
+        list: [(文件名, 原始大小, {编码: 压缩后大小})]
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        logger.info('未安装 brotli，只生成 .gz')
+
+    compressors = {'gzip': lambda data: gzip.compress(data, compresslevel=level, mtime=0)}
+    if brotli is not None:
+        compressors['br'] = lambda data: brotli.compress(data, quality=11)
+
+    results = []
+    uploads = os.path.join(static_folder, 'uploads')
+    for dirpath, dirnames, filenames in os.walk(static_folder):
+        if dirpath == static_folder and 'uploads' in dirnames:
+            dirnames.remove('uploads')
+        if dirpath.startswith(uploads):
+            continue
+
+        for filename in filenames:
+            if os.path.splitext(filename)[1] not in PRECOMPRESS_EXTENSIONS:
+                continue
+            path = os.path.join(dirpath, filename)
+            mtime = os.stat(path).st_mtime
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            sizes = {}
+            for encoding, suffix in ENCODINGS:
+                if encoding not in compressors:
+                    continue
+                target = path + suffix
+                if not force and os.path.exists(target) and os.stat(target).st_mtime >= mtime:
+                    sizes[encoding] = os.path.getsize(target)
+                    continue
+
+                compressed = compressors[encoding](data)
+                if len(compressed) >= len(data):
+                    if os.path.exists(target):
+                        os.remove(target)
+                    continue
+                tmp_path = target + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp_path, target)
+                sizes[encoding] = len(compressed)
+
+            results.append((os.path.relpath(path, static_folder), len(data), sizes))
+    return results
+
+
+static_assets = StaticAssets()
@@ -7,17 +7,50 @@
 """
 
 import os
+import re
+import json
+import time
+import shutil
+import uuid
 import base64
+import hashlib
 import logging
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from collections import OrderedDict
+from contextlib import contextmanager
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+from app.utils import metrics
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 默认并发上传数
+DEFAULT_MAX_WORKERS = 4
+
+
+def _completed_future(result=None, exception=None):
+    """构造已完成的 Future"""
+    future = Future()
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+    return future
+
 
 class StorageBackend:
     """存储后端基类"""
 
+    # 并发上传线程数（upload_many / delete_many）
+    max_workers = DEFAULT_MAX_WORKERS
+    _executor = None
+    _executor_lock = threading.Lock()
+
     def upload_file(self, file_path, object_name):
         """上传文件"""
         raise NotImplementedError
@@ -34,49 +67,419 @@ class StorageBackend:
         """获取文件访问URL"""
         raise NotImplementedError
 
+    @contextmanager
+    def batch(self, message=None):
+        """
+        批量上传上下文
+
+        上下文内的上传/删除合并为一次提交（由支持的后端实现），
+        默认逐个执行，无需额外处理。
+
+        Args:
+            message: 批量提交说明
+        """
+        yield self
+
+    def _get_executor(self):
+        """获取后端共享的上传线程池"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=f'{type(self).__name__}-upload'
+                    )
+        return self._executor
+
+    def upload_many(self, items):
+        """
+        并发上传多个文件对象
+
+        Args:
+            items: [(file_obj, object_name), ...]
+
+        Returns:
+            list: 与 items 一一对应的 Future，结果为上传是否成功
+        """
+        executor = self._get_executor()
+        return [executor.submit(self.upload_fileobj, file_obj, object_name)
+                for file_obj, object_name in items]
+
+    def delete_many(self, object_names):
+        """
+        并发删除多个文件
+
+        Args:
+            object_names: 对象名列表
+
+        Returns:
+            list: 与 object_names 一一对应的 Future，结果为删除是否成功
+        """
+        executor = self._get_executor()
+        return [executor.submit(self.delete_file, object_name) for object_name in object_names]
+
 
 class LocalStorage(StorageBackend):
-    """本地文件系统存储"""
+    """
+    本地文件系统存储（内容寻址）
+
+    文件内容按 SHA-256 存放在 .objects/ab/cd/<sha256>，对外的对象名
+    （如 covers/xxx.png）是指向内容对象的硬链接：相同内容只占一份磁盘，
+    重复上传只建链接不再写入。内容对象的链接数减一即引用计数，
+    不再被任何对象名引用的内容对象由 delete_file / collect_garbage 回收。
+    文件系统不支持硬链接时退化为复制。
+    """
+
+    OBJECTS_DIR = '.objects'
+    CHUNK_SIZE = 64 * 1024
 
     def __init__(self, upload_folder):
         self.upload_folder = upload_folder
+        self.objects_folder = os.path.join(upload_folder, self.OBJECTS_DIR)
+
+    def _object_path(self, digest):
+        """内容对象路径（按哈希前两级分片）"""
+        return os.path.join(self.objects_folder, digest[:2], digest[2:4], digest)
+
+    def _hash_fileobj(self, file_obj):
+        """计算文件对象剩余内容的 SHA-256，读完后回到原位置"""
+        start = file_obj.tell()
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: file_obj.read(self.CHUNK_SIZE), b''):
+            digest.update(chunk)
+        file_obj.seek(start)
+        return digest.hexdigest()
+
+    def _hash_file(self, path):
+        with open(path, 'rb') as f:
+            return self._hash_fileobj(f)
+
+    def _store_object(self, file_obj):
+        """
+        写入内容对象
+
+        可回绕的文件对象先只读一遍算哈希，内容已存在时不再写盘；
+        否则边写临时文件边算哈希，最后 os.replace 到内容路径。
+
+        Returns:
+            str: 内容对象路径
+        """
+        seekable = getattr(file_obj, 'seekable', lambda: False)()
+        if seekable:
+            object_path = self._object_path(self._hash_fileobj(file_obj))
+            if os.path.exists(object_path):
+                return object_path
+
+        os.makedirs(self.objects_folder, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_folder, prefix='.incoming_')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in iter(lambda: file_obj.read(self.CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    f.write(chunk)
+            object_path = self._object_path(digest.hexdigest())
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.replace(tmp_path, object_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return object_path
+
+    def _link(self, object_path, dest_path):
+        """把对象名原子地指向内容对象（硬链接，不支持时复制）"""
+        # 已指向同一内容：rename 对同一 inode 的两个链接不做任何事，会留下临时链接
+        if os.path.exists(dest_path) and os.path.samefile(object_path, dest_path):
+            return
+
+        dest_dir = os.path.dirname(dest_path)
+        os.makedirs(dest_dir, exist_ok=True)
+        tmp_path = os.path.join(dest_dir, f'.link_{uuid.uuid4().hex}')
+        try:
+            os.link(object_path, tmp_path)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copyfile(object_path, tmp_path)
+        try:
+            os.replace(tmp_path, dest_path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
 
     def upload_file(self, file_path, object_name=None):
-        """本地存储实际上只是移动文件"""
-        import shutil
+        """本地存储实际上只是建立链接"""
         if object_name:
-            dest_path = os.path.join(self.upload_folder, object_name)
-            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-            shutil.copy2(file_path, dest_path)
-            return True
+            with open(file_path, 'rb') as f:
+                return self.upload_fileobj(f, object_name)
         return False
 
     def upload_fileobj(self, file_obj, object_name):
-        """上传文件对象"""
-        import shutil
+        """
+        上传文件对象
+
+        内容写入对象库后再原子替换对象名，
+        并发写同名文件或中途失败都不会留下半截文件。
+        """
         dest_path = os.path.join(self.upload_folder, object_name)
-        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-        with open(dest_path, 'wb') as f:
-            shutil.copyfileobj(file_obj, f)
+        start = file_obj.tell() if getattr(file_obj, 'seekable', lambda: False)() else None
+
+        object_path = self._store_object(file_obj)
+        try:
+            self._link(object_path, dest_path)
+        except FileNotFoundError:
+            # 内容对象恰好被垃圾回收，重新写入一次
+            if start is None:
+                raise
+            file_obj.seek(start)
+            self._link(self._store_object(file_obj), dest_path)
         return True
 
+    def upload_many(self, items):
+        """本地写入足够快，直接顺序执行并返回已完成的 Future"""
+        futures = []
+        for file_obj, object_name in items:
+            try:
+                futures.append(_completed_future(self.upload_fileobj(file_obj, object_name)))
+            except Exception as e:
+                futures.append(_completed_future(exception=e))
+        return futures
+
+    def delete_many(self, object_names):
+        """顺序删除并返回已完成的 Future"""
+        return [_completed_future(self.delete_file(object_name)) for object_name in object_names]
+
     def delete_file(self, object_name):
-        """删除文件"""
+        """删除对象名，最后一个引用删除后同时回收内容对象"""
         file_path = os.path.join(self.upload_folder, object_name)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            return True
-        return False
+        if not os.path.exists(file_path):
+            return False
+
+        object_path = self._object_path(self._hash_file(file_path))
+        os.remove(file_path)
+        try:
+            if os.stat(object_path).st_nlink == 1:
+                os.remove(object_path)
+        except FileNotFoundError:
+            pass
+        return True
 
     def get_url(self, object_name):
         """获取本地文件URL"""
         return f'/static/uploads/{object_name}'
 
+    def object_name_from_url(self, url):
+        """从本地 URL 反推对象名，非本地 URL 返回 None"""
+        prefix = '/static/uploads/'
+        if url and url.startswith(prefix):
+            return url[len(prefix):].split('?', 1)[0].split('#', 1)[0]
+        return None
+
+    def _adopt(self, path):
+        """把未纳入对象库的普通文件换成指向内容对象的链接（旧数据去重）"""
+        with open(path, 'rb') as f:
+            object_path = self._store_object(f)
+        self._link(object_path, path)
+
+    def collect_garbage(self, referenced, min_age=3600, dry_run=False):
+        """
+        回收未被引用的文件
+
+        1. 删除不在 referenced 中、且超过 min_age 秒未变动的对象名
+           （留出上传后尚未保存文章的时间窗口）
+        2. 仍被引用但不在对象库中的旧文件纳入对象库去重
+        3. 删除链接数为 1（只剩对象库自身）的内容对象和遗留临时文件
+
+        Args:
+            referenced: 仍被引用的对象名集合
+            min_age: 宽限时间（秒）
+            dry_run: 只统计不删除
+
+        Returns:
+            dict: {'names': 删除的对象名数, 'objects': 删除的内容对象数,
+                   'adopted': 纳入对象库的文件数, 'bytes': 释放的字节数}
+        """
+        stats = {'names': 0, 'objects': 0, 'adopted': 0, 'bytes': 0}
+        cutoff = time.time() - min_age
+
+        for dirpath, dirnames, filenames in os.walk(self.upload_folder):
+            if dirpath == self.upload_folder and self.OBJECTS_DIR in dirnames:
+                dirnames.remove(self.OBJECTS_DIR)
+
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                st = os.lstat(path)
+                object_name = os.path.relpath(path, self.upload_folder).replace(os.sep, '/')
+
+                if filename.startswith('.'):
+                    # 中断的上传留下的临时文件
+                    if st.st_ctime < cutoff:
+                        if not dry_run:
+                            os.remove(path)
+                        stats['bytes'] += st.st_size
+                    continue
+
+                if object_name in referenced:
+                    if st.st_nlink == 1:
+                        if not dry_run:
+                            self._adopt(path)
+                        stats['adopted'] += 1
+                    continue
+
+                # 硬链接的 ctime 在建立链接时更新，取它判断最近是否被使用
+                if st.st_ctime >= cutoff:
+                    continue
+                if not dry_run:
+                    os.remove(path)
+                stats['names'] += 1
+                if st.st_nlink == 1:
+                    stats['bytes'] += st.st_size
+
+        if os.path.isdir(self.objects_folder):
+            for dirpath, _, filenames in os.walk(self.objects_folder):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    st = os.lstat(path)
+                    if filename.startswith('.'):
+                        if st.st_ctime >= cutoff:
+                            continue
+                    elif st.st_nlink > 1:
+                        continue
+                    if not dry_run:
+                        os.remove(path)
+                    stats['objects'] += 1
+                    stats['bytes'] += st.st_size
+
+        return stats
+
+
+class Base64JSONBody:
+    """
+    流式生成 GitHub contents API 的 JSON 请求体
+
+    按 3 字节对齐分块读取文件并逐块 base64 编码，请求体长度预先算出，
+    requests 会按块发送而不是先拼出完整的 base64 字符串。
+    支持 tell()/seek(0)，urllib3 重试时可以回绕重新发送。
+    """
+
+    CHUNK_SIZE = 3 * 64 * 1024
+
+    def __init__(self, fields, file_obj):
+        """
+        Args:
+            fields: 除 content 外的 JSON 字段
+            file_obj: 待上传的二进制文件对象（从当前位置读到末尾）
+        """
+        self.file_obj = file_obj
+        self.start = file_obj.tell()
+        size = file_obj.seek(0, os.SEEK_END) - self.start
+        file_obj.seek(self.start)
+
+        self.prefix = (json.dumps(fields)[:-1] + ', "content": "').encode('utf-8')
+        self.suffix = b'"}'
+        self.length = len(self.prefix) + 4 * ((size + 2) // 3) + len(self.suffix)
+        self.seek(0)
+
+    def _generate(self):
+        yield self.prefix
+        for chunk in iter(lambda: self.file_obj.read(self.CHUNK_SIZE), b''):
+            yield base64.b64encode(chunk)
+        yield self.suffix
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """只支持回到开头（重试时使用）"""
+        if offset != 0 or whence != os.SEEK_SET:
+            raise OSError('Base64JSONBody 只支持 seek(0)')
+        self.file_obj.seek(self.start)
+        self._chunks = self._generate()
+        self._buffer = b''
+        self._position = 0
+        return 0
+
+    def read(self, size=-1):
+        """按需读取请求体（供 urllib3 分块发送）"""
+        while size is None or size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size is None or size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        self._position += len(data)
+        return data
+
+
+class GitHubRetry(Retry):
+    """
+    识别 GitHub 限流响应的重试策略
+
+    - 403/429 带 Retry-After（二级限流）时按其等待
+    - 403/429 且 X-RateLimit-Remaining 为 0（一级限流）时按 X-RateLimit-Reset 计算等待时间
+    - 其他 403/429（权限不足等）不重试，直接返回响应
+    - 单次等待不超过 RETRY_AFTER_MAX 秒，避免阻塞请求线程过久
+    """
+
+    RETRY_AFTER_STATUS_CODES = frozenset({403, 413, 429, 503})
+    RATE_LIMIT_STATUS_CODES = frozenset({403, 429})
+    RETRY_AFTER_MAX = 30
+
+    @staticmethod
+    def _rate_limited(response):
+        """响应是否为限流（带 Retry-After，或剩余次数为 0）"""
+        return bool(response.headers.get('Retry-After')) or response.headers.get('X-RateLimit-Remaining') == '0'
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        # urllib3 只在带 Retry-After 时重试 403/429，这里只有状态码，
+        # 先都视为可重试，是否真的限流由 increment() 根据响应头判断
+        if super().is_retry(method, status_code, has_retry_after):
+            return True
+        return bool(self.total and self._is_method_retryable(method)
+                    and status_code in self.RATE_LIMIT_STATUS_CODES)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if (response is not None and response.status in self.RATE_LIMIT_STATUS_CODES
+                and not self._rate_limited(response)):
+            # 不是限流：raise_on_status=False 时 urllib3 捕获 MaxRetryError 后原样返回该响应
+            raise MaxRetryError(_pool, url, ResponseError(f'{response.status} 不是限流响应，不重试'))
+        return super().increment(method, url, response=response, error=error,
+                                 _pool=_pool, _stacktrace=_stacktrace)
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None and response.headers.get('X-RateLimit-Remaining') == '0':
+            reset = response.headers.get('X-RateLimit-Reset')
+            if reset and reset.isdigit():
+                retry_after = max(0, int(reset) - time.time())
+        if retry_after is None:
+            return None
+        return min(retry_after, self.RETRY_AFTER_MAX)
+
 
 class GitHubStorage(StorageBackend):
     """GitHub 仓库作为图床"""
 
-    def __init__(self, token, repo, branch='main', path='images'):
+    # 已知文件 sha 缓存上限（LRU）
+    SHA_CACHE_SIZE = 1024
+
+    def __init__(self, token, repo, branch='main', path='images',
+                 api_base='https://api.github.com', pool_size=10, max_retries=3,
+                 max_workers=DEFAULT_MAX_WORKERS):
         """
         初始化 GitHub 存储
 
@@ -85,14 +488,19 @@ class GitHubStorage(StorageBackend):
             repo: 仓库格式 "username/repo-name"
             branch: 分支名（默认 main）
             path: 图片存储路径（默认 images）
+            api_base: API 地址（默认 GitHub，测试时可指向本地桩服务）
+            pool_size: 连接池大小
+            max_retries: 5xx/限流的最大重试次数
+            max_workers: upload_many 并发上传数
         """
         self.token = token
+        self.max_workers = max_workers
         self.repo = repo
         self.branch = branch
         self.path = path
 
         # GitHub API 配置
-        self.api_base = 'https://api.github.com'
+        self.api_base = api_base.rstrip('/')
         self.raw_base = 'https://raw.githubusercontent.com'
 
         # 请求头
@@ -101,50 +509,115 @@ class GitHubStorage(StorageBackend):
             'Accept': 'application/vnd.github.v3+json'
         }
 
-    def upload_fileobj(self, file_obj, object_name):
-        """上传文件对象到 GitHub"""
-        try:
-            # 读取文件内容
-            file_content = file_obj.read()
-            # 转换为 base64
-            b64_content = base64.b64encode(file_content).decode('utf-8')
+        # 共享会话：复用 TLS 连接，自动重试 5xx 和限流
+        retry = GitHubRetry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({'GET', 'PUT', 'DELETE', 'POST'}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # 记录每次 API 请求的耗时（Prometheus 指标）
+        self.session.hooks['response'].append(metrics.observe_github_response)
+
+        # 文件路径 → sha，上传/删除已知文件时省去一次 GET
+        self._sha_cache = OrderedDict()
+        self._sha_lock = threading.Lock()
+
+        # 当前线程的批量提交（见 batch()）
+        self._local = threading.local()
+
+    def _contents_url(self, object_name):
+        """contents API 地址"""
+        return f'{self.api_base}/repos/{self.repo}/contents/{self.path}/{object_name}'
+
+    def _cache_sha(self, object_name, sha):
+        with self._sha_lock:
+            if sha is None:
+                self._sha_cache.pop(object_name, None)
+                return
+            self._sha_cache[object_name] = sha
+            self._sha_cache.move_to_end(object_name)
+            while len(self._sha_cache) > self.SHA_CACHE_SIZE:
+                self._sha_cache.popitem(last=False)
+
+    def _cached_sha(self, object_name):
+        with self._sha_lock:
+            return self._sha_cache.get(object_name)
+
+    def _fetch_sha(self, object_name):
+        """
+        查询远端文件 sha
 
-            # 构建文件路径
-            file_path = f'{self.path}/{object_name}'
+        Returns:
+            str|None: sha，文件不存在时返回 None
+        """
+        response = self.session.get(self._contents_url(object_name),
+                                    params={'ref': self.branch}, timeout=10)
+        if response.status_code == 404:
+            self._cache_sha(object_name, None)
+            return None
+        response.raise_for_status()
+        sha = response.json()['sha']
+        self._cache_sha(object_name, sha)
+        return sha
 
-            # 构造 API 请求
-            url = f'{self.api_base}/repos/{self.repo}/contents/{file_path}'
+    def upload_fileobj(self, file_obj, object_name):
+        """
+        上传文件对象到 GitHub
 
-            # 首先检查文件是否存在
-            existing_file = None
-            try:
-                response = requests.get(url, headers=self.headers, timeout=10)
-                if response.status_code == 200:
-                    existing_file = response.json()
-            except:
-                pass
-
-            # 准备请求数据
-            data = {
-                'message': f'Upload image: {object_name}',
-                'content': b64_content,
-                'branch': self.branch
-            }
-
-            # 如果文件已存在，需要提供 sha
-            if existing_file:
-                data['sha'] = existing_file['sha']
-
-            # 上传文件
-            response = requests.put(url, headers=self.headers, json=data, timeout=30)
-
-            if response.status_code in [201, 200]:
-                logger.info(f'图片已上传到 GitHub: {object_name}')
-                return True
-            else:
-                logger.error(f'GitHub 上传失败: {response.text}')
+        先用缓存的 sha（新文件则不带 sha）直接 PUT，
+        只有遇到 409/422（sha 缺失或过期）时才查询远端 sha 再重试一次。
+        在 batch() 上下文中只创建 blob，退出时统一提交。
+        """
+        current_batch = getattr(self._local, 'batch', None)
+        if current_batch is not None:
+            return self._stage_blob(current_batch, file_obj, object_name)
+
+        try:
+            url = self._contents_url(object_name)
+            start = file_obj.tell()
+            sha = self._cached_sha(object_name)
+
+            for attempt in range(2):
+                data = {
+                    'message': f'Upload image: {object_name}',
+                    'branch': self.branch
+                }
+                # 如果文件已存在，需要提供 sha
+                if sha:
+                    data['sha'] = sha
+
+                file_obj.seek(start)
+                response = self.session.put(
+                    url,
+                    headers={'Content-Type': 'application/json'},
+                    data=Base64JSONBody(data, file_obj),
+                    timeout=30
+                )
+
+                if response.status_code in (200, 201):
+                    self._cache_sha(object_name, response.json().get('content', {}).get('sha'))
+                    logger.info(f'图片已上传到 GitHub: {object_name}')
+                    return True
+
+                if response.status_code in (409, 422) and attempt == 0:
+                    # sha 缺失或过期：刷新后重试
+                    logger.info(f'GitHub sha 冲突，刷新后重试: {object_name}')
+                    sha = self._fetch_sha(object_name)
+                    continue
+
+                logger.error(f'GitHub 上传失败 ({response.status_code}): {response.text[:500]}')
                 return False
 
+            return False
+
         except Exception as e:
             logger.error(f'GitHub 上传异常: {str(e)}')
             return False
@@ -160,32 +633,235 @@ class GitHubStorage(StorageBackend):
 
     def delete_file(self, object_name):
         """删除 GitHub 中的文件"""
+        current_batch = getattr(self._local, 'batch', None)
+        if current_batch is not None:
+            # tree 条目 sha 为 null 表示删除
+            current_batch['entries'][f'{self.path}/{object_name}'] = None
+            return True
+
         try:
-            file_path = f'{self.path}/{object_name}'
-            url = f'{self.api_base}/repos/{self.repo}/contents/{file_path}'
+            url = self._contents_url(object_name)
+            sha = self._cached_sha(object_name) or self._fetch_sha(object_name)
 
-            # 获取文件信息
-            response = requests.get(url, headers=self.headers, timeout=10)
-            if response.status_code != 200:
-                return False
+            for attempt in range(2):
+                if sha is None:
+                    return False
+
+                data = {
+                    'message': f'Delete image: {object_name}',
+                    'sha': sha,
+                    'branch': self.branch
+                }
+                response = self.session.delete(url, json=data, timeout=30)
 
-            file_data = response.json()
-            sha = file_data['sha']
+                if response.status_code == 200:
+                    self._cache_sha(object_name, None)
+                    return True
 
-            # 删除文件
-            data = {
-                'message': f'Delete image: {object_name}',
-                'sha': sha,
-                'branch': self.branch
-            }
+                if response.status_code in (409, 422) and attempt == 0:
+                    sha = self._fetch_sha(object_name)
+                    continue
 
-            response = requests.delete(url, headers=self.headers, json=data, timeout=30)
-            return response.status_code == 200
+                logger.error(f'GitHub 删除失败 ({response.status_code}): {response.text[:500]}')
+                return False
+
+            return False
 
         except Exception as e:
             logger.error(f'GitHub 删除失败: {str(e)}')
             return False
 
+    @contextmanager
+    def batch(self, message='Upload images'):
+        """
+        批量上传上下文（Git Data API）
+
+        上下文内的 upload_fileobj 只创建 blob，delete_file 只登记删除，
+        退出时按 blobs → tree → commit → ref 生成一次提交。
+        嵌套调用复用外层批次；上下文内抛出异常时放弃提交。
+
+        Args:
+            message: 提交说明
+
+        Raises:
+            IOError: 批量提交失败
+        """
+        if getattr(self._local, 'batch', None) is not None:
+            yield self
+            return
+
+        current_batch = self._new_batch(message)
+        self._local.batch = current_batch
+        try:
+            yield self
+        finally:
+            self._local.batch = None
+
+        # 等待 upload_many 提交的 blob 全部完成
+        wait(current_batch['pending'])
+        if current_batch['entries']:
+            self._commit_batch(current_batch)
+
+    @staticmethod
+    def _new_batch(message):
+        return {'message': message, 'entries': OrderedDict(), 'pending': []}
+
+    def upload_many(self, items):
+        """
+        并发上传多个文件对象
+
+        blob 在线程池中并发创建，最后合并为一次提交
+        （并发调用 contents API 会因分支头变化互相冲突）。
+        在 batch() 上下文中调用时由外层批次统一提交，
+        否则所有 blob 完成后自动提交，返回的 Future 在提交后才完成。
+
+        Args:
+            items: [(file_obj, object_name), ...]
+
+        Returns:
+            list: 与 items 一一对应的 Future，结果为上传是否成功
+        """
+        items = list(items)
+        executor = self._get_executor()
+        outer_batch = getattr(self._local, 'batch', None)
+        current_batch = outer_batch or self._new_batch(f'Upload {len(items)} images')
+
+        blob_futures = [executor.submit(self._stage_blob, current_batch, file_obj, object_name)
+                        for file_obj, object_name in items]
+        current_batch['pending'].extend(blob_futures)
+        if outer_batch is not None or not blob_futures:
+            return blob_futures
+
+        results = [Future() for _ in blob_futures]
+        remaining = [len(blob_futures)]
+        lock = threading.Lock()
+
+        def on_blob_done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            # 最后一个 blob 完成：统一提交
+            try:
+                if current_batch['entries']:
+                    self._commit_batch(current_batch)
+                for result, blob_future in zip(results, blob_futures):
+                    exception = blob_future.exception()
+                    if exception is not None:
+                        result.set_exception(exception)
+                    else:
+                        result.set_result(blob_future.result())
+            except Exception as e:
+                for result in results:
+                    result.set_exception(e)
+
+        for blob_future in blob_futures:
+            blob_future.add_done_callback(on_blob_done)
+        return results
+
+    def delete_many(self, object_names):
+        """
+        删除多个文件，合并为一次提交
+
+        Args:
+            object_names: 对象名列表
+
+        Returns:
+            list: 与 object_names 一一对应的 Future
+        """
+        object_names = list(object_names)
+        if getattr(self._local, 'batch', None) is not None:
+            return [_completed_future(self.delete_file(name)) for name in object_names]
+
+        def delete_all():
+            with self.batch(f'Delete {len(object_names)} images'):
+                return [self.delete_file(name) for name in object_names]
+
+        batch_future = self._get_executor().submit(delete_all)
+        results = [Future() for _ in object_names]
+
+        def on_done(future):
+            exception = future.exception()
+            for index, result in enumerate(results):
+                if exception is not None:
+                    result.set_exception(exception)
+                else:
+                    result.set_result(future.result()[index])
+
+        batch_future.add_done_callback(on_done)
+        return results
+
+    def _git_url(self, endpoint):
+        """Git Data API 地址"""
+        return f'{self.api_base}/repos/{self.repo}/git/{endpoint}'
+
+    def _stage_blob(self, current_batch, file_obj, object_name):
+        """创建 blob 并登记到批次中"""
+        try:
+            response = self.session.post(
+                self._git_url('blobs'),
+                headers={'Content-Type': 'application/json'},
+                data=Base64JSONBody({'encoding': 'base64'}, file_obj),
+                timeout=30
+            )
+            if response.status_code != 201:
+                logger.error(f'GitHub blob 创建失败 ({response.status_code}): {response.text[:500]}')
+                return False
+            current_batch['entries'][f'{self.path}/{object_name}'] = response.json()['sha']
+            return True
+        except Exception as e:
+            logger.error(f'GitHub blob 创建异常: {str(e)}')
+            return False
+
+    def _commit_batch(self, current_batch, max_attempts=3):
+        """
+        把批次中的 blob 合并为一次提交并更新分支
+
+        分支在此期间被其他提交推进时（ref 更新返回 422），基于最新提交重试。
+        """
+        entries = current_batch['entries']
+        tree = [
+            {'path': path, 'mode': '100644', 'type': 'blob', 'sha': sha}
+            for path, sha in entries.items()
+        ]
+
+        for attempt in range(max_attempts):
+            response = self.session.get(self._git_url(f'ref/heads/{self.branch}'), timeout=10)
+            response.raise_for_status()
+            parent_sha = response.json()['object']['sha']
+
+            response = self.session.get(self._git_url(f'commits/{parent_sha}'), timeout=10)
+            response.raise_for_status()
+            base_tree = response.json()['tree']['sha']
+
+            response = self.session.post(self._git_url('trees'),
+                                         json={'base_tree': base_tree, 'tree': tree}, timeout=30)
+            response.raise_for_status()
+            tree_sha = response.json()['sha']
+
+            response = self.session.post(self._git_url('commits'), json={
+                'message': current_batch['message'],
+                'tree': tree_sha,
+                'parents': [parent_sha],
+            }, timeout=30)
+            response.raise_for_status()
+            commit_sha = response.json()['sha']
+
+            response = self.session.patch(self._git_url(f'refs/heads/{self.branch}'),
+                                          json={'sha': commit_sha}, timeout=30)
+            if response.status_code == 200:
+                prefix = f'{self.path}/'
+                for path, sha in entries.items():
+                    self._cache_sha(path[len(prefix):], sha)
+                logger.info(f'GitHub 批量提交完成: {len(entries)} 个文件 ({commit_sha[:7]})')
+                return commit_sha
+
+            if response.status_code != 422:
+                break
+            logger.info(f'GitHub 分支已更新，重试批量提交 ({attempt + 1}/{max_attempts})')
+
+        raise IOError(f'GitHub 批量提交失败 ({response.status_code}): {response.text[:500]}')
+
     def get_url(self, object_name):
         """获取 GitHub 文件访问 URL"""
         # 使用 jsDelivr CDN 加速，国内可直接访问
@@ -209,6 +885,8 @@ def get_storage():
     github_repo = os.environ.get('GITHUB_REPO')
     github_branch = os.environ.get('GITHUB_BRANCH', 'main')
     github_path = os.environ.get('GITHUB_PATH', 'images')
+    github_api_base = os.environ.get('GITHUB_API_BASE', 'https://api.github.com')
+    max_workers = int(os.environ.get('STORAGE_MAX_WORKERS', DEFAULT_MAX_WORKERS))
 
     # 如果配置了 GitHub，使用 GitHub 存储
     if github_token and github_repo:
@@ -216,14 +894,17 @@ def get_storage():
             token=github_token,
             repo=github_repo,
             branch=github_branch,
-            path=github_path
+            path=github_path,
+            api_base=github_api_base,
+            max_workers=max_workers
         )
         logger.info(f'使用 GitHub 图床: {github_repo}/{github_path}')
         return _storage
 
     # 否则使用本地存储
+    # 对象名带 covers/ 前缀，根目录取 UPLOAD_FOLDER 的上级（static/uploads），与 get_url 对应
     from flask import current_app
-    upload_folder = current_app.config['UPLOAD_FOLDER']
+    upload_folder = os.path.dirname(current_app.config['UPLOAD_FOLDER'])
     _storage = LocalStorage(upload_folder)
     logger.info(f'使用本地存储: {upload_folder}')
     return _storage
@@ -233,3 +914,84 @@ def reset_storage():
     """重置存储实例（用于测试或配置更改）"""
     global _storage
     _storage = None
+
+
+# 正文中引用的本地上传文件
+_LOCAL_UPLOAD_PATTERN = re.compile(r'/static/uploads/([^\s\'"()<>?#]+)')
+
+
+def referenced_object_names():
+    """
+    收集仍被引用的本地对象名
+
+    包括文章封面、正文中的图片、友情链接 logo，以及这些封面对应的衍生图。
+    需要在应用上下文中调用。
+
+    Returns:
+        set: 对象名集合（相对 static/uploads）
+    """
+    from app.models.post import Post
+    from app.models.friend_link import FriendLink
+    from app.models.image_derivative import ImageDerivative
+
+    urls = set()
+    for cover_image, content, cover_variants in Post.query.with_entities(
+            Post.cover_image, Post.content, Post.cover_variants):
+        if cover_image:
+            urls.add(cover_image)
+        urls.update(f'/static/uploads/{name}' for name in _LOCAL_UPLOAD_PATTERN.findall(content or ''))
+        if cover_variants:
+            urls.update(url for sizes in json.loads(cover_variants).values() for url in sizes.values())
+
+    urls.update(logo for (logo,) in FriendLink.query.with_entities(FriendLink.logo) if logo)
+
+    for record in ImageDerivative.query.filter_by(status='ready'):
+        if record.source_url in urls:
+            urls.update(url for sizes in record.get_variants().values() for url in sizes.values())
+
+    names = set()
+    for url in urls:
+        match = _LOCAL_UPLOAD_PATTERN.search(url)
+        if match:
+            names.add(match.group(1))
+    return names
+
+
+def collect_garbage(min_age=3600, dry_run=False):
+    """
+    回收本地存储中未被引用的文件
+
+    同时删除源图文件已不存在的衍生图记录。
+    需要在应用上下文中调用。
+
+    Args:
+        min_age: 宽限时间（秒），新上传的文件不会被回收
+        dry_run: 只统计不删除
+
+    Returns:
+        dict|None: 回收统计，当前不是本地存储时返回 None
+    """
+    from app import db
+    from app.models.image_derivative import ImageDerivative
+
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        return None
+
+    referenced = referenced_object_names()
+    stats = storage.collect_garbage(referenced, min_age=min_age, dry_run=dry_run)
+
+    # 源图文件已不存在的衍生图记录
+    stale = []
+    for record in ImageDerivative.query:
+        name = storage.object_name_from_url(record.source_url)
+        if name and not os.path.exists(os.path.join(storage.upload_folder, name)):
+            stale.append(record)
+    stats['records'] = len(stale)
+    if not dry_run and stale:
+        for record in stale:
+            db.session.delete(record)
+        db.session.commit()
+
+    logger.info(f'本地存储垃圾回收: {stats}')
+    return stats
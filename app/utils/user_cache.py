@@ -0,0 +1,178 @@
+"""
+登录用户缓存模块
+
+Flask-Login 每个请求都会调用 load_user，文章页轮询收藏接口等场景下每次都要查一次 user 表。
+这里缓存一个只读的用户快照（UserSnapshot），按两级查找：
+- 进程内 LRU：有效期很短（USER_CACHE_LOCAL_TTL），命中时不访问任何外部服务
+- 缓存后端（Flask-Caching，生产环境为 Redis）：所有 worker 共享（USER_CACHE_TTL）
+两级都未命中时才查询数据库。
+
+快照只包含模板和路由用到的字段（id、用户名、邮箱），不含密码哈希等敏感字段；
+需要 ORM 对象（修改用户、访问 posts 关系）时调用 snapshot.load()。
+用户数据修改（如重置密码）后调用 invalidate_user() 清除缓存。
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from flask import current_app
+from flask_login import UserMixin
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 缓存后端键前缀
+CACHE_KEY = 'user_snapshot:{}'
+
+# 快照字段
+SNAPSHOT_FIELDS = ('id', 'username', 'email')
+
+
+class UserSnapshot(UserMixin):
+    """
+    只读用户快照
+
+    与 User 同样继承 UserMixin，post.author == current_user 等比较按 id 进行。
+    """
+
+    __slots__ = SNAPSHOT_FIELDS
+
+    def __init__(self, id, username, email):
+        object.__setattr__(self, 'id', id)
+        object.__setattr__(self, 'username', username)
+        object.__setattr__(self, 'email', email)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('UserSnapshot 为只读对象，修改用户请使用 load() 返回的 User')
+
+    def __delattr__(self, name):
+        raise AttributeError('UserSnapshot 为只读对象')
+
+    __hash__ = object.__hash__
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(*(getattr(user, field) for field in SNAPSHOT_FIELDS))
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in SNAPSHOT_FIELDS}
+
+    def load(self):
+        """从数据库加载完整的 User 对象"""
+        from app.models.user import User
+        return User.query.get(self.id)
+
+    def __repr__(self):
+        return f'<UserSnapshot {self.username}>'
+
+
+class UserCache:
+    """两级用户快照缓存"""
+
+    def __init__(self, max_size=1024, local_ttl=30):
+        self.max_size = max_size
+        self.local_ttl = local_ttl
+        # user_id → (快照, 过期时间(monotonic))，按最近访问排序
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_local(self, user_id):
+        with self._lock:
+            entry = self._local.get(user_id)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._local[user_id]
+                return None
+            self._local.move_to_end(user_id)
+            return entry[0]
+
+    def _set_local(self, user_id, snapshot):
+        with self._lock:
+            self._local[user_id] = (snapshot, time.monotonic() + self.local_ttl)
+            self._local.move_to_end(user_id)
+            while len(self._local) > self.max_size:
+                self._local.popitem(last=False)
+
+    def get(self, user_id, loader):
+        """
+        获取用户快照
+
+        Args:
+            user_id: 用户ID
+            loader: 未命中时调用的函数，返回 User 或 None
+
+        Returns:
+            UserSnapshot|None: 用户不存在时返回 None（不缓存）
+        """
+        snapshot = self._get_local(user_id)
+        if snapshot is not None:
+            return snapshot
+
+        from app import cache
+        key = CACHE_KEY.format(user_id)
+        try:
+            data = cache.get(key)
+        except Exception as e:
+            logger.warning(f'读取用户缓存失败: {str(e)}')
+            data = None
+
+        if data is not None:
+            snapshot = UserSnapshot(**data)
+        else:
+            user = loader(user_id)
+            if user is None:
+                return None
+            snapshot = UserSnapshot.from_user(user)
+            try:
+                cache.set(key, snapshot.to_dict(), timeout=current_app.config['USER_CACHE_TTL'])
+            except Exception as e:
+                logger.warning(f'写入用户缓存失败: {str(e)}')
+
+        self._set_local(user_id, snapshot)
+        return snapshot
+
+    def invalidate(self, user_id):
+        """
+        清除用户缓存
+
+        缓存后端立即失效；其他 worker 的进程内条目最多在 local_ttl 秒后过期。
+        """
+        with self._lock:
+            self._local.pop(user_id, None)
+
+        from app import cache
+        try:
+            cache.delete(CACHE_KEY.format(user_id))
+        except Exception as e:
+            logger.warning(f'清除用户缓存失败: {str(e)}')
+
+    def clear(self):
+        """清空进程内缓存"""
+        with self._lock:
+            self._local.clear()
+
+    def __len__(self):
+        return len(self._local)
+
+
+# 全局缓存实例
+_user_cache = None
+
+
+def get_user_cache():
+    """获取当前配置的用户缓存"""
+    global _user_cache
+
+    if _user_cache is None:
+        _user_cache = UserCache(
+            max_size=current_app.config['USER_CACHE_MAX_SIZE'],
+            local_ttl=current_app.config['USER_CACHE_LOCAL_TTL']
+        )
+    return _user_cache
+
+
+def invalidate_user(user_id):
+    """用户数据修改后清除缓存"""
+    get_user_cache().invalidate(user_id)
@@ -0,0 +1,96 @@
+"""
+文章浏览量缓冲模块
+
+浏览文章时只在进程内累加增量，不在请求中写库：累计 VIEW_FLUSH_THRESHOLD 次浏览，
+或距上次写入超过 VIEW_FLUSH_INTERVAL 秒时，在一个事务中把各文章的增量合并写入
+（UPDATE post SET views = views + n）。进程退出时写入剩余的增量。
+
+尚未写入数据库的浏览数由 metrics.POST_VIEWS_PENDING 导出（multiprocess_mode='livesum'，
+多个 worker 的积压相加，已退出的进程不再计入）。
+"""
+
+import time
+import atexit
+import logging
+import threading
+from collections import Counter
+from sqlalchemy import text
+from app.utils import metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+_BUMP_VIEWS = text('UPDATE post SET views = views + :n WHERE id = :id')
+
+_lock = threading.Lock()
+_pending = Counter()
+_state = {'app': None, 'last_flush': time.monotonic()}
+
+
+def record_view(app, post_id):
+    """
+    记录一次文章浏览，达到阈值或间隔时写入数据库
+
+    Args:
+        app: Flask 应用实例（进程退出时用于写入剩余增量）
+        post_id: 文章 ID
+    """
+    metrics.POST_VIEWS.inc()
+    metrics.POST_VIEWS_PENDING.inc()
+    with _lock:
+        if _state['app'] is None:
+            _state['app'] = app
+            atexit.register(_flush_at_exit)
+        _pending[post_id] += 1
+        due = (sum(_pending.values()) >= app.config['VIEW_FLUSH_THRESHOLD']
+               or time.monotonic() - _state['last_flush'] >= app.config['VIEW_FLUSH_INTERVAL'])
+    if due:
+        flush_views(app)
+
+
+def pending_views(post_id=None):
+    """尚未写入数据库的浏览数（指定 post_id 时只统计该文章）"""
+    with _lock:
+        if post_id is None:
+            return sum(_pending.values())
+        return _pending.get(post_id, 0)
+
+
+def flush_views(app):
+    """
+    把缓冲的浏览量写入数据库
+
+    使用主库引擎单独提交，不影响当前请求的会话；写入失败时增量放回缓冲，下次再写。
+
+    Returns:
+        int: 写入的浏览数
+    """
+    from app import db
+
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+        _state['last_flush'] = time.monotonic()
+    if not batch:
+        return 0
+
+    try:
+        with app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(_BUMP_VIEWS, [{'id': post_id, 'n': n} for post_id, n in batch.items()])
+    except Exception as e:
+        logger.warning(f'写入浏览量失败，{sum(batch.values())} 次浏览留待下次写入: {e}')
+        with _lock:
+            _pending.update(batch)
+        return 0
+
+    flushed = sum(batch.values())
+    metrics.POST_VIEWS_PENDING.dec(flushed)
+    return flushed
+
+
+def _flush_at_exit():
+    """进程退出时写入剩余增量"""
+    app = _state['app']
+    if app is not None:
+        flush_views(app)
@@ -15,6 +15,13 @@ fc-list :lang=zh | head -3
 echo "========================================="
 echo "Installing Python dependencies..."
 echo "========================================="
-pip install -r requirements.txt
+pip install -r requirements.txt || exit 1
+
+echo "========================================="
+echo "Building static assets and migrating database..."
+echo "========================================="
+# 迁移在构建阶段执行一次，失败时中止部署，不让新代码跑在旧表结构上
+flask --app wsgi build-static || exit 1
+flask --app wsgi db upgrade || exit 1
 
 echo "Build completed!"
@@ -23,21 +23,142 @@ class Config:
         'sqlite:///' + os.path.join(basedir, 'instance', 'blog.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # PostgreSQL 连接池（每个 gunicorn worker 一个池，pool_size 与 --threads 一致）
+    # 总连接数 = worker 数 × (DB_POOL_SIZE + DB_MAX_OVERFLOW)，不能超过数据库的连接上限
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or os.environ.get('GUNICORN_THREADS', 2))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 2))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    # 早于云服务商断开空闲连接的时间回收连接，取连接前 pre-ping 检测失效连接
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'True') == 'True'
+    # 单条语句最长执行时间（毫秒），0 为不限制
+    DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT', 30000))
+    # 经 PgBouncer（事务模式）连接：不使用连接池和预编译语句
+    DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', 'False') == 'True'
+
+    # SQLite 调优（对文件型 SQLite 数据库生效）：WAL 日志、同步级别、锁等待、页缓存（负数为 KB）、内存映射
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', 'True') == 'True'
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', 'True') == 'True'
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -20000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    # GET 请求的查询使用单独的只读连接池
+    SQLITE_READ_POOL = os.environ.get('SQLITE_READ_POOL', 'True') == 'True'
+
+    # 只读副本：REPLICA_ENDPOINTS 中的 GET 处理函数查询副本，
+    # 客户端提交写入后 REPLICA_STICKY_SECONDS 秒内仍读主库（应大于复制延迟）
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    REPLICA_ENDPOINTS = frozenset(os.environ.get(
+        'REPLICA_ENDPOINTS',
+        'main.index,main.post,main.category,main.tag,main.search,main.archive,main.rss_feed,main.sitemap'
+    ).split(','))
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
+    # N+1 检测：同一关联在一个请求中按需加载超过 QUERY_GUARD_LAZY_LIMIT 次时抛出异常
+    QUERY_GUARD_RAISE = os.environ.get('QUERY_GUARD_RAISE', 'False') == 'True'
+    QUERY_GUARD_LAZY_LIMIT = int(os.environ.get('QUERY_GUARD_LAZY_LIMIT', 1))
+
+    # 请求耗时统计：SQL 条数/耗时、渲染耗时、缓存命中（后台 /admin/api/request-metrics）
+    REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS_ENABLED', 'True') == 'True'
+    # 响应中添加 Server-Timing 头：只发给已登录后台的用户，
+    # 或请求头 X-Server-Timing 等于 SERVER_TIMING_TOKEN 的请求（命令行 curl、监控探针使用）
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', 'True') == 'True'
+    SERVER_TIMING_TOKEN = os.environ.get('SERVER_TIMING_TOKEN')
+    # 总耗时超过该值（毫秒）的请求记录慢请求日志
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 1000))
+
+    # Prometheus 指标：/metrics 需要 Authorization: Bearer <METRICS_TOKEN> 或已登录后台
+    # 多 worker 合并统计需设置环境变量 PROMETHEUS_MULTIPROC_DIR（见 gunicorn.conf.py）
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # 请求采样分析（cProfile）：按比例抽样，或带 PROFILE_HEADER 请求头（需已登录或值等于 PROFILE_TOKEN）
+    # 结果保存在 PROFILE_DIR，最多保留 PROFILE_MAX_FILES 个，后台 /admin/profiles 查看
+    PROFILE_ENABLED = os.environ.get('PROFILE_ENABLED', 'False') == 'True'
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_HEADER = os.environ.get('PROFILE_HEADER', 'X-Profile')
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(basedir, 'instance', 'profiles')
+    PROFILE_MAX_FILES = max(int(os.environ.get('PROFILE_MAX_FILES', 50)), 1)
+
     # Session 配置
     SESSION_COOKIE_SECURE = os.environ.get('SESSION_SECURE', 'False') == 'True'
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
 
+    # 登录失败限制：窗口内失败 LOGIN_MAX_ATTEMPTS 次后封禁 LOGIN_BLOCK_SECONDS 秒
+    LOGIN_MAX_ATTEMPTS = int(os.environ.get('LOGIN_MAX_ATTEMPTS', 5))
+    LOGIN_ATTEMPT_WINDOW = int(os.environ.get('LOGIN_ATTEMPT_WINDOW', 1800))
+    LOGIN_BLOCK_SECONDS = int(os.environ.get('LOGIN_BLOCK_SECONDS', 1800))
+
+    # 应用前的可信反向代理层数：客户端 IP 取 X-Forwarded-For 中倒数第 N 个地址（ProxyFix），
+    # 登录封禁和令牌桶限流按该 IP 计数；直接对外提供服务时设为 0，不信任 X-Forwarded-For
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 1))
+
+    # 文章浏览量在进程内累加，累计 VIEW_FLUSH_THRESHOLD 次或间隔 VIEW_FLUSH_INTERVAL 秒后批量写入
+    VIEW_FLUSH_THRESHOLD = max(int(os.environ.get('VIEW_FLUSH_THRESHOLD', 50)), 1)
+    VIEW_FLUSH_INTERVAL = float(os.environ.get('VIEW_FLUSH_INTERVAL', 10))
+
+    # 限流状态存储（多 worker 共享），未配置 Redis 时使用进程内存储
+    RATE_LIMIT_STORAGE_URL = os.environ.get('RATE_LIMIT_STORAGE_URL') or os.environ.get('REDIS_URL')
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 10000))
+    # 搜索、RSS、收藏等接口的令牌桶限流
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True') == 'True'
+
+    # 密码哈希策略（werkzeug method 格式），参数变化后用户下次登录时自动重新哈希
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    # 同时执行 KDF 的线程数、排队上限和排队等待时间（秒）
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+
     # 文件上传配置
     UPLOAD_FOLDER = os.path.join(basedir, 'app', 'static', 'uploads', 'covers')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
+    # 自动封面编码：COVER_FORMAT 为 png（灰度调色板 PNG）或 webp
+    COVER_FORMAT = os.environ.get('COVER_FORMAT', 'png').lower()
+    # PNG 调色板灰阶数：2（1-bit，无抗锯齿）/ 4 / 16 / 256
+    COVER_PNG_COLORS = int(os.environ.get('COVER_PNG_COLORS', 16))
+    COVER_PNG_COMPRESS_LEVEL = int(os.environ.get('COVER_PNG_COMPRESS_LEVEL', 6))
+    # WebP 质量（1-100），100 表示无损
+    COVER_WEBP_QUALITY = int(os.environ.get('COVER_WEBP_QUALITY', 80))
+
+    # 封面衍生图配置（srcset 多尺寸）
+    IMAGE_DERIVATIVE_WIDTHS = [
+        int(w) for w in os.environ.get('IMAGE_DERIVATIVE_WIDTHS', '320,640,1280').split(',')
+    ]
+    IMAGE_DERIVATIVE_FORMATS = os.environ.get('IMAGE_DERIVATIVE_FORMATS', 'webp,jpeg').split(',')
+    IMAGE_DERIVATIVE_QUALITY = int(os.environ.get('IMAGE_DERIVATIVE_QUALITY', 80))
+    IMAGE_DERIVATIVES_ASYNC = True
+
+    # 静态资源配置
+    # url_for('static') 生成带内容哈希的文件名，并返回 Cache-Control: immutable
+    STATIC_HASHED_URLS = os.environ.get('STATIC_HASHED_URLS', 'True') == 'True'
+    # 前置 Apache/lighttpd 时由服务器发送文件
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'False') == 'True'
+    # 前置 nginx 时的内部 location 前缀，例如 /_static/
+    STATIC_ACCEL_REDIRECT = os.environ.get('STATIC_ACCEL_REDIRECT')
+    # 使用 flask build-static 生成的打包资源（内联关键 CSS，异步加载完整样式）
+    ASSET_BUNDLES = os.environ.get('ASSET_BUNDLES', 'True') == 'True'
+
+    # 启动时数据库版本落后则自动执行迁移（生产环境在部署时执行 flask db upgrade）
+    AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', 'False') == 'True'
+
     # 缓存配置
     CACHE_TYPE = 'SimpleCache'
     CACHE_DEFAULT_TIMEOUT = 300
     CACHE_KEY_PREFIX = 'blog_'
 
+    # 登录用户快照缓存（load_user 不再每个请求查询 user 表）
+    USER_CACHE_ENABLED = os.environ.get('USER_CACHE_ENABLED', 'True') == 'True'
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
+    # 进程内 LRU 的有效期和容量，其他 worker 修改用户后最多延迟这么久生效
+    USER_CACHE_LOCAL_TTL = int(os.environ.get('USER_CACHE_LOCAL_TTL', 30))
+    USER_CACHE_MAX_SIZE = int(os.environ.get('USER_CACHE_MAX_SIZE', 1024))
+
     # 日志配置
     LOG_TO_STDOUT = os.environ.get('LOG_TO_STDOUT')
     LOG_LEVEL = logging.INFO
@@ -59,6 +180,9 @@ class DevelopmentConfig(Config):
     # 开发环境使用更详细的错误页面
     TEMPLATES_AUTO_RELOAD = True
 
+    # 开发环境启动时自动执行迁移
+    AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', 'True') == 'True'
+
 
 class ProductionConfig(Config):
     """生产环境配置"""
@@ -87,8 +211,24 @@ class TestingConfig(Config):
     DEBUG = True
     WTF_CSRF_ENABLED = False
 
-    # 使用内存数据库
+    # 使用内存数据库，启动时自动建表
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    AUTO_MIGRATE = True
+
+    # 测试中使用低成本的密码哈希
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+
+    # 测试中使用进程内限流存储
+    RATE_LIMIT_STORAGE_URL = None
+
+    # 测试中每次浏览立即写入
+    VIEW_FLUSH_THRESHOLD = 1
+
+    # 测试中同步生成衍生图
+    IMAGE_DERIVATIVES_ASYNC = False
+
+    # 测试中发现 N+1 查询时直接报错
+    QUERY_GUARD_RAISE = True
 
 
 # 配置字典
@@ -17,17 +17,16 @@ print()
 
 print("2. 数据库初始化:")
 print("-" * 50)
-print("部署完成后，访问你的应用，添加 /init-db 到 URL 末尾来初始化数据库")
-print("例如: https://你的应用名.onrender.com/init-db")
+print("Render 的 Build Command 使用构建脚本（包含数据库迁移）:")
+print("bash build.sh  # 安装依赖、build-static、db upgrade")
 print()
-print("你会看到类似这样的响应:")
-print('{"success": true, "message": "数据库初始化成功！", "admin_created": true}')
+print("部署完成后在 Render Shell 中创建管理员:")
+print("flask --app wsgi db create-admin")
 print()
 
-print("3. 默认管理员账号:")
+print("3. 管理员账号:")
 print("-" * 50)
-print("用户名: admin01")
-print("密码: 123456")
+print("用户名: admin01（可通过 --username 修改），密码在执行 db create-admin 时设置")
 print()
 
 print("4. 后台登录:")
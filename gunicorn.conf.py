@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+gunicorn 配置文件（gunicorn 启动时自动读取当前目录下的该文件，命令行参数见 Procfile）
+
+设置 PROMETHEUS_MULTIPROC_DIR 时，各 worker 的 Prometheus 指标写入该目录，/metrics 合并导出：
+- 启动时清空目录，避免上次运行的计数残留
+- worker 退出时标记进程结束，清理其实时类 Gauge
+"""
+
+import os
+import shutil
+
+
+def on_starting(server):
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
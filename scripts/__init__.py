@@ -0,0 +1,5 @@
+"""
+检查用的测试夹具
+
+flask check-* 命令使用的本地桩服务和固定数据，只由命令按需导入，应用运行时不加载。
+"""
@@ -0,0 +1,300 @@
+"""
+GitHub API 本地桩服务
+
+FakeGitHub 在内存中模拟一个单分支仓库，实现 GitHubStorage 批量提交用到的 Git Data API：
+- POST git/blobs、git/trees（支持 base_tree，条目 sha 为 null 表示删除）、git/commits
+- GET git/ref/heads/<分支>、git/commits/<sha>
+- PATCH git/refs/heads/<分支>：只接受快进更新，否则返回 422（与 GitHub 一致）
+
+foreign_pushes 模拟并发提交：之后的每次 ref 更新前先由"其他客户端"推进分支，
+使这次更新不再是快进。scripted 中的路径按脚本依次返回指定的状态码和响应头（限流等）。
+
+- check_batch_commits(): upload_many、batch() 内的上传加删除、ref 冲突后重试（flask check-github-batch）
+- check_retry(): GitHubRetry 对一级/二级限流和权限不足的处理（flask check-github-retry）
+"""
+
+import io
+import json
+import base64
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO = 'owner/repo'
+BRANCH = 'main'
+# GitHubStorage 的图片目录
+IMAGE_PATH = 'images'
+
+
+class FakeGitHub:
+    """内存中的 GitHub 仓库和本地 HTTP 服务（with 语句中启动）"""
+
+    def __init__(self):
+        # sha → (类型, 内容)：blob 为 bytes，tree 为 {路径: blob sha}，commit 为 dict
+        self.objects = {}
+        # 收到的请求 [(方法, 路径)]
+        self.requests = []
+        self.foreign_pushes = 0
+        # 路径 → [(状态码, 响应头)]，第 n 次请求返回第 n 项（超出时重复最后一项）
+        self.scripted = {}
+        self.lock = threading.Lock()
+        self.head = self._store('commit', {'tree': self._store('tree', {}), 'parents': [], 'message': 'init'})
+        self.server = None
+
+    def __enter__(self):
+        github = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                status, headers, payload = github.handle(self.command, self.path, body)
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def api_base(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def _store(self, kind, content):
+        raw = content if kind == 'blob' else json.dumps(content, sort_keys=True).encode('utf-8')
+        sha = hashlib.sha1(kind.encode('ascii') + b'\0' + raw).hexdigest()
+        self.objects[sha] = (kind, content)
+        return sha
+
+    def _commit_tree(self, commit_sha):
+        return self.objects[self.objects[commit_sha][1]['tree']][1]
+
+    def files(self):
+        """分支最新提交中的文件 {路径: 内容}"""
+        with self.lock:
+            return {path: self.objects[sha][1] for path, sha in self._commit_tree(self.head).items()}
+
+    def commits_since(self, base_sha):
+        """base_sha 之后分支上的提交（从旧到新，沿第一个父提交）"""
+        with self.lock:
+            commits = []
+            sha = self.head
+            while sha != base_sha:
+                commit = self.objects[sha][1]
+                commits.append(dict(commit, sha=sha))
+                sha = commit['parents'][0]
+            return commits[::-1]
+
+    def count(self, method, path_suffix):
+        """收到的以 path_suffix 结尾的请求数"""
+        return sum(1 for m, p in self.requests if m == method and p.endswith(path_suffix))
+
+    def _push_foreign_commit(self):
+        """其他客户端向分支推送一次提交"""
+        tree = dict(self._commit_tree(self.head))
+        path = f'other/foreign-{len(self.requests)}.txt'
+        tree[path] = self._store('blob', path.encode('utf-8'))
+        self.head = self._store('commit', {'tree': self._store('tree', tree),
+                                           'parents': [self.head], 'message': 'foreign push'})
+
+    def handle(self, method, path, body):
+        """处理一个 API 请求，返回 (状态码, 响应头, JSON 响应)"""
+        with self.lock:
+            self.requests.append((method, path))
+            if path in self.scripted:
+                script = self.scripted[path]
+                hits = sum(1 for _, p in self.requests if p == path)
+                status, headers = script[min(hits, len(script)) - 1]
+                return status, headers, {}
+            status, payload = self._git_data(method, path, body)
+            return status, {}, payload
+
+    def _git_data(self, method, path, body):
+        """Git Data API，返回 (状态码, JSON 响应)"""
+        prefix = f'/repos/{REPO}/git/'
+        if not path.startswith(prefix):
+            return 404, {'message': 'Not Found'}
+        endpoint = path[len(prefix):]
+
+        if method == 'POST' and endpoint == 'blobs':
+            return 201, {'sha': self._store('blob', base64.b64decode(body['content']))}
+
+        if method == 'POST' and endpoint == 'trees':
+            tree = dict(self.objects[body['base_tree']][1]) if body.get('base_tree') else {}
+            for entry in body['tree']:
+                if entry['sha'] is None:
+                    tree.pop(entry['path'], None)
+                elif entry['sha'] not in self.objects:
+                    return 422, {'message': f'Invalid sha {entry["sha"]}'}
+                else:
+                    tree[entry['path']] = entry['sha']
+            return 201, {'sha': self._store('tree', tree)}
+
+        if method == 'POST' and endpoint == 'commits':
+            commit = {'tree': body['tree'], 'parents': body['parents'], 'message': body['message']}
+            return 201, {'sha': self._store('commit', commit)}
+
+        if method == 'GET' and endpoint == f'ref/heads/{BRANCH}':
+            return 200, {'object': {'sha': self.head, 'type': 'commit'}}
+
+        if method == 'GET' and endpoint.startswith('commits/'):
+            sha = endpoint[len('commits/'):]
+            if self.objects.get(sha, (None,))[0] != 'commit':
+                return 404, {'message': 'Not Found'}
+            return 200, {'sha': sha, 'tree': {'sha': self.objects[sha][1]['tree']}}
+
+        if method == 'PATCH' and endpoint == f'refs/heads/{BRANCH}':
+            if self.foreign_pushes:
+                self.foreign_pushes -= 1
+                self._push_foreign_commit()
+            if self.objects[body['sha']][1]['parents'][:1] != [self.head]:
+                return 422, {'message': 'Update is not a fast forward'}
+            self.head = body['sha']
+            return 200, {'object': {'sha': self.head, 'type': 'commit'}}
+
+        return 404, {'message': 'Not Found'}
+
+
+def _upload_many(github, storage):
+    files = {'a.png': b'image a', 'b.png': b'image b', 'c.png': b'image c'}
+    base = github.head
+    futures = storage.upload_many([(io.BytesIO(data), name) for name, data in files.items()])
+    results = [future.result(timeout=30) for future in futures]
+    commits = github.commits_since(base)
+    tree = github.files()
+    uploaded = all(tree.get(f'{IMAGE_PATH}/{name}') == data for name, data in files.items())
+    ok = all(results) and len(commits) == 1 and uploaded
+    return ok, f'{len(commits)} 次提交（预期 1），{sum(results)}/{len(files)} 个文件上传成功'
+
+
+def _mixed_batch(github, storage):
+    base = github.head
+    with storage.batch('Replace image'):
+        storage.upload_fileobj(io.BytesIO(b'image d'), 'd.png')
+        storage.delete_file('a.png')
+    commits = github.commits_since(base)
+    tree = github.files()
+    ok = (len(commits) == 1 and tree.get(f'{IMAGE_PATH}/d.png') == b'image d'
+          and f'{IMAGE_PATH}/a.png' not in tree and f'{IMAGE_PATH}/b.png' in tree)
+    return ok, (f'{len(commits)} 次提交（预期 1），d.png {"已" if f"{IMAGE_PATH}/d.png" in tree else "未"}上传，'
+                f'a.png {"未" if f"{IMAGE_PATH}/a.png" in tree else "已"}删除')
+
+
+def _ref_conflict(github, storage):
+    base = github.head
+    patches = github.count('PATCH', f'refs/heads/{BRANCH}')
+    github.foreign_pushes = 1
+    result = storage.upload_many([(io.BytesIO(b'image e'), 'e.png')])[0].result(timeout=30)
+    commits = github.commits_since(base)
+    tree = github.files()
+    attempts = github.count('PATCH', f'refs/heads/{BRANCH}') - patches
+    # 重试的提交应基于其他客户端的提交，不能覆盖它
+    ok = (result and attempts == 2 and len(commits) == 2 and commits[0]['message'] == 'foreign push'
+          and tree.get(f'{IMAGE_PATH}/e.png') == b'image e' and any(p.startswith('other/') for p in tree))
+    return ok, f'ref 更新 {attempts} 次（预期 2），分支新增 {len(commits)} 次提交（预期 2：其他客户端 + 本次）'
+
+
+def _ref_conflict_exhausted(github, storage):
+    github.foreign_pushes = 3
+    future = storage.upload_many([(io.BytesIO(b'image f'), 'f.png')])[0]
+    error = future.exception(timeout=30)
+    github.foreign_pushes = 0
+    ok = isinstance(error, IOError) and f'{IMAGE_PATH}/f.png' not in github.files()
+    return ok, f'结果: {type(error).__name__ if error else "成功"}（预期 OSError）'
+
+
+# (名称, 用例)，按顺序在同一个仓库上执行
+BATCH_CASES = [
+    ('upload_many 合并为一次提交', _upload_many),
+    ('batch() 内上传和删除合并为一次提交', _mixed_batch),
+    ('ref 非快进更新（422）后基于最新提交重试', _ref_conflict),
+    ('一直冲突时重试用完后报错', _ref_conflict_exhausted),
+]
+
+
+def check_batch_commits():
+    """
+    用 FakeGitHub 检查 GitHubStorage 的批量提交
+
+    Returns:
+        list: [{'name', 'ok', 'detail'}]
+    """
+    from app.utils.storage import GitHubStorage
+
+    results = []
+    with FakeGitHub() as github:
+        storage = GitHubStorage('token', REPO, branch=BRANCH, path=IMAGE_PATH, api_base=github.api_base)
+        try:
+            for name, case in BATCH_CASES:
+                try:
+                    ok, detail = case(github, storage)
+                except Exception as e:
+                    ok, detail = False, f'异常: {e!r}'
+                results.append({'name': name, 'ok': ok, 'detail': detail})
+        finally:
+            storage.session.close()
+    return results
+
+
+# check_retry() 的用例：(名称, 桩服务依次返回的 (状态码, 响应头), 期望请求次数, 期望最终状态码)
+RETRY_CASES = [
+    ('一级限流 403（X-RateLimit-Remaining: 0）',
+     [(403, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '0'}), (200, {})], 2, 200),
+    ('一级限流 429（X-RateLimit-Remaining: 0）',
+     [(429, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '0'}), (200, {})], 2, 200),
+    ('二级限流 403（Retry-After）',
+     [(403, {'Retry-After': '0'}), (200, {})], 2, 200),
+    ('权限不足 403（不重试）',
+     [(403, {'X-RateLimit-Remaining': '4999'})], 1, 403),
+    ('一直限流（重试用完后返回最后的响应）',
+     [(403, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '0'})] * 4, 4, 403),
+]
+
+
+def check_retry():
+    """
+    用 FakeGitHub 的脚本响应检查 GitHubStorage 的重试策略
+
+    按用例依次返回限流、权限不足等响应，通过 GitHubStorage 的会话请求，
+    统计实际发出的请求数和最终状态码（重试次数为默认的 3 次）。
+
+    Returns:
+        list: [{'name', 'requests', 'status', 'expected_requests', 'expected_status', 'ok'}]
+    """
+    from app.utils.storage import GitHubStorage
+
+    results = []
+    with FakeGitHub() as github:
+        storage = GitHubStorage('token', REPO, branch=BRANCH, path=IMAGE_PATH, api_base=github.api_base)
+        try:
+            for i, (name, script, expected_requests, expected_status) in enumerate(RETRY_CASES):
+                path = f'/repos/{REPO}/contents/case{i}'
+                github.scripted[path] = script
+                status = storage.session.get(github.api_base + path, timeout=10).status_code
+                sent = github.count('GET', path)
+                results.append({
+                    'name': name,
+                    'requests': sent,
+                    'status': status,
+                    'expected_requests': expected_requests,
+                    'expected_status': expected_status,
+                    'ok': sent == expected_requests and status == expected_status,
+                })
+        finally:
+            storage.session.close()
+    return results
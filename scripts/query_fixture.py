@@ -0,0 +1,63 @@
+"""
+查询检查使用的固定数据
+
+flask check-query-counts 在内存数据库（测试配置）中写入这些数据后统计各路由的 SQL 条数：
+多个作者、分类、标签，首页和分类页都有两页以上，部分文章有收藏。
+"""
+
+from datetime import datetime, timedelta
+
+# 写入的数据量：每个分类 12 篇已发布文章（分类页两页），每篇 3 个标签
+FIXTURE_AUTHORS = 3
+FIXTURE_CATEGORIES = 6
+FIXTURE_TAGS = 12
+FIXTURE_POSTS_PER_CATEGORY = 12
+
+
+def seed_fixture(db):
+    """
+    写入查询数检查使用的数据（需在应用上下文中调用）
+
+    文章轮流分配作者、分类和标签，部分文章有收藏，另有一篇草稿；
+    发布时间相隔两天，归档页跨多个月份。
+    """
+    from app.models import User, Post, Category, Tag, PostBookmark, FriendLink
+
+    authors = [User(username=f'author{i}', email=f'author{i}@example.com', password_hash='x')
+               for i in range(FIXTURE_AUTHORS)]
+    categories = [Category(name=f'分类{i}') for i in range(FIXTURE_CATEGORIES)]
+    tags = [Tag(name=f'标签{i}') for i in range(FIXTURE_TAGS)]
+    links = [FriendLink(name=f'友链{i}', url=f'https://example.com/{i}') for i in range(3)]
+    db.session.add_all(authors + categories + tags + links)
+    db.session.flush()
+
+    now = datetime.utcnow()
+    posts = []
+    for i in range(FIXTURE_CATEGORIES * FIXTURE_POSTS_PER_CATEGORY):
+        post = Post(
+            title=f'文章 {i} ab', content=f'正文 {i} ab\n\n' * 20, summary=f'摘要 {i} ab',
+            user_id=authors[i % FIXTURE_AUTHORS].id, category_id=categories[i % FIXTURE_CATEGORIES].id,
+            views=i * 7 % 100, created_at=now - timedelta(days=2 * i), published=True,
+        )
+        post.tags = [tags[(i + k) % FIXTURE_TAGS] for k in range(3)]
+        posts.append(post)
+    posts.append(Post(title='草稿 ab', content='草稿', user_id=authors[0].id,
+                      category_id=categories[0].id, published=False))
+    db.session.add_all(posts)
+    db.session.flush()
+
+    db.session.add_all(
+        PostBookmark(post_id=post.id, user_id=authors[j].id)
+        for i, post in enumerate(posts[:20]) for j in range(i % FIXTURE_AUTHORS + 1)
+    )
+    db.session.commit()
+
+
+def fixture_app():
+    """使用内存数据库（测试配置）并写入 seed_fixture() 数据的应用"""
+    from app import create_app, db
+
+    app = create_app('testing')
+    with app.app_context():
+        seed_fixture(db)
+    return app
@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 """
 WSGI 入口文件 - Render 部署使用
+
+按 FLASK_ENV 选择配置，未设置时使用生产配置（不在启动时自动迁移，迁移由 build.sh 执行）
 """
 import os
 from app import create_app
 
 # 创建 Flask 应用实例
-app = create_app()
+app = create_app(os.environ.get('FLASK_ENV', 'production'))
 
 if __name__ == '__main__':
     app.run()